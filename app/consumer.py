@@ -0,0 +1,72 @@
+"""Standalone Kafka consumer: applies item events without serving the API.
+
+Run with ``python -m app.consumer`` next to API workers started with ``API_ONLY=true``, so
+consumers scale independently of the web workers and do not share their GIL. Consumer
+metrics are served on ``CONSUMER_METRICS_PORT`` (0 disables).
+"""
+import asyncio
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import FrameType
+from typing import Optional
+from app.core.config import settings
+from app.core.logger import LoggerService
+from app.core.metrics import registry
+from app.services.items_service import bulk_create_items, bulk_update_items, create_item, update_item
+from app.services.kafka_service import kafka_service
+
+logger = LoggerService.get_logger(__name__)
+
+# Limit Kafka logs to WARNING level to reduce noise in application logs
+LoggerService.get_logger('kafka').setLevel(LoggerService.get_log_level('WARNING'))
+
+def run_consumer() -> None:
+    """Consume item events until ``kafka_service.stop()``; blocks the calling thread."""
+    LoggerService.info(logger, "Starting Kafka consumer")
+    try:
+        asyncio.run(kafka_service.consume_messages(
+            create_item, update_item, bulk_create_items, bulk_update_items
+        ))
+    except Exception as e:
+        LoggerService.error(logger, "Error in Kafka consumer: %s", e)
+        raise
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # Scrapes are not worth a log line each
+
+def serve_metrics(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="consumer-metrics", daemon=True).start()
+    LoggerService.info(logger, "Serving consumer metrics on port %s", port)
+    return server
+
+def stop(signum: int, _frame: Optional[FrameType]) -> None:
+    LoggerService.info(logger, "Received %s, stopping the consumer after the current batch", signal.Signals(signum).name)
+    kafka_service.stop()
+
+def main() -> None:
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    metrics_server = serve_metrics(settings.CONSUMER_METRICS_PORT) if settings.CONSUMER_METRICS_PORT else None
+    try:
+        run_consumer()
+    finally:
+        if metrics_server:
+            metrics_server.shutdown()
+        LoggerService.info(logger, "Kafka consumer stopped")
+
+if __name__ == "__main__":
+    main()
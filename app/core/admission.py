@@ -0,0 +1,131 @@
+"""Admission control for writes that are accepted now and applied by the consumer later.
+
+Without it a burst of POST/PUT keeps getting 202 while consumer lag grows without bound.
+Writes are shed with 503 (429 for a client over its rate) when too many are in flight,
+when the producer has too many unacknowledged messages, or when the consumer is too far
+behind; reads are never affected.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from app.core.config import settings
+from app.core.logger import LoggerService
+from app.core.metrics import registry
+
+logger = LoggerService.get_logger(__name__)
+
+admission_rejections = registry.counter(
+    "inventory_admission_rejections_total", "Writes rejected by admission control", ("reason",)
+)
+admitted_in_flight = registry.gauge(
+    "inventory_admission_in_flight_writes", "Admitted writes that have not completed yet"
+)
+estimated_consumer_lag = registry.gauge(
+    "inventory_admission_consumer_lag", "Records acked to this process's producer that the consumer has not stored an offset past"
+)
+
+class Overloaded(Exception):
+    """A write was refused; retry after ``retry_after`` seconds."""
+
+    def __init__(self, reason: str, retry_after: float, status_code: int = 503):
+        super().__init__(f"Service overloaded ({reason}), retry later")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+    @property
+    def headers(self) -> dict:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0 if one was available, else the seconds until one is."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class ClientRateLimiter:
+    """One token bucket per client, for the ``max_clients`` most recently seen clients.
+
+    A client evicted from the table comes back with a full bucket, so the table size bounds
+    memory, not fairness.
+    """
+
+    def __init__(self, max_clients: int):
+        self.max_clients = max_clients
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, client: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                bucket = self.buckets[client] = TokenBucket(rate, burst, now)
+                if len(self.buckets) > self.max_clients:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(client)
+                bucket.rate, bucket.burst = rate, burst
+            return bucket.take(now)
+
+class AdmissionController:
+    """Decides whether a write may produce an event. Limits are read from ``settings``
+    on every check (0 disables a limit).
+
+    ``pending_acks`` reports the producer's unacknowledged messages; :meth:`monitor_lag`
+    keeps :attr:`consumer_lag` current.
+    """
+
+    def __init__(self, pending_acks: Callable[[], int]):
+        self.pending_acks = pending_acks
+        self.rate_limiter = ClientRateLimiter(settings.ADMISSION_MAX_CLIENTS)
+        self.in_flight = 0
+        self.consumer_lag: Optional[int] = None
+
+    def reject(self, reason: str, retry_after: Optional[float] = None, status_code: int = 503) -> None:
+        admission_rejections.inc(reason=reason)
+        LoggerService.warning(logger, "Rejecting write: %s", reason)
+        raise Overloaded(reason, retry_after or settings.ADMISSION_RETRY_AFTER_SECONDS, status_code)
+
+    def enter(self, client: str) -> None:
+        """Admit a write or raise :class:`Overloaded`; admitted writes must call :meth:`leave`."""
+        if settings.ADMISSION_MAX_IN_FLIGHT_WRITES and self.in_flight >= settings.ADMISSION_MAX_IN_FLIGHT_WRITES:
+            self.reject("in_flight")
+        if settings.ADMISSION_MAX_PENDING_ACKS and self.pending_acks() >= settings.ADMISSION_MAX_PENDING_ACKS:
+            self.reject("pending_acks")
+        if settings.ADMISSION_MAX_CONSUMER_LAG and (self.consumer_lag or 0) >= settings.ADMISSION_MAX_CONSUMER_LAG:
+            self.reject("consumer_lag")
+        if settings.ADMISSION_CLIENT_RATE_PER_SECOND:
+            wait = self.rate_limiter.take(client, settings.ADMISSION_CLIENT_RATE_PER_SECOND, settings.ADMISSION_CLIENT_BURST)
+            if wait:
+                self.reject("rate_limited", wait, status_code=429)
+        self.in_flight += 1
+        admitted_in_flight.set(self.in_flight)
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+        admitted_in_flight.set(self.in_flight)
+
+    async def monitor_lag(self, measure: Callable[[], Awaitable[Optional[int]]], interval_seconds: float) -> None:
+        """Re-measure consumer lag every ``interval_seconds``; None (unknown) never sheds."""
+        while True:
+            try:
+                self.consumer_lag = await measure()
+                if self.consumer_lag is not None:
+                    estimated_consumer_lag.set(self.consumer_lag)
+            except Exception as e:
+                LoggerService.warning(logger, "Failed to measure consumer lag: %s", e)
+            await asyncio.sleep(interval_seconds)
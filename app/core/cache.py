@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+from app.core.metrics import registry
+
+cache_requests = registry.counter(
+    "inventory_cache_requests_total", "Cache lookups by result", ("cache", "result")
+)
+cache_evictions = registry.counter(
+    "inventory_cache_evictions_total", "Cache entries dropped before being read again", ("cache", "reason")
+)
+
+class Missing:
+    def __repr__(self) -> str:
+        return "MISSING"
+
+MISSING = Missing()
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL.
+
+    ``None`` is a valid cached value, so negative lookups can be cached (usually with a
+    shorter TTL); absent keys return ``MISSING``. Loads that race with a write are
+    discarded: take a token with :meth:`load_token` before reading the source and
+    pass it to :meth:`fill`.
+    """
+
+    def __init__(self, name: str, capacity: int, ttl_seconds: float, negative_ttl_seconds: float):
+        self.name = name
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    cache_requests.inc(cache=self.name, result="hit")
+                    return value
+                del self.entries[key]
+                cache_evictions.inc(cache=self.name, reason="expired")
+        cache_requests.inc(cache=self.name, result="miss")
+        return MISSING
+
+    def load_token(self) -> int:
+        return self.writes
+
+    def fill(self, key: Hashable, value: Any, token: int) -> None:
+        """Cache a value read from the source unless a write happened since ``token``."""
+        with self.lock:
+            if token == self.writes:
+                self._store(key, value)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self.lock:
+            self.writes += 1
+            self._store(key, value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or every key when none is given."""
+        with self.lock:
+            self.writes += 1
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if self.capacity <= 0:
+            return
+        ttl = self.negative_ttl_seconds if value is None else self.ttl_seconds
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            cache_evictions.inc(cache=self.name, reason="capacity")
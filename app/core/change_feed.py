@@ -0,0 +1,216 @@
+import asyncio
+import threading
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import orjson
+from app.core.metrics import registry
+
+feed_subscribers = registry.gauge(
+    "inventory_change_feed_subscribers", "Open change feed subscriptions", ("feed",)
+)
+feed_events = registry.counter(
+    "inventory_change_feed_events_total", "Events published to the change feed", ("feed",)
+)
+feed_dropped = registry.counter(
+    "inventory_change_feed_dropped_subscribers_total",
+    "Subscriptions closed because their buffer overflowed", ("feed",)
+)
+
+# (sequence number, encoded Server-Sent Events frame)
+FeedEvent = Tuple[int, bytes]
+
+class ResumeUnavailable(Exception):
+    """The events after the requested position are gone (too old, or from an earlier process)."""
+
+class FeedFull(Exception):
+    """The feed already has as many subscribers as it allows."""
+
+class FeedUnavailable(Exception):
+    """The feed is turned off, e.g. because it would miss writes made by other processes."""
+
+class Subscription:
+    """A subscriber's view of the feed, read from one event loop.
+
+    Events are queued in a buffer of at most ``buffer_size``; a subscriber that falls that
+    far behind is dropped and should resume from the last position it received. Events
+    replayed on resume do not count against the buffer until they have been read.
+    """
+
+    def __init__(self, feed: "ChangeFeed", loop: asyncio.AbstractEventLoop, buffer_size: int):
+        self.feed = feed
+        self.loop = loop
+        self.buffer_size = buffer_size
+        # buffer_size, plus the replayed events not read yet
+        self.capacity = buffer_size
+        self.events: Deque[FeedEvent] = deque()
+        # A bare future rather than asyncio.wait_for: no task or timer per wait
+        self.waiter: Optional[asyncio.Future] = None
+        self.dropped = False
+        # The position subscribed from, and the last event queued
+        self.start_seq = 0
+        self.last_seq = 0
+
+    def wake(self) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def deliver(self, event: FeedEvent) -> bool:
+        """Queue an event; False if the buffer is full and the subscription was dropped."""
+        if self.dropped:
+            return False
+        if event[0] <= self.last_seq:
+            return True
+        if len(self.events) >= self.capacity:
+            self.dropped = True
+            self.events.clear()
+            self.wake()
+            return False
+        self.events.append(event)
+        self.last_seq = event[0]
+        self.wake()
+        return True
+
+    async def next_events(self) -> List[FeedEvent]:
+        """Wait for events; empty when woken by the feed's heartbeat, or once dropped."""
+        if not self.events and not self.dropped:
+            self.waiter = self.loop.create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+        events = list(self.events)
+        self.events.clear()
+        self.capacity = self.buffer_size
+        return events
+
+    def position(self, seq: int) -> str:
+        return self.feed.position(seq)
+
+    def close(self) -> None:
+        self.feed.unsubscribe(self)
+
+class ChangeFeed:
+    """Fans out applied item changes to subscribers on asyncio event loops.
+
+    :meth:`publish` may be called from any thread (the Kafka consumer, the threadpool or
+    the loop itself): the event is encoded once, kept in a bounded history for resuming,
+    and handed to each loop with subscribers in one ``call_soon_threadsafe`` call. Every
+    ``heartbeat_seconds`` one timer per loop wakes the idle subscriptions, so streams can
+    send a keep-alive.
+    Positions are ``<epoch>-<seq>``; the epoch changes on every start, so a client cannot
+    resume into a different process's sequence.
+    """
+
+    def __init__(self, name: str, history_size: int, buffer_size: int, max_subscribers: int,
+                 heartbeat_seconds: float):
+        self.name = name
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.history: Deque[FeedEvent] = deque(maxlen=history_size)
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscriptions: Dict[asyncio.AbstractEventLoop, Set[Subscription]] = {}
+        self.heartbeats: Dict[asyncio.AbstractEventLoop, asyncio.TimerHandle] = {}
+        self.subscriber_count = 0
+        self.lock = threading.Lock()
+        # Why subscribing is refused, when it is
+        self.unavailable: Optional[str] = None
+
+    def position(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def parse_position(self, position: str) -> int:
+        epoch, _, seq = position.rpartition("-")
+        try:
+            parsed = int(seq)
+        except ValueError:
+            raise ValueError(f"Invalid change feed position: {position}")
+        if epoch != self.epoch:
+            raise ResumeUnavailable(f"Position {position} is from an earlier run of the service")
+        return parsed
+
+    def publish(self, kind: str, id: Optional[int], item: Optional[Dict[str, Any]]) -> None:
+        with self.lock:
+            self.seq += 1
+            data = orjson.dumps({"seq": self.seq, "kind": kind, "id": id, "item": item})
+            event = (self.seq, b"id: %s\nevent: %s\ndata: %s\n\n" % (
+                self.position(self.seq).encode(), kind.encode(), data,
+            ))
+            self.history.append(event)
+            # Scheduled under the lock so every loop sees the events in sequence order
+            for loop, subscriptions in list(self.subscriptions.items()):
+                try:
+                    loop.call_soon_threadsafe(self.fan_out, subscriptions, event)
+                except RuntimeError:
+                    # The loop was closed without its subscribers closing
+                    self.subscriber_count -= len(self.subscriptions.pop(loop))
+                    self.heartbeats.pop(loop, None)
+        feed_events.inc(feed=self.name)
+
+    def fan_out(self, subscriptions: Set[Subscription], event: FeedEvent) -> None:
+        dropped = [subscription for subscription in subscriptions if not subscription.deliver(event)]
+        for subscription in dropped:
+            if self.unsubscribe(subscription):
+                feed_dropped.inc(feed=self.name)
+
+    def heartbeat(self, loop: asyncio.AbstractEventLoop) -> None:
+        for subscription in self.subscriptions.get(loop, ()):
+            subscription.wake()
+        self.heartbeats[loop] = loop.call_later(self.heartbeat_seconds, self.heartbeat, loop)
+
+    def requested_seq(self, after: Optional[str]) -> Optional[int]:
+        if self.unavailable:
+            raise FeedUnavailable(self.unavailable)
+        return None if after is None else self.parse_position(after)
+
+    def check_room(self, after: Optional[str], after_seq: Optional[int]) -> None:
+        # Called with the lock held
+        if self.subscriber_count >= self.max_subscribers:
+            raise FeedFull(f"The {self.name} change feed has {self.subscriber_count} subscribers")
+        if after_seq is not None:
+            oldest = self.history[0][0] if self.history else self.seq + 1
+            if after_seq > self.seq or after_seq < oldest - 1:
+                raise ResumeUnavailable(f"Events after {after} are no longer available")
+
+    def check_subscribe(self, after: Optional[str] = None) -> None:
+        """Raise what :meth:`subscribe` would right now, without subscribing."""
+        after_seq = self.requested_seq(after)
+        with self.lock:
+            self.check_room(after, after_seq)
+
+    def subscribe(self, after: Optional[str] = None) -> Subscription:
+        """Subscribe from the running loop, replaying the events after position ``after``."""
+        after_seq = self.requested_seq(after)
+        subscription = Subscription(self, asyncio.get_running_loop(), self.buffer_size)
+        with self.lock:
+            self.check_room(after, after_seq)
+            if after_seq is not None:
+                subscription.events.extend(event for event in self.history if event[0] > after_seq)
+                subscription.capacity += len(subscription.events)
+            subscription.start_seq = self.seq if after_seq is None else after_seq
+            subscription.last_seq = self.seq
+            if subscription.loop not in self.subscriptions:
+                self.subscriptions[subscription.loop] = set()
+                self.heartbeats[subscription.loop] = subscription.loop.call_later(
+                    self.heartbeat_seconds, self.heartbeat, subscription.loop,
+                )
+            self.subscriptions[subscription.loop].add(subscription)
+            self.subscriber_count += 1
+            feed_subscribers.set(self.subscriber_count, feed=self.name)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> bool:
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.loop)
+            if subscriptions is None or subscription not in subscriptions:
+                return False
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.loop]
+                # Unsubscribing happens on the subscription's loop, so the timer can be cancelled
+                self.heartbeats.pop(subscription.loop).cancel()
+            self.subscriber_count -= 1
+            feed_subscribers.set(self.subscriber_count, feed=self.name)
+            return True
@@ -1,13 +1,137 @@
 import os
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/inventory")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql+psycopg2://user:password@db:5432/inventory")
+    # Defaults to DATABASE_URL with its asyncio driver (asyncpg for PostgreSQL)
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Comma-separated read replicas for GET /items and GET /items/{id}; empty reads from the primary
+    DATABASE_READ_URLS: str = ""
+    # Reads stay on the primary this long after a client's write (via a cookie)
+    DATABASE_READ_YOUR_WRITES_SECONDS: float = 5.0
+    DATABASE_READ_HEALTH_CHECK_SECONDS: float = 5.0
+
+    # Connection pools: the sync engine serves the Kafka consumer, the async one the HTTP
+    # routes, and every read replica gets its own pool of the READ size
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    ASYNC_DATABASE_POOL_SIZE: int = 10
+    ASYNC_DATABASE_MAX_OVERFLOW: int = 20
+    READ_DATABASE_POOL_SIZE: int = 10
+    READ_DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_TIMEOUT_SECONDS: float = 30.0
     KAFKA_BROKER: str = os.getenv("KAFKA_BROKER", "kafka:29092")
+    # Serve the API without consuming: run consumers separately with `python -m app.consumer`,
+    # so API workers (uvicorn --workers N) do not each join the consumer group
+    API_ONLY: bool = False
+    # Port of the standalone consumer's /metrics endpoint (0 disables)
+    CONSUMER_METRICS_PORT: int = 9100
     KAFKA_ITEM_CREATED_TOPIC: str = "item_created"
     KAFKA_ITEM_UPDATED_TOPIC: str = "item_updated"
 
+    # Kafka producer batching and acknowledgements
+    KAFKA_PRODUCER_ACKS: str = "leader"  # fire-and-forget | leader | all
+    KAFKA_PRODUCER_LINGER_MS: int = 5
+    KAFKA_PRODUCER_BATCH_SIZE: int = 64 * 1024
+    KAFKA_PRODUCER_COMPRESSION: Optional[str] = None  # gzip | snappy | lz4 | zstd
+    # How long producing may block the event loop (waiting for buffer space, or for metadata
+    # of a topic other than the item topics, which are fetched on connect); past it the
+    # write fails with 503. Connecting is bounded by the bootstrap timeout instead
+    KAFKA_PRODUCER_MAX_BLOCK_MS: int = 50
+    KAFKA_PRODUCER_BOOTSTRAP_TIMEOUT_MS: int = 5000
+    KAFKA_PRODUCER_ACK_TIMEOUT_SECONDS: float = 10.0
+    # Event encoding written by the producer: legacy-json | json | binary. Consumers read all
+    # three, so switch to binary once every consumer runs a version that decodes it.
+    KAFKA_EVENT_CODEC: str = "legacy-json"
+    # zlib-compress single events of at least this many bytes (0 disables)
+    KAFKA_EVENT_COMPRESS_MIN_BYTES: int = 0
+
+    # Kafka consumer batching: poll up to BATCH_SIZE records or BATCH_MAX_WAIT_MS per batch
+    KAFKA_CONSUMER_GROUP_ID: str = "inventory-consumer-group"
+    KAFKA_CONSUMER_BATCH_SIZE: int = 500
+    KAFKA_CONSUMER_BATCH_MAX_WAIT_MS: int = 100
+    # Worker threads applying a batch in parallel; events of one item always share a worker
+    KAFKA_CONSUMER_WORKERS: int = 4
+    # Merge repeated updates of the same item within a batch into one write
+    KAFKA_CONSUMER_CONFLATE_UPDATES: bool = True
+    # Offsets live in PostgreSQL with the item writes; Kafka's copy is committed asynchronously
+    # at most this often (and whenever the consumer goes idle)
+    KAFKA_CONSUMER_COMMIT_INTERVAL_MS: int = 5000
+    # Applied event ids are kept this long to drop redelivered events (e.g. producer retries)
+    KAFKA_CONSUMER_DEDUP_RETENTION_SECONDS: float = 24 * 3600
+    KAFKA_CONSUMER_DEDUP_PRUNE_INTERVAL_SECONDS: float = 60.0
+
+    # GET /items pagination and streaming
+    ITEMS_PAGE_SIZE: int = 100
+    ITEMS_MAX_PAGE_SIZE: int = 1000
+    ITEMS_STREAM_CHUNK_SIZE: int = 1000
+
+    # POST/PUT /items?wait=true: how long a request may wait for the consumer to apply its
+    # event. With the consumer in another process, acks arrive through PostgreSQL
+    # LISTEN/NOTIFY on WRITE_ACK_CHANNEL.
+    ITEMS_WAIT_TIMEOUT_MS: int = 5000
+    ITEMS_WAIT_MAX_TIMEOUT_MS: int = 30000
+    WRITE_ACK_LISTEN_NOTIFY: bool = False
+    WRITE_ACK_CHANNEL: str = "inventory_write_acks"
+    # Item writes are also sent with NOTIFY on ITEM_CHANGES_CHANNEL (PostgreSQL only), so every
+    # API process updates its item cache and change feed with the writes of consumers in other
+    # processes. Without it, API_ONLY turns both off, since they would miss those writes
+    ITEM_CHANGES_LISTEN_NOTIFY: bool = False
+    ITEM_CHANGES_CHANNEL: str = "inventory_item_changes"
+
+    # Admission control for writes that produce Kafka events (0 disables each limit): writes
+    # in flight per process, unacknowledged produced messages, and consumer lag (estimated from
+    # offsets acked to this process and the consumer offsets stored in the database) get 503;
+    # a client over its token bucket rate gets 429. Clients are told to retry after
+    # ADMISSION_RETRY_AFTER_SECONDS (or when their bucket refills).
+    ADMISSION_MAX_IN_FLIGHT_WRITES: int = 1000
+    ADMISSION_MAX_PENDING_ACKS: int = 10000
+    ADMISSION_MAX_CONSUMER_LAG: int = 100000
+    ADMISSION_LAG_CHECK_SECONDS: float = 1.0
+    ADMISSION_CLIENT_RATE_PER_SECOND: float = 0.0
+    ADMISSION_CLIENT_BURST: int = 100
+    ADMISSION_MAX_CLIENTS: int = 10000
+    ADMISSION_RETRY_AFTER_SECONDS: float = 1.0
+
+    # POST/PUT /items/bulk limits
+    BULK_MAX_ITEMS: int = 10000
+    BULK_MAX_BODY_BYTES: int = 16 * 1024 * 1024
+
+    # Read-through cache for GET /items/{id}; misses are cached with the negative TTL
+    ITEM_CACHE_CAPACITY: int = 10000
+    ITEM_CACHE_TTL_SECONDS: float = 60.0
+    ITEM_CACHE_NEGATIVE_TTL_SECONDS: float = 5.0
+
+    # GET /items/changes: events kept for resuming, events buffered per subscriber before
+    # it is dropped as too slow, and the keep-alive period of idle streams
+    CHANGE_FEED_HISTORY_SIZE: int = 10000
+    CHANGE_FEED_SUBSCRIBER_BUFFER: int = 1000
+    CHANGE_FEED_MAX_SUBSCRIBERS: int = 10000
+    CHANGE_FEED_HEARTBEAT_SECONDS: float = 15.0
+
+    # Logging: records are written by a background thread; INFO and DEBUG records are
+    # rate limited per message (0 disables) and can be sampled per logger, e.g.
+    # LOG_SAMPLE_RATES='{"app.services.items_service": 0.1}'
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # text | json
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_RATE_LIMIT_PER_SECOND: float = 50.0
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+
+    # Period of the timer measuring event loop blocking (inventory_event_loop_lag_seconds)
+    EVENT_LOOP_MONITOR_INTERVAL_SECONDS: float = 0.25
+
+    # Startup does not wait for Kafka or the database: they are connected in the background,
+    # retried with exponential backoff from STARTUP_RETRY_INITIAL_SECONDS up to
+    # STARTUP_RETRY_MAX_SECONDS while down, and re-checked for GET /readyz every
+    # READINESS_CHECK_SECONDS once up
+    STARTUP_RETRY_INITIAL_SECONDS: float = 0.5
+    STARTUP_RETRY_MAX_SECONDS: float = 30.0
+    READINESS_CHECK_SECONDS: float = 5.0
+    READINESS_CHECK_TIMEOUT_SECONDS: float = 2.0
+
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,25 +1,114 @@
-from typing import Generator
+import asyncio
+import time
+from typing import Any, AsyncGenerator, Dict, Generator, Union
 from app.core.config import settings
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import Pool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.logger import LoggerService
+from app.core.metrics import registry
 
 logger = LoggerService.get_logger(__name__)
 
+pool_checkout_seconds = registry.histogram(
+    "inventory_db_pool_checkout_seconds", "Time to get a connection from the pool, including waiting for one", ("engine",)
+)
+pool_connections = registry.gauge(
+    "inventory_db_pool_connections", "Pooled connections by state (in_use, idle, overflow)", ("engine", "state")
+)
+
+# asyncio drivers for the sync DATABASE_URL backends
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def async_database_url(url: str) -> URL:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return parsed
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+def timed_pool_class(url: Union[str, URL], engine_name: str) -> type:
+    """The dialect's default pool class, timing every checkout into pool_checkout_seconds."""
+    url = make_url(url)
+    pool_class = url.get_dialect().get_pool_class(url)
+
+    def connect(self: Pool):
+        started = time.perf_counter()
+        try:
+            return pool_class.connect(self)
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - started, engine=engine_name)
+
+    return type(f"Timed{pool_class.__name__}", (pool_class,), {"connect": connect})
+
+def engine_options(url: Union[str, URL], engine_name: str, pool_size: int, max_overflow: int) -> Dict[str, Any]:
+    """create_engine() pool arguments; sizes only apply to queue pools (not e.g. in-memory SQLite)."""
+    pool_class = timed_pool_class(url, engine_name)
+    options: Dict[str, Any] = {"poolclass": pool_class}
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        )
+    return options
+
+# Engines whose pools are reported on /metrics, by name
+monitored_engines: Dict[str, Engine] = {}
+
 LoggerService.info(logger, "Creating database engine")
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **engine_options(
+    settings.DATABASE_URL, "sync", settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW,
+))
+monitored_engines["sync"] = engine
 
 LoggerService.info(logger, "Configuring session maker")
 SessionLocal: sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The HTTP routes use the async engine so they never wait on Starlette's threadpool;
+# the Kafka consumer keeps the sync engine above
+LoggerService.info(logger, "Creating async database engine")
+async_url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(async_url, **engine_options(
+    async_url, "async", settings.ASYNC_DATABASE_POOL_SIZE, settings.ASYNC_DATABASE_MAX_OVERFLOW,
+))
+monitored_engines["async"] = async_engine.sync_engine
+AsyncSessionLocal: async_sessionmaker = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+def collect_pool_stats() -> None:
+    for name, monitored in list(monitored_engines.items()):
+        pool = monitored.pool
+        if isinstance(pool, QueuePool):
+            pool_connections.set(pool.checkedout(), engine=name, state="in_use")
+            pool_connections.set(pool.checkedin(), engine=name, state="idle")
+            pool_connections.set(max(pool.overflow(), 0), engine=name, state="overflow")
+
+registry.add_collector(collect_pool_stats)
+
 def get_db() -> Generator[Session, None, None]:
-    LoggerService.info(logger, "Creating a new database session")
+    LoggerService.debug(logger, "Creating a new database session")
     db: Session = SessionLocal()
     try:
         yield db
     finally:
-        LoggerService.info(logger, "Closing the database session")
-        db.close()
\ No newline at end of file
+        LoggerService.debug(logger, "Closing the database session")
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    LoggerService.debug(logger, "Creating a new async database session")
+    async with AsyncSessionLocal() as db:
+        yield db
+        LoggerService.debug(logger, "Closing the async database session")
+
+async def check_database() -> None:
+    """Readiness check: a round trip to the primary over the async engine."""
+    async def select_one() -> None:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.wait_for(select_one(), settings.READINESS_CHECK_TIMEOUT_SECONDS)
@@ -1,40 +1,165 @@
+import atexit
+import copy
+import json
 import logging
-from typing import Any
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import registry
+
+dropped_records = registry.counter(
+    "inventory_log_records_dropped_total", "Log records dropped before being written", ("reason",)
+)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s: %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records below WARNING of the configured loggers."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        if rate is None or random.random() < rate:
+            return True
+        dropped_records.inc(reason="sampled")
+        return False
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per logger and message template for records below WARNING.
+
+    Records are keyed by their unformatted ``msg``, so "Item with id %s ..." is one
+    message no matter the id.
+    """
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None):
+        super().__init__()
+        self.rate = rate_per_second
+        self.burst = burst if burst is not None else rate_per_second
+        self.buckets: Dict[Tuple[str, Any], Tuple[float, float]] = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+        if not allowed:
+            dropped_records.inc(reason="rate_limited")
+        return allowed
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread; drops them instead of blocking when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the %-merge happens on the calling thread; formatting and I/O happen on the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc(reason="queue_full")
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail, so stop() still writes everything queued
+        self.queue.put(self._sentinel)
+
+def build_handler() -> NonBlockingQueueHandler:
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    if settings.LOG_SAMPLE_RATES:
+        handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+    handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_PER_SECOND))
+
+    listener = DrainingQueueListener(handler.queue, stream_handler)
+    listener.start()
+    # Flush what is still queued on interpreter exit
+    atexit.register(listener.stop)
+    return handler
 
 class LoggerService:
+    """Thin wrapper over :mod:`logging`; pass arguments %-style so disabled or dropped
+    records are never formatted: ``LoggerService.info(logger, "Item %s", id)``.
+    """
+
+    handler: Optional[NonBlockingQueueHandler] = None
+    handler_lock = threading.Lock()
+
     @staticmethod
     def get_logger(name: str) -> logging.Logger:
         logger = logging.getLogger(name)
-        logger.setLevel(logging.INFO)
-        
+        logger.setLevel(LoggerService.get_log_level(settings.LOG_LEVEL))
+
         if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s: %(message)s')
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
-        
+            logger.addHandler(LoggerService.get_handler())
+
         return logger
 
     @staticmethod
-    def info(logger: logging.Logger, message: str) -> None:
-        logger.info(message)
+    def get_handler() -> NonBlockingQueueHandler:
+        with LoggerService.handler_lock:
+            if LoggerService.handler is None:
+                LoggerService.handler = build_handler()
+            return LoggerService.handler
+
+    @staticmethod
+    def info(logger: logging.Logger, message: str, *args: Any) -> None:
+        logger.info(message, *args)
 
     @staticmethod
-    def error(logger: logging.Logger, message: str) -> None:
-        logger.error(message)
+    def error(logger: logging.Logger, message: str, *args: Any) -> None:
+        logger.error(message, *args)
 
     @staticmethod
-    def warning(logger: logging.Logger, message: str) -> None:
-        logger.warning(message)
+    def warning(logger: logging.Logger, message: str, *args: Any) -> None:
+        logger.warning(message, *args)
 
     @staticmethod
-    def debug(logger: logging.Logger, message: str) -> None:
-        logger.debug(message)
+    def debug(logger: logging.Logger, message: str, *args: Any) -> None:
+        logger.debug(message, *args)
 
     @staticmethod
-    def exception(logger: logging.Logger, message: str) -> None:
-        logger.exception(message)
+    def exception(logger: logging.Logger, message: str, *args: Any) -> None:
+        logger.exception(message, *args)
 
     @staticmethod
     def get_log_level(level: str) -> int:
-        return getattr(logging, level.upper())
\ No newline at end of file
+        return getattr(logging, level.upper())
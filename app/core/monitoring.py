@@ -0,0 +1,57 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+from app.core.metrics import registry
+
+http_request_duration = registry.histogram(
+    "inventory_http_request_duration_seconds", "HTTP request latency, until the response body is sent",
+    ("method", "route", "status"),
+)
+event_loop_lag = registry.histogram(
+    "inventory_event_loop_lag_seconds", "How late the event loop woke a periodic timer, i.e. time it spent blocked",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+Message = Dict[str, Any]
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template.
+
+    Requests matching no route are grouped under ``unmatched`` so arbitrary paths
+    cannot blow up the label set.
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]]):
+        self.app = app
+
+    async def __call__(self, scope: Message, receive: Callable[[], Awaitable[Message]],
+                       send: Callable[[Message], Awaitable[None]]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_duration.observe(
+                time.perf_counter() - started, method=scope["method"], route=route, status=status,
+            )
+
+async def monitor_event_loop(interval_seconds: float) -> None:
+    """Sleep for ``interval_seconds`` forever and record how late each wake-up was."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval_seconds)
+        event_loop_lag.observe(max(loop.time() - started - interval_seconds, 0.0))
@@ -0,0 +1,85 @@
+"""Dependency checks behind GET /readyz.
+
+Startup does not wait for Kafka or the database, so an instance binds its port at once.
+Each dependency is checked in the background instead: with exponential backoff while it is
+down, then every ``READINESS_CHECK_SECONDS``. GET /healthz only says the process serves;
+GET /readyz says whether the dependencies were up at their last check.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core.logger import LoggerService
+from app.core.metrics import registry
+
+logger = LoggerService.get_logger(__name__)
+
+dependency_ready = registry.gauge(
+    "inventory_dependency_ready", "1 if the dependency passed its last readiness check", ("dependency",)
+)
+
+class Dependency:
+    def __init__(self, name: str, check: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.check = check
+        self.ready = False
+        self.last_error: Optional[str] = "not checked yet"
+        self.checked_at: Optional[float] = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "ready": self.ready,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+        }
+
+class Readiness:
+    """The dependencies an instance needs to serve; a check is ready when it returns."""
+
+    def __init__(self):
+        self.dependencies: Dict[str, Dependency] = {}
+
+    def add(self, name: str, check: Callable[[], Awaitable[None]]) -> None:
+        self.dependencies[name] = Dependency(name, check)
+        dependency_ready.set(0, dependency=name)
+
+    @property
+    def ready(self) -> bool:
+        return all(dependency.ready for dependency in self.dependencies.values())
+
+    def mark(self, dependency: Dependency, ready: bool, error: Optional[str] = None) -> None:
+        if ready and not dependency.ready:
+            LoggerService.info(logger, "Dependency %s is ready", dependency.name)
+        elif dependency.ready and not ready:
+            LoggerService.warning(logger, "Dependency %s is not ready: %s", dependency.name, error)
+        dependency.ready = ready
+        dependency.last_error = error
+        dependency.checked_at = time.time()
+        dependency_ready.set(1 if ready else 0, dependency=dependency.name)
+
+    async def watch(self, dependency: Dependency, interval_seconds: float,
+                    initial_backoff_seconds: float, max_backoff_seconds: float) -> None:
+        backoff = initial_backoff_seconds
+        while True:
+            try:
+                await dependency.check()
+                self.mark(dependency, True)
+                backoff = initial_backoff_seconds
+                delay = interval_seconds
+            except Exception as e:
+                self.mark(dependency, False, str(e) or type(e).__name__)
+                delay = backoff
+                backoff = min(backoff * 2, max_backoff_seconds)
+            await asyncio.sleep(delay)
+
+    async def monitor(self, interval_seconds: float, initial_backoff_seconds: float, max_backoff_seconds: float) -> None:
+        await asyncio.gather(*(
+            self.watch(dependency, interval_seconds, initial_backoff_seconds, max_backoff_seconds)
+            for dependency in self.dependencies.values()
+        ))
+
+    def status(self) -> Dict[str, Any]:
+        dependencies: List[Dict[str, Any]] = [dependency.status() for dependency in self.dependencies.values()]
+        return {"ready": self.ready, "dependencies": dependencies}
+
+readiness = Readiness()
@@ -0,0 +1,173 @@
+import asyncio
+import itertools
+import threading
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_database_url, engine_options, monitored_engines
+from app.core.logger import LoggerService
+from app.core.metrics import registry
+
+logger = LoggerService.get_logger(__name__)
+
+replica_healthy = registry.gauge(
+    "inventory_db_replica_healthy", "1 if the read replica passed its last health check", ("replica",)
+)
+routed_reads = registry.counter(
+    "inventory_db_reads_total", "Read sessions opened, by target database", ("target",)
+)
+
+# Set on reads served by a replica, so callers can tell that the data may lag the primary
+REPLICA_INFO_KEY = "read_replica"
+CONSISTENCY_HEADER = "X-Read-Consistency"
+READ_PRIMARY_COOKIE = "inventory_read_primary_until"
+UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+class ReadReplica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker: async_sessionmaker = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "latency_ms": self.latency_ms,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+        }
+
+class ReplicaSet:
+    """Round-robin over the healthy read replicas; callers fall back to the primary when none is."""
+
+    def __init__(self, replicas: List[ReadReplica]):
+        self.replicas = replicas
+        self.cycle = itertools.cycle(replicas) if replicas else None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_urls(cls, urls: str) -> "ReplicaSet":
+        replicas = []
+        for index, url in enumerate(url.strip() for url in urls.split(",") if url.strip()):
+            name = f"replica-{index}"
+            async_url = async_database_url(url)
+            engine = create_async_engine(async_url, **engine_options(
+                async_url, name, settings.READ_DATABASE_POOL_SIZE, settings.READ_DATABASE_MAX_OVERFLOW,
+            ))
+            monitored_engines[name] = engine.sync_engine
+            replicas.append(ReadReplica(name, engine))
+        return cls(replicas)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[ReadReplica]:
+        with self.lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self.cycle)
+                if replica.healthy:
+                    return replica
+        return None
+
+    def mark(self, replica: ReadReplica, healthy: bool, error: Optional[str] = None) -> None:
+        if replica.healthy and not healthy:
+            LoggerService.warning(logger, "Read replica %s is unhealthy: %s", replica.name, error)
+        elif healthy and not replica.healthy:
+            LoggerService.info(logger, "Read replica %s is healthy again", replica.name)
+        replica.healthy = healthy
+        replica.last_error = error
+        replica_healthy.set(1 if healthy else 0, replica=replica.name)
+
+    async def check(self, timeout: float = 2.0) -> None:
+        # The timeout covers connecting too: an unreachable host must not stall the monitor
+        async def ping(replica: ReadReplica) -> None:
+            async with replica.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        async def check_one(replica: ReadReplica) -> None:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(ping(replica), timeout)
+                replica.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+                self.mark(replica, True)
+            except Exception as e:
+                self.mark(replica, False, str(e) or type(e).__name__)
+            replica.checked_at = time.time()
+
+        await asyncio.gather(*(check_one(replica) for replica in self.replicas))
+
+    async def monitor(self, interval_seconds: float) -> None:
+        while True:
+            await self.check(timeout=interval_seconds)
+            await asyncio.sleep(interval_seconds)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [replica.status() for replica in self.replicas]
+
+read_replicas = ReplicaSet.from_urls(settings.DATABASE_READ_URLS)
+
+def reads_pinned_to_primary(request: Request) -> bool:
+    """True if the client asked for primary reads, or wrote recently (read-your-writes)."""
+    if request.headers.get(CONSISTENCY_HEADER, "").lower() == "primary":
+        return True
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_sessionmaker(db: AsyncSession) -> async_sessionmaker:
+    """The sessionmaker behind a :func:`get_async_read_db` session, for reads that outlive it
+    (streamed responses) but must stay on the database the request was routed to."""
+    name = db.info.get(REPLICA_INFO_KEY)
+    for replica in read_replicas.replicas:
+        if replica.name == name:
+            return replica.sessionmaker
+    return AsyncSessionLocal
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes: a healthy replica if any is configured, else the primary."""
+    replica = None if reads_pinned_to_primary(request) else read_replicas.choose()
+    sessionmaker = replica.sessionmaker if replica else AsyncSessionLocal
+    routed_reads.inc(target=replica.name if replica else "primary")
+    async with sessionmaker() as db:
+        if replica:
+            db.info[REPLICA_INFO_KEY] = replica.name
+        yield db
+
+Message = Dict[str, Any]
+
+class ReadYourWritesMiddleware:
+    """Pins a client's reads to the primary for a while after each successful write.
+
+    Successful POST/PUT/PATCH/DELETE responses set a cookie holding the time until which
+    :func:`get_async_read_db` skips the replicas. Only active when replicas are configured.
+    """
+
+    def __init__(self, app: Callable[..., Awaitable[None]]):
+        self.app = app
+
+    async def __call__(self, scope: Message, receive: Callable[[], Awaitable[Message]],
+                       send: Callable[[Message], Awaitable[None]]) -> None:
+        if scope["type"] != "http" or scope["method"] not in UNSAFE_METHODS or not read_replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.DATABASE_READ_YOUR_WRITES_SECONDS
+                cookie = (
+                    f"{READ_PRIMARY_COOKIE}={time.time() + window:.3f}; "
+                    f"Max-Age={int(window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
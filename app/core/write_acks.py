@@ -0,0 +1,122 @@
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.logger import LoggerService
+from app.core.metrics import registry
+
+logger = LoggerService.get_logger(__name__)
+
+write_wait_seconds = registry.histogram(
+    "inventory_write_wait_seconds", "Time a wait=true write waited for the consumer to apply its event", ("outcome",)
+)
+
+# Kafka record header carrying the id a waiting request is notified under
+CORRELATION_HEADER = "correlation-id"
+PENDING_ACKS = "pending_write_acks"
+NOTIFY_STATEMENT = text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload")
+
+Ack = Tuple[str, int]
+# asyncpg notification callback: (connection, pid, channel, payload)
+NotificationHandler = Callable[[object, int, str, str], None]
+
+class WriteAcks:
+    """Futures of requests waiting until the consumer has applied their event.
+
+    :meth:`expect` registers a waiter on the running loop before the event is produced;
+    :meth:`resolve` may be called from any thread (the consumer's) with the id of the
+    written item.
+    """
+
+    def __init__(self):
+        self.waiters: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.waiters)
+
+    def expect(self, correlation_id: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            self.waiters[correlation_id] = (loop, future)
+        return future
+
+    def discard(self, correlation_id: str) -> None:
+        with self.lock:
+            self.waiters.pop(correlation_id, None)
+
+    def resolve(self, correlation_id: str, item_id: int) -> None:
+        with self.lock:
+            waiter = self.waiters.pop(correlation_id, None)
+        if waiter is None:
+            return
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(resolve_waiter, future, item_id)
+        except RuntimeError:
+            pass  # The waiting request's loop is gone
+
+    def on_notify(self, _connection, _pid: int, _channel: str, payload: str) -> None:
+        correlation_id, _, item_id = payload.rpartition(":")
+        try:
+            self.resolve(correlation_id, int(item_id))
+        except ValueError:
+            LoggerService.warning(logger, "Ignoring malformed write ack %r", payload)
+
+def resolve_waiter(future: asyncio.Future, item_id: int) -> None:
+    if not future.done():
+        future.set_result(item_id)
+
+write_acks = WriteAcks()
+
+async def listen(database_url: str, handlers: Dict[str, NotificationHandler], reconnect_seconds: float = 1.0) -> None:
+    """LISTEN on every channel of ``handlers`` (PostgreSQL only), e.g. for acks of events
+    applied by consumers in other processes; reconnects whenever the connection is lost."""
+    import asyncpg
+
+    dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+    while True:
+        try:
+            connection = await asyncpg.connect(dsn)
+            try:
+                for channel, handler in handlers.items():
+                    await connection.add_listener(channel, handler)
+                LoggerService.info(logger, "Listening for notifications on %s", ", ".join(handlers))
+                # Returns when the connection is lost
+                closed = asyncio.get_running_loop().create_future()
+                connection.add_termination_listener(lambda _connection: closed.done() or closed.set_result(None))
+                await closed
+            finally:
+                await connection.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LoggerService.warning(logger, "Notification listener failed, reconnecting: %s", e)
+        await asyncio.sleep(reconnect_seconds)
+
+def record_applied_event(db: Session, correlation_id: str, item_id: int) -> None:
+    """Acknowledge an applied event once ``db`` commits; dropped if it rolls back."""
+    db.info.setdefault(PENDING_ACKS, []).append((correlation_id, item_id))
+
+@event.listens_for(Session, "before_commit")
+def notify_other_processes(db: Session) -> None:
+    acks: Optional[List[Ack]] = db.info.get(PENDING_ACKS)
+    if acks and settings.WRITE_ACK_LISTEN_NOTIFY and db.get_bind().dialect.name == "postgresql":
+        # NOTIFY is transactional: listeners hear about the acks only if the writes commit
+        db.execute(NOTIFY_STATEMENT, {
+            "channel": settings.WRITE_ACK_CHANNEL,
+            "payloads": [f"{correlation_id}:{item_id}" for correlation_id, item_id in acks],
+        })
+
+@event.listens_for(Session, "after_commit")
+def resolve_local_waiters(db: Session) -> None:
+    for correlation_id, item_id in db.info.pop(PENDING_ACKS, ()):
+        write_acks.resolve(correlation_id, item_id)
+
+@event.listens_for(Session, "after_rollback")
+def drop_acks(db: Session) -> None:
+    db.info.pop(PENDING_ACKS, None)
@@ -1,13 +1,22 @@
 from functools import lru_cache
 import threading
 import asyncio
-from typing import Dict
-from app.core.config import Settings
-from fastapi import FastAPI
+from typing import Any, Dict, List
+from app.core.config import Settings, settings
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.consumer import run_consumer
 from app.routers import items
-from app.services.kafka_service import kafka_service
-from app.services.items_service import create_item, update_item
+from app.services.kafka_service import kafka_service, write_admission
+from app.core.admission import Overloaded
+from app.core.database import check_database
 from app.core.logger import LoggerService
+from app.core.metrics import registry
+from app.core.monitoring import MetricsMiddleware, monitor_event_loop
+from app.core.readiness import readiness
+from app.core.replicas import ReadYourWritesMiddleware, read_replicas
+from app.core.write_acks import listen, write_acks
+from app.services.items_service import disable_change_tracking, on_change_notification
 
 logger = LoggerService.get_logger(__name__)
 
@@ -15,6 +24,8 @@ logger = LoggerService.get_logger(__name__)
 LoggerService.get_logger('kafka').setLevel(LoggerService.get_log_level('WARNING'))
 
 app = FastAPI()
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 @lru_cache()
 def get_settings():
@@ -22,36 +33,103 @@ def get_settings():
 
 app.include_router(items.router)
 
-def run_kafka_consumer() -> None:
-    # Run the Kafka consumer in a separate event loop
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    LoggerService.info(logger, "Starting Kafka consumer in a separate thread")
-    try:
-        loop.run_until_complete(kafka_service.consume_messages(create_item, update_item))
-    except Exception as e:
-        LoggerService.error(logger, f"Error in Kafka consumer thread: {e}")
-        raise 
+@app.exception_handler(Overloaded)
+def overloaded_handler(request: Request, e: Overloaded) -> JSONResponse:
+    # Raised by dependencies, e.g. get_kafka_service before the producer has connected
+    return JSONResponse({"detail": str(e)}, status_code=e.status_code, headers=e.headers)
+
+readiness.add("database", check_database)
+readiness.add("kafka", kafka_service.connect)
 
 @app.on_event("startup")
 async def startup_event() -> None:
-    try:
-        # Initialize Kafka producer
-        await kafka_service.initialize_producer()
-        LoggerService.info(logger, "Kafka producer initialized successfully")
-    except Exception as e:
-        LoggerService.error(logger, f"Failed to initialize Kafka producer: {e}")
-        raise RuntimeError(f"Error: Could not initialize Kafka producer. {str(e)}")
+    app.state.event_loop_monitor = asyncio.create_task(
+        monitor_event_loop(settings.EVENT_LOOP_MONITOR_INTERVAL_SECONDS)
+    )
+    app.state.replica_monitor = None
+    if read_replicas:
+        app.state.replica_monitor = asyncio.create_task(
+            read_replicas.monitor(settings.DATABASE_READ_HEALTH_CHECK_SECONDS)
+        )
+    app.state.lag_monitor = None
+    if settings.ADMISSION_MAX_CONSUMER_LAG:
+        app.state.lag_monitor = asyncio.create_task(
+            write_admission.monitor_lag(kafka_service.estimate_consumer_lag, settings.ADMISSION_LAG_CHECK_SECONDS)
+        )
+    # Acks of events applied by other processes' consumers, and the item changes they made
+    notifications = {}
+    postgresql = settings.DATABASE_URL.startswith("postgresql")
+    if settings.WRITE_ACK_LISTEN_NOTIFY and postgresql:
+        notifications[settings.WRITE_ACK_CHANNEL] = write_acks.on_notify
+    if settings.ITEM_CHANGES_LISTEN_NOTIFY and postgresql:
+        notifications[settings.ITEM_CHANGES_CHANNEL] = on_change_notification
+    app.state.notification_listener = None
+    if notifications:
+        app.state.notification_listener = asyncio.create_task(listen(settings.DATABASE_URL, notifications))
+
+    # The consumer thread started below is ready while it consumes, and not while it is
+    # retrying a batch (e.g. with the database down) or has stopped
+    if not settings.API_ONLY:
+        readiness.add("consumer", kafka_service.check_consumer)
+    # Kafka and the database are connected in the background (GET /readyz), so the app
+    # serves right away; writes get 503 until the producer is connected
+    app.state.readiness_monitor = asyncio.create_task(readiness.monitor(
+        settings.READINESS_CHECK_SECONDS, settings.STARTUP_RETRY_INITIAL_SECONDS, settings.STARTUP_RETRY_MAX_SECONDS,
+    ))
+
+    app.state.consumer_thread = None
+    if settings.API_ONLY:
+        LoggerService.info(logger, "API-only mode: events are applied by `python -m app.consumer`")
+        if not settings.WRITE_ACK_LISTEN_NOTIFY:
+            LoggerService.warning(logger, "API-only mode without WRITE_ACK_LISTEN_NOTIFY: wait=true writes will time out")
+        if settings.ITEM_CHANGES_CHANNEL not in notifications:
+            disable_change_tracking("API-only mode without ITEM_CHANGES_LISTEN_NOTIFY on PostgreSQL")
+        return
 
     try:
-        # Start Kafka consumer in a separate thread
-        consumer_thread = threading.Thread(target=run_kafka_consumer, daemon=True)
-        consumer_thread.start()
+        # Start Kafka consumer in a separate thread; it retries until the brokers are reachable
+        app.state.consumer_thread = threading.Thread(target=run_consumer, name="kafka-consumer", daemon=True)
+        app.state.consumer_thread.start()
         LoggerService.info(logger, "Kafka consumer thread started")
     except Exception as e:
-        LoggerService.error(logger, f"Failed to start Kafka consumer thread: {e}")
+        LoggerService.error(logger, "Failed to start Kafka consumer thread: %s", e)
         raise RuntimeError(f"Error: Could not start Kafka consumer thread. {str(e)}")
 
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+    app.state.event_loop_monitor.cancel()
+    app.state.readiness_monitor.cancel()
+    if app.state.replica_monitor:
+        app.state.replica_monitor.cancel()
+    if app.state.notification_listener:
+        app.state.notification_listener.cancel()
+    if app.state.lag_monitor:
+        app.state.lag_monitor.cancel()
+    if app.state.consumer_thread:
+        # Lets the consumer finish its batch and commit before the producers go away
+        kafka_service.stop()
+        app.state.consumer_thread.join(timeout=10)
+    # Flush lingering producer batches before the process exits
+    kafka_service.close()
+    LoggerService.info(logger, "Kafka producers closed")
+
 @app.get("/")
 def read_root() -> Dict[str, str]:
     return {"message": "Inventory Management Service"}
+
+@app.get("/healthz")
+def read_liveness() -> Dict[str, str]:
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def read_readiness() -> JSONResponse:
+    status = readiness.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/health/replicas")
+def read_replica_health() -> Dict[str, List[Dict[str, Any]]]:
+    return {"replicas": read_replicas.status()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
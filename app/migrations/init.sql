@@ -15,6 +15,22 @@ CREATE TABLE IF NOT EXISTS inventory.items (
     description TEXT
 );
 
+-- Kafka consumer state: ids of applied events (deduplication) and the offsets to resume
+-- from, both written in the transaction that applies the events
+CREATE TABLE IF NOT EXISTS inventory.processed_events (
+    event_id TEXT PRIMARY KEY,
+    processed_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_inventory_processed_events_processed_at ON inventory.processed_events (processed_at);
+
+CREATE TABLE IF NOT EXISTS inventory.consumer_offsets (
+    group_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    partition INTEGER NOT NULL,
+    next_offset BIGINT NOT NULL,
+    PRIMARY KEY (group_id, topic, partition)
+);
+
 -- Insert dump data
 INSERT INTO inventory.items (name, description) VALUES
     ('Laptop', 'High-performance laptop'),
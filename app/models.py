@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
 from app.core.database import Base
 
 class Item(Base):
@@ -8,3 +8,21 @@ class Item(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String)
+
+class ProcessedEvent(Base):
+    """Ids of applied Kafka events, written in the transaction that applied them."""
+    __tablename__ = 'processed_events'
+    __table_args__ = {'schema': 'inventory'}
+
+    event_id = Column(String, primary_key=True)
+    processed_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class ConsumerOffset(Base):
+    """Next offset to consume per partition, written in the transaction that applied the events before it."""
+    __tablename__ = 'consumer_offsets'
+    __table_args__ = {'schema': 'inventory'}
+
+    group_id = Column(String, primary_key=True)
+    topic = Column(String, primary_key=True)
+    partition = Column(Integer, primary_key=True)
+    next_offset = Column(BigInteger, nullable=False)
@@ -1,81 +1,401 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.schemas import ItemCreate, ItemUpdate, ItemResponse
+import asyncio
+import json
+import time
+from functools import partial
+import orjson
+from typing import Annotated, Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Type
+from uuid import uuid4
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.admission import Overloaded
+from app.core.change_feed import FeedFull, FeedUnavailable, ResumeUnavailable, Subscription
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.replicas import get_async_read_db, read_sessionmaker
+from app.core.write_acks import write_acks, write_wait_seconds
+from app.schemas import ITEM_ID_MAX, ITEM_ID_MIN, BulkItemResult, BulkResponse, ItemBulkUpdate, ItemCreate, ItemUpdate, ItemResponse
 from app.services.items_service import (
+    decode_cursor,
     delete_item as delete_item_service,
+    encode_cursor,
+    get_applied_item,
     produce_item_creation_event,
+    produce_item_creation_events,
     get_item_by_id,
-    get_items,
+    get_item_rows,
+    item_changes,
     produce_item_update_event,
+    produce_item_update_events,
+    stream_item_rows,
 )
-from app.services.kafka_service import get_kafka_service, KafkaService
+from app.services.copy_service import export_items, import_items
+from app.services.kafka_service import get_kafka_service, KafkaService, write_admission
 from app.core.logger import LoggerService
 
 router = APIRouter(prefix="/items", tags=["items"])
 logger = LoggerService.get_logger(__name__)
 
 def handle_exception(operation: str, e: Exception) -> None:
-    LoggerService.error(logger, f"Error during {operation}: {str(e)}")
+    LoggerService.error(logger, "Error during %s: %s", operation, e)
     if isinstance(e, HTTPException):
         raise e
+    if isinstance(e, Overloaded):
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
     raise HTTPException(status_code=500, detail=f"An error occurred during {operation}")
 
+async def admit_write(request: Request) -> AsyncIterator[None]:
+    """Admission control for routes producing Kafka events: 503/429 with Retry-After when shed."""
+    try:
+        write_admission.enter(request.client.host if request.client else "unknown")
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    try:
+        yield
+    finally:
+        write_admission.leave()
+
+ADMIT_WRITE = [Depends(admit_write)]
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+    "csv": "text/csv",
+}
+
+def parse_cursor(after: Optional[str]) -> Optional[int]:
+    if after is None:
+        return None
+    try:
+        return decode_cursor(after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Item listings skip the ORM and Pydantic: (name, description, id) rows go straight to orjson,
+# which writes the same bytes FastAPI produces for List[ItemResponse] (field order included)
+def item_row_json(row: Tuple[str, Optional[str], int]) -> Dict[str, Any]:
+    name, description, id = row
+    return {"name": name, "description": description, "id": id}
+
+def encode_item_rows(rows: List[Tuple[str, Optional[str], int]]) -> bytes:
+    return orjson.dumps([item_row_json(row) for row in rows])
+
+async def stream_items(db: AsyncSession, after: Optional[int], stream_format: str) -> AsyncIterator[bytes]:
+    # The stream outlives the request-scoped session, so it owns its own, on the same database
+    async with read_sessionmaker(db)() as stream_db:
+        first = True
+        if stream_format == "json":
+            yield b"["
+        async for item in stream_item_rows(stream_db, after):
+            row = orjson.dumps(item_row_json(item))
+            if stream_format == "ndjson":
+                yield row + b"\n"
+            else:
+                yield row if first else b"," + row
+            first = False
+        if stream_format == "json":
+            yield b"]"
+
 # GET all items
 @router.get("/", response_model=List[ItemResponse])
-def read_items(db: Session = Depends(get_db)) -> List[ItemResponse]:
+async def read_items(
+    limit: int = Query(settings.ITEMS_PAGE_SIZE, ge=1, le=settings.ITEMS_MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Opaque cursor taken from the X-Next-Cursor header"),
+    stream: Optional[Literal["ndjson", "json"]] = Query(None, description="Stream every item after the cursor"),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> List[ItemResponse]:
     try:
-        all_items = get_items(db)
-        LoggerService.info(logger, f"Retrieved {len(all_items)} items")
-        return all_items
+        after_id = parse_cursor(after)
+        if stream:
+            LoggerService.info(logger, "Streaming items as %s", stream)
+            return StreamingResponse(stream_items(db, after_id, stream), media_type=STREAM_MEDIA_TYPES[stream])
+
+        rows = await db.run_sync(get_item_rows, limit, after_id)
+        headers = {"X-Next-Cursor": encode_cursor(rows[-1].id)} if len(rows) == limit else None
+        return Response(encode_item_rows(rows), media_type="application/json", headers=headers)
     except Exception as e:
         handle_exception("items retrieval", e)
 
+async def change_events(subscribe: Callable[[], Subscription]) -> AsyncIterator[bytes]:
+    # Subscribes on the first iteration: a stream that never starts (the client left before
+    # the response began) never reaches the finally below, and would leak its subscription
+    try:
+        subscription = subscribe()
+    except (FeedFull, FeedUnavailable, ResumeUnavailable) as e:
+        # Changed since the route checked; a reconnect gets the error status
+        LoggerService.warning(logger, "Change feed subscription failed after it was checked: %s", e)
+        return
+    # Events are pre-encoded Server-Sent Events frames, written as they come. The first
+    # frame carries the starting position, so a reconnect before any change still resumes.
+    last_seq = subscription.start_seq
+    try:
+        yield b"id: %s\nevent: subscribed\ndata: {}\n\n" % subscription.position(last_seq).encode()
+        while True:
+            events = await subscription.next_events()
+            if events:
+                last_seq = events[-1][0]
+                yield b"".join(frame for _, frame in events)
+            elif subscription.dropped:
+                # Too slow to keep up: tell the client where to resume, then end the stream
+                resume = {"resume_after": subscription.position(last_seq)}
+                yield b"event: dropped\ndata: %s\n\n" % orjson.dumps(resume)
+                return
+            else:
+                yield b": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+# GET a Server-Sent Events stream of committed item changes (declared before /{id})
+@router.get("/changes")
+async def stream_item_changes(
+    request: Request,
+    after: Optional[str] = Query(None, description="Resume after this event id (or send a Last-Event-ID header)"),
+) -> StreamingResponse:
+    position = after or request.headers.get("Last-Event-ID")
+    try:
+        item_changes.check_subscribe(position)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ResumeUnavailable as e:
+        # The client has to re-read GET /items and subscribe again without a position
+        raise HTTPException(status_code=410, detail=str(e))
+    except FeedFull as e:
+        LoggerService.warning(logger, "Rejected change feed subscriber: %s", e)
+        raise HTTPException(status_code=503, detail="Too many change feed subscribers", headers={"Retry-After": "5"})
+    except FeedUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"The change feed is disabled: {e}")
+    return StreamingResponse(
+        change_events(partial(item_changes.subscribe, position)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# GET all items as a CSV or NDJSON dump (declared before /{id} so "export" is not taken for an id)
+@router.get("/export")
+def export_all_items(format: Literal["ndjson", "csv"] = "ndjson") -> StreamingResponse:
+    try:
+        LoggerService.info(logger, "Exporting items as %s", format)
+        return StreamingResponse(export_items(format), media_type=STREAM_MEDIA_TYPES[format])
+    except Exception as e:
+        handle_exception("items export", e)
+
+# POST a CSV or NDJSON dump to upsert
+@router.post("/import")
+async def import_all_items(request: Request, format: Literal["ndjson", "csv"] = "ndjson") -> dict:
+    try:
+        return await import_items(request.stream(), format)
+    except ValueError as e:
+        LoggerService.error(logger, "Error during items import: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        handle_exception("items import", e)
+
+ItemId = Annotated[int, Path(ge=ITEM_ID_MIN, le=ITEM_ID_MAX)]
+
 # GET item by ID
 @router.get("/{id}", response_model=ItemResponse)
-def read_item(id: int, db: Session = Depends(get_db)) -> ItemResponse:
+async def read_item(id: ItemId, db: AsyncSession = Depends(get_async_read_db)) -> ItemResponse:
     try:
-        item = get_item_by_id(db, id)
+        item = await db.run_sync(get_item_by_id, id)
         if not item:
-            LoggerService.warning(logger, f"Item with id {id} not found")
+            LoggerService.warning(logger, "Item with id %s not found", id)
             raise HTTPException(status_code=404, detail="Item not found")
-        LoggerService.info(logger, f"Retrieved item with id {id}")
         return item
     except Exception as e:
         handle_exception(f"retrieval of item {id}", e)
 
+WAIT_QUERY = Query(False, description="Wait until the consumer has applied the event and return the item")
+TIMEOUT_MS_QUERY = Query(settings.ITEMS_WAIT_TIMEOUT_MS, ge=1, le=settings.ITEMS_WAIT_MAX_TIMEOUT_MS)
+
+async def wait_until_applied(produce: Callable[[str], Awaitable[None]], timeout_ms: int) -> Tuple[str, Optional[int]]:
+    """Produce an event under a new correlation id and wait for the consumer to apply it.
+
+    Returns the correlation id and the id of the written item, or None on timeout. The
+    waiter is registered before producing, so an ack can never arrive unobserved.
+    """
+    correlation_id = uuid4().hex
+    applied = write_acks.expect(correlation_id)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        await produce(correlation_id)
+        try:
+            item_id = await asyncio.wait_for(applied, timeout_ms / 1000)
+            outcome = "applied"
+            return correlation_id, item_id
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            return correlation_id, None
+    finally:
+        write_acks.discard(correlation_id)
+        write_wait_seconds.observe(time.perf_counter() - started, outcome=outcome)
+
+async def applied_item_response(db: AsyncSession, id: int) -> Dict[str, Any]:
+    item = await db.run_sync(get_applied_item, id)
+    if not item:
+        # Applied, but the item is gone: an update of a missing item, or a delete since
+        LoggerService.warning(logger, "Item with id %s not found after applying its event", id)
+        raise HTTPException(status_code=404, detail="Item not found")
+    return ItemResponse.model_validate(item).model_dump()
+
 # POST new item
-@router.post("/", status_code=202)
-async def create_new_item(item: ItemCreate, kafka_service: KafkaService = Depends(get_kafka_service)) -> dict:
+@router.post("/", status_code=202, dependencies=ADMIT_WRITE)
+async def create_new_item(item: ItemCreate, response: Response, wait: bool = WAIT_QUERY,
+                          timeout_ms: int = TIMEOUT_MS_QUERY,
+                          kafka_service: KafkaService = Depends(get_kafka_service),
+                          db: AsyncSession = Depends(get_async_db)) -> dict:
     try:
-        await produce_item_creation_event(kafka_service, item)
-        LoggerService.info(logger, f"Item creation event produced for {item.name}")
-        return {"detail": "Item creation event produced"}
+        if not wait:
+            await produce_item_creation_event(kafka_service, item)
+            LoggerService.info(logger, "Item creation event produced for %s", item.name)
+            return {"detail": "Item creation event produced"}
+
+        correlation_id, id = await wait_until_applied(
+            lambda correlation_id: produce_item_creation_event(kafka_service, item, correlation_id), timeout_ms
+        )
+        if id is None:
+            LoggerService.warning(logger, "Item creation %s not applied within %s ms", correlation_id, timeout_ms)
+            return {"detail": "Item creation event produced", "correlation_id": correlation_id}
+        response.status_code = 201
+        return await applied_item_response(db, id)
     except Exception as e:
         handle_exception("item creation", e)
 
+async def read_bulk_elements(request: Request) -> Tuple[List[Any], Dict[int, str]]:
+    """Parse a JSON array or NDJSON body, enforcing the bulk size limits.
+
+    Returns the raw elements plus the NDJSON lines that were not valid JSON, by index.
+    """
+    declared_length = request.headers.get("content-length")
+    if declared_length:
+        try:
+            declared_bytes = int(declared_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+        if declared_bytes > settings.BULK_MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail=f"Body exceeds {settings.BULK_MAX_BODY_BYTES} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > settings.BULK_MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail=f"Body exceeds {settings.BULK_MAX_BODY_BYTES} bytes")
+
+    parse_errors: Dict[int, str] = {}
+    if "ndjson" in request.headers.get("content-type", ""):
+        elements: List[Any] = []
+        for line in bytes(body).splitlines():
+            if not line.strip():
+                continue
+            try:
+                elements.append(json.loads(line))
+            except ValueError as e:
+                parse_errors[len(elements)] = f"Invalid JSON: {e}"
+                elements.append(None)
+    else:
+        try:
+            elements = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(elements, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+
+    if not elements:
+        raise HTTPException(status_code=400, detail="No items given")
+    if len(elements) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} items per request")
+    return elements, parse_errors
+
+BULK_ADAPTERS: Dict[Type[BaseModel], TypeAdapter] = {
+    ItemCreate: TypeAdapter(List[ItemCreate]),
+    ItemBulkUpdate: TypeAdapter(List[ItemBulkUpdate]),
+}
+
+def validate_bulk_elements(elements: List[Any], errors: Dict[int, str],
+                           model: Type[BaseModel]) -> List[Tuple[int, BaseModel]]:
+    """Validate all elements in one pass; invalid ones are recorded in ``errors`` by index."""
+    candidates = [(index, element) for index, element in enumerate(elements) if index not in errors]
+    try:
+        validated = BULK_ADAPTERS[model].validate_python([element for _, element in candidates])
+        return [(index, item) for (index, _), item in zip(candidates, validated)]
+    except ValidationError as e:
+        for error in e.errors():
+            index = candidates[error["loc"][0]][0]
+            field = ".".join(str(part) for part in error["loc"][1:])
+            errors.setdefault(index, f"{field}: {error['msg']}" if field else error["msg"])
+        return [(index, model.model_validate(element)) for index, element in candidates if index not in errors]
+
+def bulk_response(total: int, errors: Dict[int, str]) -> BulkResponse:
+    results = [BulkItemResult(index=index, accepted=index not in errors, error=errors.get(index)) for index in range(total)]
+    return BulkResponse(accepted=total - len(errors), rejected=len(errors), results=results)
+
+def record_produce_errors(items: List[Tuple[int, BaseModel]], produce_errors: List[Optional[BaseException]],
+                          errors: Dict[int, str]) -> None:
+    for (index, _), error in zip(items, produce_errors):
+        if error is not None:
+            errors[index] = f"Event could not be produced: {error}"
+
+# POST many new items
+@router.post("/bulk", status_code=202, response_model=BulkResponse, dependencies=ADMIT_WRITE)
+async def create_items_bulk(request: Request, kafka_service: KafkaService = Depends(get_kafka_service)) -> BulkResponse:
+    try:
+        elements, errors = await read_bulk_elements(request)
+        items = validate_bulk_elements(elements, errors, ItemCreate)
+        if items:
+            produce_errors = await produce_item_creation_events(kafka_service, [item for _, item in items])
+            record_produce_errors(items, produce_errors, errors)
+        LoggerService.info(logger, "Bulk creation: %s accepted, %s rejected", len(elements) - len(errors), len(errors))
+        return bulk_response(len(elements), errors)
+    except Exception as e:
+        handle_exception("bulk item creation", e)
+
+# PUT many item updates
+@router.put("/bulk", status_code=202, response_model=BulkResponse, dependencies=ADMIT_WRITE)
+async def update_items_bulk(request: Request, kafka_service: KafkaService = Depends(get_kafka_service)) -> BulkResponse:
+    try:
+        elements, errors = await read_bulk_elements(request)
+        items = validate_bulk_elements(elements, errors, ItemBulkUpdate)
+        if items:
+            produce_errors = await produce_item_update_events(kafka_service, [item for _, item in items])
+            record_produce_errors(items, produce_errors, errors)
+        LoggerService.info(logger, "Bulk update: %s accepted, %s rejected", len(elements) - len(errors), len(errors))
+        return bulk_response(len(elements), errors)
+    except Exception as e:
+        handle_exception("bulk item update", e)
+
 # PUT update item
-@router.put("/{id}", status_code=202)
-async def update_item(id: int, item: ItemUpdate, kafka_service: KafkaService = Depends(get_kafka_service)) -> dict:
+@router.put("/{id}", status_code=202, dependencies=ADMIT_WRITE)
+async def update_item(id: ItemId, item: ItemUpdate, response: Response, wait: bool = WAIT_QUERY,
+                      timeout_ms: int = TIMEOUT_MS_QUERY,
+                      kafka_service: KafkaService = Depends(get_kafka_service),
+                      db: AsyncSession = Depends(get_async_db)) -> dict:
     try:
-        await produce_item_update_event(kafka_service, id, item)
+        if not wait:
+            await produce_item_update_event(kafka_service, id, item)
+            LoggerService.info(logger, "Item update event produced for item %s", id)
+            return {"detail": "Item update event produced"}
 
-        LoggerService.info(logger, f"Item update event produced for item {id}")
-        return {"detail": "Item update event produced"}
+        correlation_id, applied_id = await wait_until_applied(
+            lambda correlation_id: produce_item_update_event(kafka_service, id, item, correlation_id), timeout_ms
+        )
+        if applied_id is None:
+            LoggerService.warning(logger, "Update of item %s (%s) not applied within %s ms", id, correlation_id, timeout_ms)
+            return {"detail": "Item update event produced", "correlation_id": correlation_id}
+        response.status_code = 200
+        return await applied_item_response(db, id)
     except Exception as e:
         handle_exception(f"update of item {id}", e)
 
 # DELETE item
 @router.delete("/{id}")
-def delete_item(id: int, db: Session = Depends(get_db)) -> dict:
+async def delete_item(id: ItemId, db: AsyncSession = Depends(get_async_db)) -> dict:
     try:
-        item = delete_item_service(db, id)
+        item = await db.run_sync(delete_item_service, id)
         if not item:
-            LoggerService.warning(logger, f"Item with id {id} not found")
+            LoggerService.warning(logger, "Item with id %s not found", id)
             raise HTTPException(status_code=404, detail="Item not found")
 
-        LoggerService.info(logger, f"Deleted item with id {id}")
+        LoggerService.info(logger, "Deleted item with id %s", id)
         return {"detail": "Item deleted"}
     except Exception as e:
         handle_exception(f"deletion of item {id}", e)
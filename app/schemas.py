@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+# Ids past 64 bits could never be stored, and Kafka events cannot carry them
+ITEM_ID_MIN, ITEM_ID_MAX = -2 ** 63, 2 ** 63 - 1
 
 class ItemBase(BaseModel):
     name: str
@@ -15,3 +19,16 @@ class ItemResponse(ItemBase):
 
     class Config:
         from_attributes = True
+
+class ItemBulkUpdate(ItemUpdate):
+    id: int = Field(ge=ITEM_ID_MIN, le=ITEM_ID_MAX)
+
+class BulkItemResult(BaseModel):
+    index: int
+    accepted: bool
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BulkItemResult]
@@ -0,0 +1,93 @@
+"""Kafka consumer state kept next to the items: applied event ids and partition offsets.
+
+Both are written by ``before_commit`` in the transaction that applies the events, so after
+a crash the database either has the writes, their event ids and the offset past them, or
+none of it. Kafka's committed offsets then only need to be committed lazily.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.logger import LoggerService
+from app.models import ConsumerOffset, ProcessedEvent
+
+logger = LoggerService.get_logger(__name__)
+
+PENDING_EVENT_IDS = "pending_processed_event_ids"
+PENDING_OFFSETS = "pending_consumer_offsets"
+
+# (topic, partition) -> next offset to consume
+Offsets = Dict[Tuple[str, int], int]
+
+UPSERT_DIALECTS = {"postgresql": postgresql, "sqlite": sqlite}
+
+def record_processed_events(db: Session, event_ids: Iterable[str]) -> None:
+    """Mark events as applied by the transaction ``db`` commits next."""
+    db.info.setdefault(PENDING_EVENT_IDS, []).extend(event_ids)
+
+def record_consumed_offsets(db: Session, group_id: str, offsets: Offsets) -> None:
+    """Store the offsets to resume from with the transaction ``db`` commits next."""
+    db.info.setdefault(PENDING_OFFSETS, {}).setdefault(group_id, {}).update(offsets)
+
+def upsert_offsets(dialect_name: str):
+    statement = UPSERT_DIALECTS[dialect_name].insert(ConsumerOffset.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=["group_id", "topic", "partition"],
+        set_={"next_offset": statement.excluded.next_offset},
+    )
+
+@event.listens_for(Session, "before_commit")
+def write_consumer_state(db: Session) -> None:
+    event_ids: List[str] = db.info.pop(PENDING_EVENT_IDS, None)
+    offsets: Dict[str, Offsets] = db.info.pop(PENDING_OFFSETS, None)
+    if event_ids:
+        processed_at = datetime.now(timezone.utc)
+        db.execute(insert(ProcessedEvent), [{"event_id": id, "processed_at": processed_at} for id in event_ids])
+    if offsets:
+        db.execute(upsert_offsets(db.get_bind().dialect.name), [
+            {"group_id": group_id, "topic": topic, "partition": partition, "next_offset": offset}
+            for group_id, group_offsets in offsets.items()
+            for (topic, partition), offset in group_offsets.items()
+        ])
+
+@event.listens_for(Session, "after_rollback")
+def drop_consumer_state(db: Session) -> None:
+    db.info.pop(PENDING_EVENT_IDS, None)
+    db.info.pop(PENDING_OFFSETS, None)
+
+def processed_event_ids(db: Session, event_ids: List[str]) -> Set[str]:
+    """The subset of ``event_ids`` that has been applied already."""
+    if not event_ids:
+        return set()
+    try:
+        return set(db.scalars(select(ProcessedEvent.event_id).where(ProcessedEvent.event_id.in_(event_ids))))
+    except SQLAlchemyError as e:
+        LoggerService.error(logger, "Database error while looking up processed events: %s", e)
+        raise
+
+def stored_offsets(db: Session, group_id: str) -> Offsets:
+    try:
+        rows = db.execute(
+            select(ConsumerOffset.topic, ConsumerOffset.partition, ConsumerOffset.next_offset)
+            .where(ConsumerOffset.group_id == group_id)
+        )
+        return {(topic, partition): offset for topic, partition, offset in rows}
+    except SQLAlchemyError as e:
+        LoggerService.error(logger, "Database error while loading consumer offsets: %s", e)
+        raise
+
+def prune_processed_events(db: Session, retention_seconds: float) -> int:
+    """Forget event ids older than the retention; their events can no longer be replayed."""
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=retention_seconds)
+        deleted = db.execute(delete(ProcessedEvent).where(ProcessedEvent.processed_at < cutoff)).rowcount
+        db.commit()
+        if deleted:
+            LoggerService.info(logger, "Pruned %s processed event ids", deleted)
+        return deleted
+    except SQLAlchemyError as e:
+        db.rollback()
+        LoggerService.error(logger, "Database error while pruning processed events: %s", e)
+        raise
@@ -0,0 +1,262 @@
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+from app.core.database import engine
+from app.core.logger import LoggerService
+from app.services.items_service import item_cache, item_changes
+
+logger = LoggerService.get_logger(__name__)
+
+COPY_CHUNK_BYTES = 64 * 1024
+PIPE_MAX_CHUNKS = 16
+
+# A CSV dialect whose quote and delimiter bytes never occur in JSON text, so each
+# NDJSON line passes through COPY verbatim as a single column
+RAW_LINES = "FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02'"
+
+EXPORT_STATEMENTS = {
+    "csv": "COPY (SELECT id, name, description FROM inventory.items ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER true)",
+    # Same key order as ItemResponse
+    "ndjson": (
+        "COPY (SELECT row_to_json(i) FROM (SELECT name, description, id FROM inventory.items ORDER BY id) i) "
+        f"TO STDOUT WITH ({RAW_LINES})"
+    ),
+}
+
+STAGING_STATEMENTS = {
+    "csv": [
+        "CREATE TEMP TABLE items_import (id integer, name text, description text) ON COMMIT DROP",
+    ],
+    "ndjson": [
+        "CREATE TEMP TABLE items_import_lines (doc json) ON COMMIT DROP",
+        "CREATE TEMP TABLE items_import (id integer, name text, description text) ON COMMIT DROP",
+    ],
+}
+
+COPY_IN_STATEMENTS = {
+    "csv": "COPY items_import (id, name, description) FROM STDIN WITH (FORMAT csv, HEADER true)",
+    "ndjson": f"COPY items_import_lines (doc) FROM STDIN WITH ({RAW_LINES})",
+}
+
+NDJSON_TO_STAGING = (
+    "INSERT INTO items_import (id, name, description) "
+    "SELECT (doc->>'id')::integer, doc->>'name', doc->>'description' FROM items_import_lines WHERE doc IS NOT NULL"
+)
+
+# Rows with an id are upserted (the last row wins when an id repeats), rows without one are inserted
+UPSERT_FROM_STAGING = """
+    INSERT INTO inventory.items (id, name, description)
+    SELECT DISTINCT ON (id) id, name, description FROM items_import
+    WHERE id IS NOT NULL
+    ORDER BY id, ctid DESC
+    ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, description = EXCLUDED.description
+"""
+INSERT_FROM_STAGING = "INSERT INTO inventory.items (name, description) SELECT name, description FROM items_import WHERE id IS NULL"
+# Keep the serial ahead of explicitly imported ids. It only ever moves forward: a MAX(id) of
+# inventory.items misses the rows of concurrent uncommitted writes, whose ids it would reissue
+SYNC_ID_SEQUENCE = (
+    "SELECT setval(pg_get_serial_sequence('inventory.items', 'id'), imported.max_id) "
+    "FROM (SELECT MAX(id) AS max_id FROM items_import) imported "
+    "WHERE imported.max_id > nextval(pg_get_serial_sequence('inventory.items', 'id'))"
+)
+
+class ChunkPipe:
+    """Bounded, thread-safe byte pipe between a blocking COPY and a streaming HTTP body.
+
+    COPY reads from it (``read``) on import and writes to it (``write``) on export. Either
+    side can ``abort`` it, which makes the other side fail instead of blocking forever.
+    On import the body is written from the event loop with ``put_async``, which waits for
+    space without holding a thread.
+    """
+
+    def __init__(self, max_chunks: int = PIPE_MAX_CHUNKS):
+        self.chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(max_chunks)
+        self.pending = bytearray()
+        self.buffer = b""
+        self.aborted = threading.Event()
+        # Set by put_async: wakes its writer when a chunk is taken or the pipe is aborted
+        self.space: Optional[asyncio.Event] = None
+        self.on_space: Optional[Callable[[], None]] = None
+
+    def put(self, chunk: Optional[bytes]) -> None:
+        while not self.aborted.is_set():
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise BrokenPipeError("The other end of the COPY pipe went away")
+
+    async def put_async(self, chunk: Optional[bytes]) -> None:
+        if self.space is None:
+            loop = asyncio.get_running_loop()
+            space = self.space = asyncio.Event()
+            self.on_space = lambda: loop.call_soon_threadsafe(space.set)
+        while not self.aborted.is_set():
+            # Cleared before trying, so a chunk taken after a failed try still wakes the wait
+            self.space.clear()
+            try:
+                self.chunks.put_nowait(chunk)
+                return
+            except queue.Full:
+                await self.space.wait()
+        raise BrokenPipeError("The other end of the COPY pipe went away")
+
+    def notify_space(self) -> None:
+        if self.on_space is not None:
+            self.on_space()
+
+    def get(self) -> Optional[bytes]:
+        while not self.aborted.is_set():
+            try:
+                chunk = self.chunks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.notify_space()
+            return chunk
+        raise BrokenPipeError("The other end of the COPY pipe went away")
+
+    def abort(self) -> None:
+        self.aborted.set()
+        self.notify_space()
+
+    # File-like interface used by cursor.copy_expert
+    def write(self, data) -> int:
+        self.pending.extend(data.encode("utf-8") if isinstance(data, str) else data)
+        if len(self.pending) >= COPY_CHUNK_BYTES:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        if self.pending:
+            self.put(bytes(self.pending))
+            self.pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.put(None)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.buffer:
+            chunk = self.get()
+            if chunk is None:
+                self.chunks.put(None)  # stay at EOF for further reads
+                return b""
+            self.buffer = chunk
+        if size is None or size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+def export_items(export_format: str) -> Iterator[bytes]:
+    """Stream ``inventory.items`` as CSV or NDJSON straight from COPY ... TO STDOUT."""
+    pipe = ChunkPipe()
+
+    def run_copy() -> None:
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(EXPORT_STATEMENTS[export_format], pipe, size=COPY_CHUNK_BYTES)
+            pipe.close()
+        except Exception as e:
+            if not pipe.aborted.is_set():
+                LoggerService.error(logger, "Database error while exporting items: %s", e)
+            pipe.abort()
+            # An interrupted COPY leaves the connection mid-protocol; never reuse it
+            connection.invalidate()
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run_copy, name="items-export", daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = pipe.get()
+            if chunk is None:
+                break
+            yield chunk
+        LoggerService.info(logger, "Exported items as %s", export_format)
+    finally:
+        # Stops the COPY if the client went away mid-stream
+        pipe.abort()
+
+def copy_into_staging(pipe: ChunkPipe, import_format: str) -> Dict[str, int]:
+    dbapi = engine.dialect.loaded_dbapi
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            for statement in STAGING_STATEMENTS[import_format]:
+                cursor.execute(statement)
+            cursor.copy_expert(COPY_IN_STATEMENTS[import_format], pipe, size=COPY_CHUNK_BYTES)
+            if import_format == "ndjson":
+                cursor.execute(NDJSON_TO_STAGING)
+            cursor.execute(UPSERT_FROM_STAGING)
+            upserted = cursor.rowcount
+            cursor.execute(INSERT_FROM_STAGING)
+            inserted = cursor.rowcount
+            cursor.execute(SYNC_ID_SEQUENCE)
+        connection.commit()
+        return {"upserted": upserted, "inserted": inserted}
+    except (dbapi.DataError, dbapi.IntegrityError) as e:
+        connection.invalidate()
+        # Bad rows in the upload, not a server fault
+        raise ValueError(f"Import rejected: {str(e).strip()}") from e
+    except Exception:
+        connection.invalidate()
+        raise
+    finally:
+        pipe.abort()
+        connection.close()
+
+def start_copy_into_staging(pipe: ChunkPipe, import_format: str) -> "asyncio.Future[Dict[str, int]]":
+    """Run :func:`copy_into_staging` on a thread of its own, not the loop's default executor.
+
+    The COPY blocks on the pipe until the whole body has arrived; on executor threads,
+    concurrent imports could take all of them and leave nothing to run anything else.
+    """
+    loop = asyncio.get_running_loop()
+    copied: "asyncio.Future[Dict[str, int]]" = loop.create_future()
+
+    def settle(set_outcome: Callable[[Any], None], outcome: Any) -> None:
+        if not copied.done():
+            set_outcome(outcome)
+
+    def run_copy() -> None:
+        try:
+            counts = copy_into_staging(pipe, import_format)
+        except BaseException as e:
+            loop.call_soon_threadsafe(settle, copied.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(settle, copied.set_result, counts)
+
+    threading.Thread(target=run_copy, name="items-import", daemon=True).start()
+    return copied
+
+async def import_items(body: AsyncIterator[bytes], import_format: str) -> Dict[str, int]:
+    """Stream a CSV or NDJSON body into COPY ... FROM STDIN and upsert it through a staging table.
+
+    Memory stays bounded by the pipe: reading the body waits whenever COPY falls behind.
+    """
+    pipe = ChunkPipe()
+    copy = start_copy_into_staging(pipe, import_format)
+    try:
+        async for chunk in body:
+            if chunk:
+                await pipe.put_async(chunk)
+        await pipe.put_async(None)
+    except BrokenPipeError:
+        pass  # COPY failed; its error is raised below
+    except BaseException:
+        pipe.abort()
+        raise
+    counts = await copy
+
+    item_cache.invalidate()
+    # Rows are not returned one by one; change feed subscribers should re-read the items
+    item_changes.publish("imported", None, counts)
+    LoggerService.info(logger, "Imported items from %s: %s", import_format, counts)
+    return counts
@@ -1,102 +1,342 @@
-from typing import List, Optional
+import base64
+import binascii
+import orjson
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import uuid4
+from sqlalchemy import Select, bindparam, column, delete, event, insert, select, update, values
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from app.core.cache import MISSING, TTLCache
+from app.core.change_feed import ChangeFeed
 from app.core.config import settings
+from app.core.replicas import REPLICA_INFO_KEY
+from app.core.write_acks import CORRELATION_HEADER, NOTIFY_STATEMENT
 from app.models import Item
-from app.schemas import ItemCreate, ItemUpdate
+from app.schemas import ItemBulkUpdate, ItemCreate, ItemUpdate
 from app.services.kafka_service import KafkaService
 from app.core.logger import LoggerService
 
 logger = LoggerService.get_logger(__name__)
 
-def get_items(db: Session) -> List[Item]:
+item_cache = TTLCache(
+    "items",
+    capacity=settings.ITEM_CACHE_CAPACITY,
+    ttl_seconds=settings.ITEM_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.ITEM_CACHE_NEGATIVE_TTL_SECONDS,
+)
+
+# Committed creates, updates and deletes, pushed to GET /items/changes subscribers
+item_changes = ChangeFeed(
+    "items",
+    history_size=settings.CHANGE_FEED_HISTORY_SIZE,
+    buffer_size=settings.CHANGE_FEED_SUBSCRIBER_BUFFER,
+    max_subscribers=settings.CHANGE_FEED_MAX_SUBSCRIBERS,
+    heartbeat_seconds=settings.CHANGE_FEED_HEARTBEAT_SECONDS,
+)
+
+items_table = Item.__table__
+# ItemResponse field order, so rows can be encoded to JSON as is
+RESPONSE_COLUMNS = (items_table.c.name, items_table.c.description, items_table.c.id)
+
+# Single-statement writes: RETURNING hands back the row, so there is no SELECT before the
+# write and no refresh after the commit. Built once so SQLAlchemy's compiled cache is hit;
+# the returned Items are transient (not tracked by the session).
+RETURNED_COLUMNS = (items_table.c.id, items_table.c.name, items_table.c.description)
+INSERT_ITEM = insert(items_table).returning(*RETURNED_COLUMNS)
+UPDATE_ITEM = update(items_table).where(items_table.c.id == bindparam("item_id")).returning(*RETURNED_COLUMNS)
+DELETE_ITEM = delete(items_table).where(items_table.c.id == bindparam("item_id")).returning(*RETURNED_COLUMNS)
+# Rows of a bulk UPDATE ... FROM (VALUES ...); 3 parameters each, well under the drivers' limits
+UPDATED_COLUMNS = (column("id", items_table.c.id.type), column("name", items_table.c.name.type),
+                   column("description", items_table.c.description.type))
+BULK_UPDATE_CHUNK_ROWS = 1000
+
+ItemValues = Dict[str, Any]
+ItemChange = Tuple[str, int, Optional[ItemValues]]
+PENDING_CHANGES = "pending_item_changes"
+# Tells this process's own change notifications, already applied on commit, from others'
+PROCESS_ID = uuid4().hex
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+def item_values(item: Any) -> ItemValues:
+    return {"id": item.id, "name": item.name, "description": item.description}
+
+def record_item_change(db: Session, kind: str, id: int, values: Optional[ItemValues] = None) -> None:
+    """Remember a write so its side effects run only once the session commits.
+
+    ``kind`` is "created", "updated" or "deleted"; ``values`` is None when the written
+    row is not known (e.g. bulk updates), in which case cached copies are just dropped.
+    Committed changes are also published to ``item_changes``.
+    """
+    db.info.setdefault(PENDING_CHANGES, []).append((kind, id, values))
+
+def apply_item_changes(changes: List[ItemChange]) -> None:
+    for kind, id, values in changes:
+        if kind == "deleted":
+            item_cache.put(id, None)
+        elif values is not None:
+            item_cache.put(id, values)
+        else:
+            item_cache.invalidate(id)
+        item_changes.publish(kind, id, values)
+
+def change_notification(change: ItemChange) -> str:
+    kind, id, values = change
+    payload = orjson.dumps({"origin": PROCESS_ID, "kind": kind, "id": id, "item": values})
+    if len(payload) > MAX_NOTIFY_PAYLOAD_BYTES:
+        # Too large to carry the row: receivers drop their cached copy instead
+        payload = orjson.dumps({"origin": PROCESS_ID, "kind": kind, "id": id, "item": None})
+    return payload.decode("utf-8")
+
+def on_change_notification(_connection, _pid: int, _channel: str, payload: str) -> None:
+    """Apply a change committed by another process (e.g. a standalone consumer)."""
+    try:
+        change = orjson.loads(payload)
+        if change["origin"] != PROCESS_ID:
+            apply_item_changes([(change["kind"], change["id"], change["item"])])
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+        LoggerService.warning(logger, "Ignoring malformed item change %r: %s", payload, e)
+
+def disable_change_tracking(reason: str) -> None:
+    """Turn off the item cache and the change feed, which would miss other processes' writes."""
+    LoggerService.warning(logger, "Item cache and change feed disabled: %s", reason)
+    item_cache.capacity = 0
+    item_cache.invalidate()
+    item_changes.unavailable = reason
+
+@event.listens_for(Session, "before_commit")
+def notify_other_processes(db: Session) -> None:
+    changes: Optional[List[ItemChange]] = db.info.get(PENDING_CHANGES)
+    if changes and settings.ITEM_CHANGES_LISTEN_NOTIFY and db.get_bind().dialect.name == "postgresql":
+        # Transactional like the writes: other processes only hear about committed changes
+        db.execute(NOTIFY_STATEMENT, {
+            "channel": settings.ITEM_CHANGES_CHANNEL,
+            "payloads": [change_notification(change) for change in changes],
+        })
+
+@event.listens_for(Session, "after_commit")
+def on_commit(db: Session) -> None:
+    changes = db.info.pop(PENDING_CHANGES, None)
+    if changes:
+        apply_item_changes(changes)
+
+@event.listens_for(Session, "after_rollback")
+def on_rollback(db: Session) -> None:
+    db.info.pop(PENDING_CHANGES, None)
+
+def encode_cursor(item_id: int) -> str:
+    return base64.urlsafe_b64encode(str(item_id).encode("ascii")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii"))
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def get_items(db: Session, limit: Optional[int] = None, after: Optional[int] = None) -> List[Item]:
+    """Return items ordered by id, starting after the ``after`` id (keyset pagination)."""
     try:
-        all_items = db.query(Item).all()
-        LoggerService.info(logger, f"Retrieved {len(all_items)} items")
+        query = db.query(Item).order_by(Item.id)
+        if after is not None:
+            query = query.filter(Item.id > after)
+        if limit is not None:
+            query = query.limit(limit)
+        all_items = query.all()
+        LoggerService.info(logger, "Retrieved %s items", len(all_items))
         return all_items
     except SQLAlchemyError as e:
-        LoggerService.error(logger, f"Database error while fetching items: {str(e)}")
+        LoggerService.error(logger, "Database error while fetching items: %s", e)
+        raise
+
+def select_item_rows(after: Optional[int] = None) -> Select:
+    statement = select(*RESPONSE_COLUMNS).order_by(items_table.c.id)
+    if after is not None:
+        statement = statement.where(items_table.c.id > after)
+    return statement
+
+def get_item_rows(db: Session, limit: Optional[int] = None, after: Optional[int] = None) -> List[Row]:
+    """Like :func:`get_items`, but plain ``(name, description, id)`` rows without ORM objects."""
+    try:
+        statement = select_item_rows(after)
+        if limit is not None:
+            statement = statement.limit(limit)
+        rows = db.execute(statement).all()
+        LoggerService.info(logger, "Retrieved %s items", len(rows))
+        return rows
+    except SQLAlchemyError as e:
+        LoggerService.error(logger, "Database error while fetching items: %s", e)
+        raise
+
+async def stream_item_rows(db: AsyncSession, after: Optional[int] = None,
+                           chunk_size: int = settings.ITEMS_STREAM_CHUNK_SIZE) -> AsyncIterator[Row]:
+    """Yield ``(name, description, id)`` rows ordered by id through a server-side cursor,
+    holding at most ``chunk_size`` rows."""
+    try:
+        result = await db.stream(select_item_rows(after).execution_options(yield_per=chunk_size))
+        async for row in result:
+            yield row
+    except SQLAlchemyError as e:
+        LoggerService.error(logger, "Database error while streaming items: %s", e)
         raise
 
 def get_item_by_id(db: Session, id: int) -> Optional[Item]:
+    """Read-through lookup: served from ``item_cache`` (misses included) when possible."""
     try:
+        cached = item_cache.get(id)
+        if cached is not MISSING:
+            LoggerService.info(logger, "Item with id %s served from cache", id)
+            return Item(**cached) if cached is not None else None
+
+        token = item_cache.load_token()
         item = db.query(Item).filter(Item.id == id).first()
+        # A lagging replica could hand back a row older than a write this process already
+        # cached, so only primary reads fill the cache
+        if REPLICA_INFO_KEY not in db.info:
+            item_cache.fill(id, item_values(item) if item else None, token)
         if item:
-            LoggerService.info(logger, f"Retrieved item with id {id}")
+            LoggerService.info(logger, "Retrieved item with id %s", id)
         else:
-            LoggerService.warning(logger, f"Item with id {id} not found")
+            LoggerService.warning(logger, "Item with id %s not found", id)
         return item
     except SQLAlchemyError as e:
-        LoggerService.error(logger, f"Database error while fetching item {id}: {str(e)}")
+        LoggerService.error(logger, "Database error while fetching item %s: %s", id, e)
+        raise
+
+def get_applied_item(db: Session, id: int) -> Optional[Item]:
+    """Read an item from the primary, bypassing ``item_cache``, once its event was applied."""
+    try:
+        return db.get(Item, id, populate_existing=True)
+    except SQLAlchemyError as e:
+        LoggerService.error(logger, "Database error while fetching item %s: %s", id, e)
         raise
 
-async def produce_item_creation_event(kafka_service: KafkaService, item: ItemCreate) -> None:
+def correlation_headers(correlation_id: Optional[str]) -> Optional[List[Tuple[str, bytes]]]:
+    return [(CORRELATION_HEADER, correlation_id.encode("utf-8"))] if correlation_id else None
+
+async def produce_item_creation_event(kafka_service: KafkaService, item: ItemCreate,
+                                      correlation_id: Optional[str] = None) -> None:
     try:
         await kafka_service.produce_message(settings.KAFKA_ITEM_CREATED_TOPIC, {
             "name": item.name,
             "description": item.description,
-        })
-        LoggerService.info(logger, f"Kafka message produced for item creation: {item.name}")
+        }, headers=correlation_headers(correlation_id))
+        LoggerService.info(logger, "Kafka message produced for item creation: %s", item.name)
     except Exception as e:
-        LoggerService.error(logger, f"Error producing Kafka message for item creation: {str(e)}")
+        LoggerService.error(logger, "Error producing Kafka message for item creation: %s", e)
         raise
 
-async def produce_item_update_event(kafka_service: KafkaService, id: int, item: ItemUpdate) -> None:
+async def produce_item_update_event(kafka_service: KafkaService, id: int, item: ItemUpdate,
+                                    correlation_id: Optional[str] = None) -> None:
     try:
+        # Keyed by item id so every update of an item lands on the same partition, in order
         await kafka_service.produce_message(settings.KAFKA_ITEM_UPDATED_TOPIC, {
             "id": id,
             "name": item.name,
             "description": item.description,
-        })
-        LoggerService.info(logger, f"Kafka message produced for item update: {id}")
+        }, key=id, headers=correlation_headers(correlation_id))
+        LoggerService.info(logger, "Kafka message produced for item update: %s", id)
     except Exception as e:
-        LoggerService.error(logger, f"Error producing Kafka message for item update: {str(e)}")
+        LoggerService.error(logger, "Error producing Kafka message for item update: %s", e)
         raise
 
+async def produce_item_creation_events(kafka_service: KafkaService, items: List[ItemCreate]) -> List[Optional[BaseException]]:
+    results = await kafka_service.produce_batch(settings.KAFKA_ITEM_CREATED_TOPIC, [
+        {"name": item.name, "description": item.description}
+        for item in items
+    ])
+    LoggerService.info(logger, "Kafka messages produced for %s item creations", len(items))
+    return results
+
+async def produce_item_update_events(kafka_service: KafkaService, items: List[ItemBulkUpdate]) -> List[Optional[BaseException]]:
+    results = await kafka_service.produce_batch(settings.KAFKA_ITEM_UPDATED_TOPIC, [
+        {"id": item.id, "name": item.name, "description": item.description}
+        for item in items
+    ], keys=[item.id for item in items])
+    LoggerService.info(logger, "Kafka messages produced for %s item updates", len(items))
+    return results
+
 def create_item(db: Session, item: ItemCreate) -> Item:
     try:
-        create_item = Item(name=item.name, description=item.description)
-        db.add(create_item)
+        row = db.execute(INSERT_ITEM, item.model_dump()).one()
+        record_item_change(db, "created", row.id, item_values(row))
         db.commit()
-        db.refresh(create_item)
-        LoggerService.info(logger, f"Item created")
-        return create_item
+        LoggerService.info(logger, "Item created")
+        return Item(**row._mapping)
     except SQLAlchemyError as e:
         db.rollback()
-        LoggerService.error(logger, f"Database error while creating item: {str(e)}")
+        LoggerService.error(logger, "Database error while creating item: %s", e)
         raise
 
 def update_item(db: Session, id: int, item: ItemUpdate) -> Optional[Item]:
     try:
-        db_item = db.query(Item).filter(Item.id == id).first()
-        if not db_item:
-            LoggerService.warning(logger, f"Item with id: {id} not found for update")
+        statement = UPDATE_ITEM.values(**item.model_dump(exclude_unset=True))
+        row = db.execute(statement, {"item_id": id}).one_or_none()
+        if row is None:
+            # Nothing was written; no rollback, so state the caller staged in the session
+            # (e.g. the consumer's event id and offset) still commits
+            LoggerService.warning(logger, "Item with id: %s not found for update", id)
             return None
 
-        for key, value in item.model_dump(exclude_unset=True).items():
-            setattr(db_item, key, value)
-
+        record_item_change(db, "updated", id, item_values(row))
         db.commit()
-        db.refresh(db_item)
-        LoggerService.info(logger, f"Item updated: {id}")
-        return db_item
+        LoggerService.info(logger, "Item updated: %s", id)
+        return Item(**row._mapping)
     except SQLAlchemyError as e:
         db.rollback()
-        LoggerService.error(logger, f"Database error while updating item {id}: {str(e)}")
+        LoggerService.error(logger, "Database error while updating item %s: %s", id, e)
+        raise
+
+def bulk_create_items(db: Session, items: List[ItemCreate]) -> List[Row]:
+    """Insert all items with multi-row INSERT statements. The caller owns the transaction."""
+    try:
+        statement = insert(items_table).returning(*RETURNED_COLUMNS, sort_by_parameter_order=True)
+        created = db.execute(statement, [item.model_dump() for item in items]).all()
+        for row in created:
+            record_item_change(db, "created", row.id, item_values(row))
+        LoggerService.info(logger, "Bulk created %s items", len(created))
+        return created
+    except SQLAlchemyError as e:
+        LoggerService.error(logger, "Database error while bulk creating items: %s", e)
+        raise
+
+def bulk_update_items(db: Session, updates: List[Tuple[int, ItemUpdate]]) -> None:
+    """Apply all updates as one ``UPDATE ... FROM (VALUES ...)`` statement per
+    ``BULK_UPDATE_CHUNK_ROWS`` rows; a later update of the same id wins. The caller owns the transaction."""
+    try:
+        latest = {id: (id, item.name, item.description) for id, item in updates}
+        rows = list(latest.values())
+        for start in range(0, len(rows), BULK_UPDATE_CHUNK_ROWS):
+            # A CTE rather than a FROM subquery: SQLite cannot name a subquery's columns
+            updated = values(*UPDATED_COLUMNS, name="updated").data(rows[start:start + BULK_UPDATE_CHUNK_ROWS]).cte()
+            db.execute(
+                update(items_table)
+                .where(items_table.c.id == updated.c.id)
+                .values(name=updated.c.name, description=updated.c.description)
+            )
+        for id, _ in updates:
+            record_item_change(db, "updated", id)
+        LoggerService.info(logger, "Bulk updated %s items", len(updates))
+    except SQLAlchemyError as e:
+        LoggerService.error(logger, "Database error while bulk updating items: %s", e)
         raise
 
 def delete_item(db: Session, id: int) -> Optional[Item]:
     try:
-        item = db.query(Item).filter(Item.id == id).first()
-        if item:
-            db.delete(item)
-            db.commit()
-            LoggerService.info(logger, f"Item deleted: {id}")
-            return item
-        else:
-            LoggerService.warning(logger, f"Item with id: {id} not found for deletion")
-            return None 
+        row = db.execute(DELETE_ITEM, {"item_id": id}).one_or_none()
+        if row is None:
+            # Nothing was written; no rollback, so state the caller staged in the session
+            # (e.g. the consumer's event id and offset) still commits
+            LoggerService.warning(logger, "Item with id: %s not found for deletion", id)
+            return None
+
+        record_item_change(db, "deleted", id)
+        db.commit()
+        LoggerService.info(logger, "Item deleted: %s", id)
+        return Item(**row._mapping)
     except SQLAlchemyError as e:
         db.rollback()
-        LoggerService.error(logger, f"Database error while deleting item {id}: {str(e)}")
+        LoggerService.error(logger, "Database error while deleting item %s: %s", id, e)
         raise
@@ -1,96 +1,733 @@
-import json
-import traceback
+from __future__ import annotations
+import threading
+import time
+import zlib
 import asyncio
-from typing import Dict, Any, Callable
-from kafka import KafkaProducer, KafkaConsumer
-from kafka.errors import KafkaError
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Callable, List, NamedTuple, Optional, Tuple
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.core.database import SessionLocal
+from app.core.admission import AdmissionController, Overloaded
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.core.event_codec import EventCodec
 from app.core.logger import LoggerService
+from app.core.metrics import registry
+from app.core.write_acks import CORRELATION_HEADER, record_applied_event
+from app.services.consumer_state_service import (
+    Offsets,
+    processed_event_ids,
+    prune_processed_events,
+    record_consumed_offsets,
+    record_processed_events,
+    stored_offsets,
+)
 from app.schemas import ItemCreate, ItemUpdate
 
+if TYPE_CHECKING:
+    from kafka import KafkaConsumer, KafkaProducer
+    from kafka.consumer.fetcher import ConsumerRecord
+
 logger = LoggerService.get_logger(__name__)
 
+consumed_events = registry.counter(
+    "inventory_consumer_events_total", "Item events consumed from Kafka", ("topic",)
+)
+conflated_writes = registry.counter(
+    "inventory_consumer_conflated_writes_total",
+    "Item updates skipped because a later update of the same item in the batch superseded them",
+)
+produce_ack_seconds = registry.histogram(
+    "inventory_kafka_produce_ack_seconds", "Time from handing a message to the producer until the broker acked it",
+    ("topic", "acks", "outcome"),
+)
+pending_produce_acks = registry.gauge(
+    "inventory_kafka_pending_acks", "Messages handed to the producer and not yet acknowledged by the broker"
+)
+consumer_lag = registry.gauge(
+    "inventory_consumer_lag", "Records behind the partition high watermark as of the last commit", ("topic", "partition")
+)
+consumer_commit_seconds = registry.histogram(
+    "inventory_consumer_commit_seconds", "Latency of consumer offset commits"
+)
+consumer_batch_seconds = registry.histogram(
+    "inventory_consumer_batch_seconds", "Time to apply one polled batch across all workers"
+)
+consumer_batch_size = registry.histogram(
+    "inventory_consumer_batch_size", "Records per applied batch", buckets=(1, 10, 50, 100, 250, 500, 1000, 5000)
+)
+consumed_event_formats = registry.counter(
+    "inventory_consumer_event_formats_total", "Consumed events by wire encoding (legacy-json, json, binary)", ("format",)
+)
+duplicate_events = registry.counter(
+    "inventory_consumer_duplicate_events_total", "Redelivered events skipped because their event id was already applied"
+)
+consumer_message_seconds = registry.histogram(
+    "inventory_consumer_message_seconds", "Time to apply a single message outside of a batch", ("topic",)
+)
+
+# Acknowledgement modes selectable per produce call, mapped to the producer `acks` setting
+ACK_MODES: Dict[str, Any] = {
+    "fire-and-forget": 0,
+    "leader": 1,
+    "all": "all",
+}
+
+Headers = List[Tuple[str, bytes]]
+
+# Every produced event carries a unique id, so the consumer can drop redeliveries
+EVENT_ID_HEADER = "event-id"
+
+class SplitBatch(NamedTuple):
+    creates: List[ItemCreate]
+    updates: List[Tuple[int, ItemUpdate]]
+    # Correlation id of each create (None if nobody waits for it), and of the waited-for updates
+    create_correlations: List[Optional[str]]
+    update_correlations: List[Tuple[str, int]]
+
+def header_of(record: ConsumerRecord, header: str) -> Optional[str]:
+    for name, value in record.headers or ():
+        if name == header:
+            return value.decode("utf-8")
+    return None
+
+def correlation_id_of(record: ConsumerRecord) -> Optional[str]:
+    """The id a ``wait=true`` request awaits the record under, if it carries one."""
+    return header_of(record, CORRELATION_HEADER)
+
+def event_id_of(record: ConsumerRecord) -> Optional[str]:
+    """The producer-assigned event id; events of older producers have none and are not deduplicated."""
+    return header_of(record, EVENT_ID_HEADER)
+
+def next_offsets(records: List[ConsumerRecord]) -> Offsets:
+    """The offsets to resume from once ``records`` are applied, per partition."""
+    offsets: Offsets = {}
+    for record in records:
+        key = (record.topic, record.partition)
+        offsets[key] = max(offsets.get(key, 0), record.offset + 1)
+    return offsets
+
+def is_transient_db_error(e: BaseException) -> bool:
+    """Connection-level database errors: the same write can succeed once the database is back."""
+    if isinstance(e, (OperationalError, InterfaceError, PoolTimeoutError)):
+        return True
+    return isinstance(e, DBAPIError) and e.connection_invalidated
+
+def resolve_future(future: asyncio.Future, result: Any) -> None:
+    if not future.done():
+        future.set_result(result)
+
+def reject_future(future: asyncio.Future, exception: BaseException) -> None:
+    if not future.done():
+        future.set_exception(exception)
+
+def observe_ack(topic: str, acks: str, outcome: str, started: float) -> None:
+    produce_ack_seconds.observe(time.perf_counter() - started, topic=topic, acks=acks, outcome=outcome)
+
+def log_fire_and_forget_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        LoggerService.error(logger, "Kafka Produce Error (fire-and-forget): %s", future.exception())
+
+# kafka-python is imported when the first client is created, not with this module, so the
+# API starts without loading it
+def kafka_producer(**config: Any) -> KafkaProducer:
+    from kafka import KafkaProducer
+    if "bootstrap_timeout_ms" not in KafkaProducer.DEFAULT_CONFIG:
+        # Older kafka-python releases bound bootstrapping by api_version_auto_timeout_ms instead
+        config.pop("bootstrap_timeout_ms", None)
+    return KafkaProducer(**config)
+
+def kafka_consumer(**config: Any) -> KafkaConsumer:
+    from kafka import KafkaConsumer
+    return KafkaConsumer(**config)
+
 class KafkaService:
-    def __init__(self):
-        self.producer: KafkaProducer | None = None
+    def __init__(self, producer_factory: Callable[..., KafkaProducer] = kafka_producer,
+                 consumer_factory: Callable[..., KafkaConsumer] = kafka_consumer,
+                 codec: EventCodec | None = None):
+        self.producer_factory = producer_factory
+        self.consumer_factory = consumer_factory
+        self.codec = codec or EventCodec(settings.KAFKA_EVENT_CODEC, settings.KAFKA_EVENT_COMPRESS_MIN_BYTES)
+        # One producer per acknowledgement mode, since `acks` is a producer-wide setting
+        self.producers: Dict[str, KafkaProducer] = {}
         self.initialization_lock: asyncio.Lock = asyncio.Lock()
+        self.stopping: threading.Event = threading.Event()
+        # Produced messages awaiting their broker ack, and the end offsets acks reported
+        self.pending_acks = 0
+        self.produced_offsets: Offsets = {}
+        self.ack_lock = threading.Lock()
+        # Kafka offset commits are lazy: consumed positions not yet committed, and when to
+        self.uncommitted = False
+        self.commit_due_at = 0.0
+        self.prune_due_at = 0.0
+        # Whether consume_messages runs, and the error it keeps retrying a batch on, if any
+        self.consuming = False
+        self.consumer_error: Optional[str] = None
 
-    async def initialize_producer(self, max_retries: int = 5, retry_delay: int = 5) -> None:
+    @property
+    def producer(self) -> KafkaProducer | None:
+        return self.producers.get(settings.KAFKA_PRODUCER_ACKS)
+
+    def producer_config(self, acks_mode: str) -> Dict[str, Any]:
+        return {
+            "bootstrap_servers": [settings.KAFKA_BROKER],
+            "value_serializer": self.codec.encode,
+            "key_serializer": lambda k: str(k).encode('utf-8'),
+            "acks": ACK_MODES[acks_mode],
+            "linger_ms": settings.KAFKA_PRODUCER_LINGER_MS,
+            "batch_size": settings.KAFKA_PRODUCER_BATCH_SIZE,
+            "compression_type": settings.KAFKA_PRODUCER_COMPRESSION,
+            "max_block_ms": settings.KAFKA_PRODUCER_MAX_BLOCK_MS,
+            # A connection attempt against unreachable brokers fails within this, not 30 s
+            "bootstrap_timeout_ms": settings.KAFKA_PRODUCER_BOOTSTRAP_TIMEOUT_MS,
+        }
+
+    def create_producer(self, acks_mode: str) -> KafkaProducer:
+        """Connect a producer and fetch the item topics' metadata; blocks, so runs in a thread.
+
+        With the metadata known, send() on the event loop does not wait for it.
+        """
+        from kafka.errors import KafkaError
+        producer = self.producer_factory(**self.producer_config(acks_mode))
+        deadline = time.monotonic() + settings.KAFKA_PRODUCER_BOOTSTRAP_TIMEOUT_MS / 1000
+        try:
+            for topic in (settings.KAFKA_ITEM_CREATED_TOPIC, settings.KAFKA_ITEM_UPDATED_TOPIC):
+                # Each attempt waits at most max_block_ms, e.g. while the topic is auto-created
+                while True:
+                    try:
+                        producer.partitions_for(topic)
+                        break
+                    except KafkaError:
+                        if time.monotonic() >= deadline:
+                            raise
+        except BaseException:
+            producer.close()
+            raise
+        return producer
+
+    async def initialize_producer(self, max_retries: int = 5, retry_delay: int = 5,
+                                  acks_mode: str | None = None) -> None:
+        from kafka.errors import KafkaError
+        acks_mode = acks_mode or settings.KAFKA_PRODUCER_ACKS
+        if acks_mode not in ACK_MODES:
+            raise ValueError(f"Unknown acks mode {acks_mode!r}, expected one of {list(ACK_MODES)}")
         async with self.initialization_lock:
-            if self.producer is None:
+            if acks_mode not in self.producers:
                 for attempt in range(max_retries):
                     try:
-                        self.producer = KafkaProducer(
-                            bootstrap_servers=[settings.KAFKA_BROKER],
-                            value_serializer=lambda v: json.dumps(v).encode('utf-8')
-                        )
-                        LoggerService.info(logger, "Kafka producer initialized.")
+                        # Bootstrapping connects to the broker, keep it off the event loop
+                        self.producers[acks_mode] = await asyncio.to_thread(self.create_producer, acks_mode)
+                        LoggerService.info(logger, "Kafka producer initialized (acks mode: %s).", acks_mode)
                         return
                     except KafkaError as e:
-                        LoggerService.warning(logger, f"Failed to initialize Kafka producer (attempt {attempt + 1}/{max_retries}): {e}")
+                        LoggerService.warning(logger, "Failed to initialize Kafka producer (attempt %s/%s): %s", attempt + 1, max_retries, e)
                         if attempt < max_retries - 1:
                             await asyncio.sleep(retry_delay)
                         else:
-                            LoggerService.error(logger, f"Failed to initialize Kafka producer after {max_retries} attempts.")
-                            self.producer = None
+                            LoggerService.error(logger, "Failed to initialize Kafka producer after %s attempts.", max_retries)
 
-    async def produce_message(self, topic: str, message: Dict[str, Any]) -> None:
-        if self.producer is None:
-            raise RuntimeError("Kafka producer is not initialized. Call initialize_producer first.")
+    async def send(self, topic: str, message: Dict[str, Any], acks: str | None = None,
+                   key: Any = None, headers: Headers | None = None) -> asyncio.Future:
+        """Hand a message to the batching producer and return a future resolved on broker ack.
+
+        The returned future resolves with the record metadata; awaiting it is optional,
+        so a single coroutine can keep many produces in flight.
+        """
+        from kafka.errors import KafkaTimeoutError
+        acks = acks or settings.KAFKA_PRODUCER_ACKS
+        if acks not in self.producers:
+            if self.producer is None:
+                raise RuntimeError("Kafka producer is not initialized. Call initialize_producer first.")
+            await self.initialize_producer(acks_mode=acks)
+        producer = self.producers.get(acks)
+        if producer is None:
+            raise RuntimeError(f"Kafka producer for acks mode {acks!r} could not be initialized.")
+        if settings.ADMISSION_MAX_PENDING_ACKS and self.pending_acks >= settings.ADMISSION_MAX_PENDING_ACKS:
+            raise Overloaded("pending_acks", settings.ADMISSION_RETRY_AFTER_SECONDS)
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        # Acks arrive on the producer's I/O thread
+        started = time.perf_counter()
+        headers = [(EVENT_ID_HEADER, uuid4().hex.encode("ascii")), *(headers or ())]
         try:
-            future = self.producer.send(topic, message)
-            future.get(timeout=10)
-            LoggerService.info(logger, f"Message sent to topic {topic}")
+            # Blocks the loop for at most KAFKA_PRODUCER_MAX_BLOCK_MS
+            record_future = producer.send(topic, message, key=key, headers=headers)
+        except KafkaTimeoutError as e:
+            raise Overloaded("producer_blocked", settings.ADMISSION_RETRY_AFTER_SECONDS) from e
+        self.track_ack(+1)
+
+        def on_ack(metadata: Any) -> None:
+            observe_ack(topic, acks, "ack", started)
+            self.track_ack(-1, metadata)
+            loop.call_soon_threadsafe(resolve_future, future, metadata)
+
+        def on_error(exception: BaseException) -> None:
+            observe_ack(topic, acks, "error", started)
+            self.track_ack(-1)
+            loop.call_soon_threadsafe(reject_future, future, exception)
+
+        record_future.add_callback(on_ack)
+        record_future.add_errback(on_error)
+        return future
+
+    def track_ack(self, change: int, metadata: Any = None) -> None:
+        """Count pending acks (callbacks run on the producer's I/O thread) and record acked offsets."""
+        with self.ack_lock:
+            self.pending_acks += change
+            if metadata is not None and metadata.offset >= 0:
+                key = (metadata.topic, metadata.partition)
+                self.produced_offsets[key] = max(self.produced_offsets.get(key, 0), metadata.offset + 1)
+        pending_produce_acks.set(self.pending_acks)
+
+    async def estimate_consumer_lag(self) -> Optional[int]:
+        """Records acked to this producer that the consumer group has not stored an offset past.
+
+        Acked offsets are a lower bound of each partition's end, and stored offsets are written
+        with the consumer's writes, so this works whichever process runs the consumer.
+        None until both are known for some partition.
+        """
+        with self.ack_lock:
+            produced = dict(self.produced_offsets)
+        if not produced:
+            return None
+        async with AsyncSessionLocal() as db:
+            stored = await db.run_sync(stored_offsets, settings.KAFKA_CONSUMER_GROUP_ID)
+        lags = [max(end - stored[key], 0) for key, end in produced.items() if key in stored]
+        return sum(lags) if lags else None
+
+    async def produce_message(self, topic: str, message: Dict[str, Any], acks: str | None = None,
+                              key: Any = None, headers: Headers | None = None) -> None:
+        try:
+            future = await self.send(topic, message, acks=acks, key=key, headers=headers)
+            if (acks or settings.KAFKA_PRODUCER_ACKS) == "fire-and-forget":
+                future.add_done_callback(log_fire_and_forget_failure)
+                LoggerService.info(logger, "Message handed to producer for topic %s", topic)
+                return
+            await asyncio.wait_for(future, timeout=settings.KAFKA_PRODUCER_ACK_TIMEOUT_SECONDS)
+            LoggerService.info(logger, "Message sent to topic %s", topic)
         except Exception as e:
-            LoggerService.error(logger, f"Kafka Produce Error: {e}")
+            LoggerService.error(logger, "Kafka Produce Error: %s", e)
             raise
 
-    async def consume_messages(self, create_item_func: Callable, update_item_func: Callable) -> None:
-        consumer = KafkaConsumer(
-            settings.KAFKA_ITEM_CREATED_TOPIC,
-            settings.KAFKA_ITEM_UPDATED_TOPIC,
+    async def produce_batch(self, topic: str, messages: List[Dict[str, Any]], acks: str | None = None,
+                            keys: List[Any] | None = None) -> List[BaseException | None]:
+        """Pipeline all messages through the producer and wait for their acks together.
+
+        Returns one entry per message: None if it was acknowledged, else the error.
+        """
+        keys = keys or [None] * len(messages)
+        results: List[BaseException | None] = [None] * len(messages)
+        pending: Dict[int, asyncio.Future] = {}
+        for index, (message, key) in enumerate(zip(messages, keys)):
+            try:
+                pending[index] = await self.send(topic, message, acks=acks, key=key)
+            except Exception as e:
+                results[index] = e
+
+        if (acks or settings.KAFKA_PRODUCER_ACKS) == "fire-and-forget":
+            for future in pending.values():
+                future.add_done_callback(log_fire_and_forget_failure)
+        elif pending:
+            done, not_done = await asyncio.wait(pending.values(), timeout=settings.KAFKA_PRODUCER_ACK_TIMEOUT_SECONDS)
+            for index, future in pending.items():
+                if future in not_done:
+                    future.cancel()
+                    results[index] = TimeoutError("Timed out waiting for broker acknowledgement")
+                elif future.exception() is not None:
+                    results[index] = future.exception()
+
+        failed = sum(result is not None for result in results)
+        if failed:
+            LoggerService.error(logger, "Kafka Produce Error: %s/%s messages to %s failed", failed, len(messages), topic)
+        LoggerService.info(logger, "Batch of %s messages sent to topic %s", len(messages) - failed, topic)
+        return results
+
+    def close(self) -> None:
+        for producer in self.producers.values():
+            producer.flush()
+            producer.close()
+        self.producers.clear()
+
+    async def connect(self) -> None:
+        """Readiness check: one attempt at creating the producer if there is none yet.
+
+        A created producer reconnects to the brokers by itself, so it stays ready.
+        """
+        if self.producer is None:
+            await self.initialize_producer(max_retries=1)
+        if self.producer is None:
+            raise RuntimeError("Kafka producer is not connected")
+
+    def create_consumer(self) -> KafkaConsumer:
+        from app.services.rebalance_listeners import StoredOffsetsRebalanceListener
+        consumer = self.consumer_factory(
             bootstrap_servers=[settings.KAFKA_BROKER],
-            group_id="inventory-consumer-group",
+            group_id=settings.KAFKA_CONSUMER_GROUP_ID,
             auto_offset_reset='earliest',
             enable_auto_commit=False,
+            max_poll_records=settings.KAFKA_CONSUMER_BATCH_SIZE,
         )
+        consumer.subscribe(
+            [settings.KAFKA_ITEM_CREATED_TOPIC, settings.KAFKA_ITEM_UPDATED_TOPIC],
+            listener=StoredOffsetsRebalanceListener(consumer, settings.KAFKA_CONSUMER_GROUP_ID),
+        )
+        # Positions resumed from stored offsets can be ahead of Kafka's committed ones
+        self.uncommitted = True
+        return consumer
 
-        try:
-            for message in consumer:
-                LoggerService.info(logger, "Waiting for new messages...")
-                topic: str = message.topic
-                decoded_message: Dict[str, Any] = json.loads(message.value.decode('utf-8'))
+    def stop(self) -> None:
+        self.stopping.set()
 
-                with SessionLocal() as db:
-                    try:
-                        if topic == settings.KAFKA_ITEM_CREATED_TOPIC:
-                            self.handle_item_created(db, decoded_message, create_item_func)
-                        elif topic == settings.KAFKA_ITEM_UPDATED_TOPIC:
-                            self.handle_item_updated(db, decoded_message, update_item_func)
+    async def check_consumer(self) -> None:
+        """Readiness check: the consumer is running, and not stuck retrying a batch."""
+        if not self.consuming:
+            raise RuntimeError("Kafka consumer is not running")
+        if self.consumer_error is not None:
+            raise RuntimeError(f"Kafka consumer is retrying a batch: {self.consumer_error}")
+
+    def retry_until_applied(self, apply: Callable[[], Any]) -> bool:
+        """Run ``apply`` until it succeeds, backing off exponentially while it fails (e.g.
+        while the database is down); False if stop() is called first.
+
+        Offsets are stored with the last write of ``apply``, so a failed attempt leaves them
+        where they were and the next one starts over from the same records; the event ids
+        of the part that did commit make applying it again harmless.
+        """
+        delay = settings.STARTUP_RETRY_INITIAL_SECONDS
+        while True:
+            try:
+                apply()
+                if self.consumer_error is not None:
+                    LoggerService.info(logger, "Kafka consumer recovered")
+                    self.consumer_error = None
+                return True
+            except Exception as e:
+                self.consumer_error = str(e) or type(e).__name__
+                LoggerService.error(logger, "Failed to apply consumed records, retrying in %.1fs: %s", delay, e)
+            if self.stopping.wait(delay):
+                # Kafka's committed positions would skip the records that were not applied
+                self.uncommitted = False
+                return False
+            delay = min(delay * 2, settings.STARTUP_RETRY_MAX_SECONDS)
 
-                        consumer.commit()
-                    except Exception as e:
-                        db.rollback()
-                        LoggerService.error(logger, f"Processing Error: {e}")
-                        LoggerService.error(logger, traceback.format_exc())
+    def connect_consumer(self) -> KafkaConsumer | None:
+        """Create the consumer, retrying with exponential backoff while the brokers are
+        unreachable; None if stop() is called first."""
+        from kafka.errors import KafkaError
+        delay = settings.STARTUP_RETRY_INITIAL_SECONDS
+        while True:
+            try:
+                return self.create_consumer()
+            except KafkaError as e:
+                LoggerService.warning(logger, "Failed to create Kafka consumer, retrying in %.1fs: %s", delay, e)
+            if self.stopping.wait(delay):
+                return None
+            delay = min(delay * 2, settings.STARTUP_RETRY_MAX_SECONDS)
 
+    async def consume_messages(self, create_item_func: Callable, update_item_func: Callable,
+                               bulk_create_func: Callable | None = None,
+                               bulk_update_func: Callable | None = None) -> None:
+        consumer = self.connect_consumer()
+        if consumer is None:
+            return
+
+        self.consuming = True
+        try:
+            if bulk_create_func and bulk_update_func:
+                self.consume_batches(consumer, create_item_func, update_item_func, bulk_create_func, bulk_update_func)
+            else:
+                self.consume_one_by_one(consumer, create_item_func, update_item_func)
         except KeyboardInterrupt:
             LoggerService.info(logger, "Closing Kafka consumer")
+        finally:
+            self.consuming = False
+            if self.uncommitted:
+                self.commit(consumer, wait=True)
             consumer.close()
 
+    def consume_one_by_one(self, consumer: KafkaConsumer, create_item_func: Callable, update_item_func: Callable) -> None:
+        for message in consumer:
+            if not self.retry_until_applied(
+                lambda: self.process_message(message, create_item_func, update_item_func, store_offset=True)
+            ):
+                return
+            self.uncommitted = True
+            self.maintain(consumer, idle=False)
+            if self.stopping.is_set():
+                return
+
+    def consume_batches(self, consumer: KafkaConsumer, create_item_func: Callable, update_item_func: Callable,
+                        bulk_create_func: Callable, bulk_update_func: Callable) -> None:
+        workers = settings.KAFKA_CONSUMER_WORKERS
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kafka-worker") as pool:
+            while not self.stopping.is_set():
+                batch = self.poll_batch(consumer)
+                # Records of partitions revoked by a rebalance during polling now belong to another member
+                assigned = consumer.assignment()
+                batch = [record for record in batch if (record.topic, record.partition) in assigned]
+                if not batch:
+                    self.maintain(consumer, idle=True)
+                    continue
+
+                started = time.perf_counter()
+                if not self.retry_until_applied(lambda: self.apply_polled(
+                    pool, workers, batch, create_item_func, update_item_func, bulk_create_func, bulk_update_func,
+                )):
+                    return
+                consumer_batch_seconds.observe(time.perf_counter() - started)
+                consumer_batch_size.observe(len(batch))
+                self.uncommitted = True
+                self.maintain(consumer, idle=False)
+
+    def apply_polled(self, pool: ThreadPoolExecutor, workers: int, batch: List[ConsumerRecord],
+                     create_item_func: Callable, update_item_func: Callable,
+                     bulk_create_func: Callable, bulk_update_func: Callable) -> None:
+        # Offsets are stored only once every shard has been applied, so a rebalance
+        # (which can only happen inside poll) never sees half-processed batches
+        offsets = next_offsets(batch)
+        shards = [shard for shard in self.shard_batch(self.skip_processed(batch), workers) if shard]
+        if len(shards) == 1:
+            # One transaction applies the whole batch, so it stores the offsets too
+            self.apply_batch(shards[0], create_item_func, update_item_func, bulk_create_func, bulk_update_func, offsets)
+        else:
+            futures = [
+                pool.submit(self.apply_batch, shard, create_item_func, update_item_func, bulk_create_func, bulk_update_func)
+                for shard in shards
+            ]
+            for future in futures:
+                future.result()
+            # Shards commit separately; their event ids make replaying the gap harmless
+            self.store_offsets(offsets)
+
+    def maintain(self, consumer: KafkaConsumer, idle: bool) -> None:
+        """Commit consumed offsets to Kafka when idle or due, and prune old event ids."""
+        now = time.monotonic()
+        if self.uncommitted and (idle or now >= self.commit_due_at):
+            self.commit(consumer)
+            self.commit_due_at = now + settings.KAFKA_CONSUMER_COMMIT_INTERVAL_MS / 1000
+        if now >= self.prune_due_at:
+            self.prune_due_at = now + settings.KAFKA_CONSUMER_DEDUP_PRUNE_INTERVAL_SECONDS
+            try:
+                with SessionLocal() as db:
+                    prune_processed_events(db, settings.KAFKA_CONSUMER_DEDUP_RETENTION_SECONDS)
+            except Exception as e:
+                LoggerService.error(logger, "Failed to prune processed events: %s", e)
+
+    def commit(self, consumer: KafkaConsumer, wait: bool = False) -> None:
+        """Commit consumed positions to Kafka, without waiting for the broker unless ``wait``.
+
+        The offsets stored in the database are what the consumer resumes from; Kafka's copy
+        serves lag monitoring and partitions the database has no offset for yet.
+        """
+        started = time.perf_counter()
+
+        def on_commit(_offsets, response) -> None:
+            consumer_commit_seconds.observe(time.perf_counter() - started)
+            if isinstance(response, Exception):
+                LoggerService.warning(logger, "Kafka offset commit failed: %s", response)
+
+        self.uncommitted = False
+        if wait:
+            consumer.commit()
+            on_commit(None, None)
+        else:
+            consumer.commit_async(callback=on_commit)
+        for tp in consumer.assignment():
+            highwater = consumer.highwater(tp)
+            if highwater is not None:
+                consumer_lag.set(max(highwater - consumer.position(tp), 0), topic=tp.topic, partition=tp.partition)
+
+    @staticmethod
+    def skip_processed(records: List[ConsumerRecord]) -> List[ConsumerRecord]:
+        """Drop redelivered events: ids already applied, or repeated within the batch."""
+        event_ids = [event_id for event_id in map(event_id_of, records) if event_id is not None]
+        if not event_ids:
+            return records
+        with SessionLocal() as db:
+            seen = processed_event_ids(db, event_ids)
+        fresh = []
+        for record in records:
+            event_id = event_id_of(record)
+            if event_id is not None:
+                if event_id in seen:
+                    continue
+                seen.add(event_id)
+            fresh.append(record)
+        if len(fresh) < len(records):
+            duplicate_events.inc(len(records) - len(fresh))
+            LoggerService.warning(logger, "Skipped %s redelivered events", len(records) - len(fresh))
+        return fresh
+
+    @staticmethod
+    def store_offsets(offsets: Offsets) -> None:
+        with SessionLocal() as db:
+            record_consumed_offsets(db, settings.KAFKA_CONSUMER_GROUP_ID, offsets)
+            db.commit()
+
     @staticmethod
-    def handle_item_created(db: Session, message: Dict[str, Any], create_item_func: Callable) -> None:
+    def shard_batch(records: List[ConsumerRecord], workers: int) -> List[List[ConsumerRecord]]:
+        """Split a batch across workers while keeping every item's events in one shard, in order.
+
+        Updates are keyed by item id, so they are routed by key; unkeyed updates fall back to
+        their partition. Creates carry no id and are independent, so they are spread round-robin.
+        """
+        shards: List[List[ConsumerRecord]] = [[] for _ in range(workers)]
+        for index, record in enumerate(records):
+            if record.topic == settings.KAFKA_ITEM_CREATED_TOPIC:
+                shard = index % workers
+            elif record.key is not None:
+                shard = zlib.crc32(record.key) % workers
+            else:
+                shard = record.partition % workers
+            shards[shard].append(record)
+        return shards
+
+    def poll_batch(self, consumer: KafkaConsumer) -> List[ConsumerRecord]:
+        """Collect up to KAFKA_CONSUMER_BATCH_SIZE records or whatever arrived within the max wait."""
+        batch: List[ConsumerRecord] = []
+        deadline = time.monotonic() + settings.KAFKA_CONSUMER_BATCH_MAX_WAIT_MS / 1000
+        while len(batch) < settings.KAFKA_CONSUMER_BATCH_SIZE and not self.stopping.is_set():
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0:
+                break
+            records = consumer.poll(timeout_ms=remaining_ms, max_records=settings.KAFKA_CONSUMER_BATCH_SIZE - len(batch))
+            for partition_records in records.values():
+                batch.extend(partition_records)
+        return batch
+
+    def apply_batch(self, records: List[ConsumerRecord], create_item_func: Callable, update_item_func: Callable,
+                    bulk_create_func: Callable, bulk_update_func: Callable, offsets: Offsets | None = None) -> None:
+        """Apply records in one transaction, which also stores their event ids and ``offsets`` if given."""
+        creates, updates, create_correlations, update_correlations = self.split_batch(records)
+        with SessionLocal() as db:
+            try:
+                record_processed_events(db, filter(None, map(event_id_of, records)))
+                if offsets:
+                    record_consumed_offsets(db, settings.KAFKA_CONSUMER_GROUP_ID, offsets)
+                # Updates always target items created by earlier, already applied batches,
+                # so applying all creates before all updates keeps the event order intact
+                if creates:
+                    created = bulk_create_func(db, creates)
+                    if any(create_correlations):
+                        for correlation_id, row in zip(create_correlations, created):
+                            if correlation_id is not None:
+                                record_applied_event(db, correlation_id, row.id)
+                if updates:
+                    bulk_update_func(db, updates)
+                for correlation_id, id in update_correlations:
+                    record_applied_event(db, correlation_id, id)
+                db.commit()
+                LoggerService.info(logger, "Applied batch of %s messages (%s created, %s updated)", len(records), len(creates), len(updates))
+                return
+            except Exception as e:
+                db.rollback()
+                if is_transient_db_error(e):
+                    # One by one, every message would fail and be skipped; retry the batch instead
+                    raise
+                LoggerService.error(logger, "Batch Processing Error, retrying messages one by one: %s", e)
+
+        for record in records:
+            self.process_message(record, create_item_func, update_item_func)
+        if offsets:
+            self.store_offsets(offsets)
+
+    @staticmethod
+    def decode(value: bytes) -> Dict[str, Any]:
+        """Decode an event in any encoding the producer has written (see ``KAFKA_EVENT_CODEC``)."""
+        message = EventCodec.decode(value)
+        consumed_event_formats.inc(format=EventCodec.format_of(value))
+        return message
+
+    @staticmethod
+    def split_batch(records: List[ConsumerRecord]) -> SplitBatch:
+        batch = SplitBatch([], [], [], [])
+        for record in records:
+            try:
+                message: Dict[str, Any] = KafkaService.decode(record.value)
+                correlation_id = correlation_id_of(record)
+                if record.topic == settings.KAFKA_ITEM_CREATED_TOPIC:
+                    batch.creates.append(ItemCreate(name=message.get('name'), description=message.get('description')))
+                    batch.create_correlations.append(correlation_id)
+                elif record.topic == settings.KAFKA_ITEM_UPDATED_TOPIC:
+                    batch.updates.append((message.get('id'), ItemUpdate(name=message.get('name'), description=message.get('description'))))
+                    # Acked even when conflated away: the later update it lost to is applied with it
+                    if correlation_id is not None:
+                        batch.update_correlations.append((correlation_id, message.get('id')))
+                consumed_events.inc(topic=record.topic)
+            except Exception as e:
+                LoggerService.error(logger, "Skipping undecodable message at %s[%s]@%s: %s", record.topic, record.partition, record.offset, e)
+        if settings.KAFKA_CONSUMER_CONFLATE_UPDATES:
+            return batch._replace(updates=KafkaService.conflate_updates(batch.updates))
+        return batch
+
+    @staticmethod
+    def conflate_updates(updates: List[Tuple[int, ItemUpdate]]) -> List[Tuple[int, ItemUpdate]]:
+        """Collapse repeated updates of an item into its last one (last writer wins).
+
+        Safe for offsets because the whole batch is committed only after it is applied.
+        """
+        latest: Dict[int, ItemUpdate] = {}
+        for id, item in updates:
+            latest[id] = item
+        saved = len(updates) - len(latest)
+        if saved:
+            conflated_writes.inc(saved)
+            LoggerService.info(logger, "Conflated %s updates into %s writes", len(updates), len(latest))
+        return list(latest.items())
+
+    def process_message(self, message: ConsumerRecord, create_item_func: Callable, update_item_func: Callable,
+                        store_offset: bool = False) -> bool:
+        """Apply one record; its event id (and offset, with ``store_offset``) commit with the write."""
+        topic: str = message.topic
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            try:
+                event_id = event_id_of(message)
+                if store_offset:
+                    record_consumed_offsets(db, settings.KAFKA_CONSUMER_GROUP_ID, next_offsets([message]))
+                if event_id is not None:
+                    if processed_event_ids(db, [event_id]):
+                        duplicate_events.inc()
+                        LoggerService.warning(logger, "Skipping redelivered event %s", event_id)
+                        db.commit()
+                        return True
+                    record_processed_events(db, [event_id])
+                decoded_message: Dict[str, Any] = self.decode(message.value)
+                item_id: Optional[int] = None
+                if topic == settings.KAFKA_ITEM_CREATED_TOPIC:
+                    item_id = self.handle_item_created(db, decoded_message, create_item_func)
+                elif topic == settings.KAFKA_ITEM_UPDATED_TOPIC:
+                    item_id = self.handle_item_updated(db, decoded_message, update_item_func)
+                correlation_id = correlation_id_of(message)
+                if correlation_id is not None and item_id is not None:
+                    record_applied_event(db, correlation_id, item_id)
+                # Delivers the ack, and commits the event id and offset when nothing was
+                # written (an update of a missing item); a no-op otherwise
+                db.commit()
+                consumer_message_seconds.observe(time.perf_counter() - started, topic=topic)
+                return True
+            except Exception as e:
+                db.rollback()
+                if is_transient_db_error(e):
+                    # Not the message's fault: skipping it would lose the event, so the caller retries
+                    raise
+                LoggerService.exception(logger, "Processing Error: %s", e)
+                return False
+
+    @staticmethod
+    def handle_item_created(db: Session, message: Dict[str, Any], create_item_func: Callable) -> int:
         item_create = ItemCreate(
             name=message.get('name'),
             description=message.get('description')
         )
         created_item = create_item_func(db, item_create)
-        LoggerService.info(logger, f"Item Created: {created_item.id}")
+        LoggerService.info(logger, "Item Created: %s", created_item.id)
+        return created_item.id
 
     @staticmethod
-    def handle_item_updated(db: Session, message: Dict[str, Any], update_item_func: Callable) -> None:
+    def handle_item_updated(db: Session, message: Dict[str, Any], update_item_func: Callable) -> int:
         item_id: int = message.get('id')
         item_update = ItemUpdate(
             name=message.get('name'),
@@ -98,13 +735,20 @@ class KafkaService:
         )
         updated_item = update_item_func(db, item_id, item_update)
         if updated_item:
-            LoggerService.info(logger, f"Item Updated: {item_id}")
+            LoggerService.info(logger, "Item Updated: %s", item_id)
         else:
-            LoggerService.warning(logger, f"Item Not Found: {item_id}")
+            LoggerService.warning(logger, "Item Not Found: %s", item_id)
+        return item_id
 
 kafka_service = KafkaService()
+write_admission = AdmissionController(lambda: kafka_service.pending_acks)
 
 async def get_kafka_service() -> KafkaService:
+    """The connected service; raises Overloaded (503) at once while the producer is not.
+
+    Only the background readiness check connects, so requests never queue behind a
+    producer bootstrap while Kafka is down.
+    """
     if kafka_service.producer is None:
-        await kafka_service.initialize_producer()
+        raise Overloaded("kafka_unavailable", settings.ADMISSION_RETRY_AFTER_SECONDS)
     return kafka_service
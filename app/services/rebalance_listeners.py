@@ -0,0 +1,38 @@
+"""Consumer group rebalance listeners, imported with kafka-python when the consumer starts."""
+from kafka import ConsumerRebalanceListener, KafkaConsumer
+from app.core.database import SessionLocal
+from app.core.logger import LoggerService
+from app.services.consumer_state_service import stored_offsets
+from app.services.kafka_service import consumer_lag
+
+logger = LoggerService.get_logger(__name__)
+
+class LoggingRebalanceListener(ConsumerRebalanceListener):
+    def on_partitions_revoked(self, revoked) -> None:
+        LoggerService.info(logger, "Partitions revoked: %s", sorted(revoked))
+        for tp in revoked:
+            consumer_lag.remove(topic=tp.topic, partition=tp.partition)
+
+    def on_partitions_assigned(self, assigned) -> None:
+        LoggerService.info(logger, "Partitions assigned: %s", sorted(assigned))
+
+class StoredOffsetsRebalanceListener(LoggingRebalanceListener):
+    """Resumes assigned partitions from the offsets stored in the database.
+
+    Those are written with the item writes, so they are never behind what was applied;
+    Kafka's lazily committed offsets are only used for partitions without a stored one.
+    """
+
+    def __init__(self, consumer: KafkaConsumer, group_id: str):
+        self.consumer = consumer
+        self.group_id = group_id
+
+    def on_partitions_assigned(self, assigned) -> None:
+        super().on_partitions_assigned(assigned)
+        with SessionLocal() as db:
+            offsets = stored_offsets(db, self.group_id)
+        for tp in assigned:
+            offset = offsets.get((tp.topic, tp.partition))
+            if offset is not None:
+                self.consumer.seek(tp, offset)
+                LoggerService.info(logger, "Resuming %s[%s] from stored offset %s", tp.topic, tp.partition, offset)
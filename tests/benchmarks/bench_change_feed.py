@@ -0,0 +1,142 @@
+"""Fan-out of GET /items/changes: thousands of Server-Sent Events subscribers on one worker.
+
+A single uvicorn worker serves the app; the benchmark opens ``--subscribers`` streams
+over plain sockets, then deletes ``--events`` items through the API at ``--rate`` per
+second. Each delete is one event that every subscriber must receive. Reported: the time
+to connect everyone, events delivered, the delete-to-delivery latency over all
+(subscriber, event) pairs, and the server's resident memory per subscriber.
+
+Run with: python -m tests.benchmarks.bench_change_feed [--subscribers 5000] [--events 100] [--rate 20]
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from tests.local_db import reset_database, seed_items
+from app.main import app
+
+PORT = 8766
+CONNECT_BATCH = 500
+DELETED = re.compile(rb'"kind":"deleted","id":(\d+)')
+
+# No startup hooks: the feed needs neither Kafka nor the consumer
+app.router.on_startup.clear()
+app.router.on_shutdown.clear()
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def resident_mib(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+class Subscriber:
+    """One SSE stream read over a raw socket (chunked transfer encoding, one chunk per write)."""
+
+    def __init__(self, deleted_at: Dict[int, float]):
+        self.deleted_at = deleted_at
+        self.latencies: List[float] = []
+        self.reader = self.writer = None
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", PORT)
+        self.writer.write(b"GET /items/changes HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n")
+        await self.writer.drain()
+        await self.reader.readuntil(b"\r\n\r\n")
+        await self.read_chunk()  # the "subscribed" frame
+
+    async def read_chunk(self) -> bytes:
+        size = int((await self.reader.readline()).strip(), 16)
+        return (await self.reader.readexactly(size + 2))[:-2]
+
+    async def receive(self, events: int) -> None:
+        received = 0
+        while received < events:
+            chunk = await self.read_chunk()
+            now = time.perf_counter()
+            for match in DELETED.finditer(chunk):
+                self.latencies.append(now - self.deleted_at[int(match.group(1))])
+                received += 1
+
+    def close(self) -> None:
+        self.writer.close()
+
+async def publish(events: int, rate: float, deleted_at: Dict[int, float]) -> None:
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}") as client:
+        for id in range(1, events + 1):
+            deleted_at[id] = time.perf_counter()
+            response = await client.delete(f"/items/{id}")
+            response.raise_for_status()
+            await asyncio.sleep(1 / rate)
+
+async def run(subscribers: int, events: int, rate: float, server_pid: int) -> None:
+    deleted_at: Dict[int, float] = {}
+    clients = [Subscriber(deleted_at) for _ in range(subscribers)]
+    idle_mib = resident_mib(server_pid)
+    started = time.perf_counter()
+    for start in range(0, subscribers, CONNECT_BATCH):
+        await asyncio.gather(*(client.connect() for client in clients[start:start + CONNECT_BATCH]))
+    connect_seconds = time.perf_counter() - started
+    connected_mib = resident_mib(server_pid)
+
+    started = time.perf_counter()
+    await asyncio.gather(publish(events, rate, deleted_at), *(client.receive(events) for client in clients))
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        client.close()
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    print(f"subscribers connected:  {subscribers} in {connect_seconds:.2f} s")
+    print(f"events delivered:       {len(latencies)} ({events} events x {subscribers} subscribers) in {elapsed:.2f} s")
+    print(f"delivery rate:          {len(latencies) / elapsed:,.0f} events/s")
+    print(f"delete-to-delivery:     p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+    print(f"server memory:          {idle_mib:.0f} MiB idle, {connected_mib:.0f} MiB connected "
+          f"({(connected_mib - idle_mib) * 1024 / subscribers:.1f} KiB per subscriber)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=20.0, help="deletes per second")
+    args = parser.parse_args()
+
+    reset_database()
+    seed_items(args.events)
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "tests.benchmarks.bench_change_feed:app",
+        "--port", str(PORT), "--log-level", "warning", "--no-access-log",
+        "--backlog", str(CONNECT_BATCH * 2), "--workers", "1",
+    ])
+    try:
+        wait_until_serving()
+        asyncio.run(run(args.subscribers, args.events, args.rate, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+def wait_until_serving(timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("Benchmark server did not start")
+
+if __name__ == "__main__":
+    main()
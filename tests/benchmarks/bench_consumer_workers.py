@@ -0,0 +1,76 @@
+"""Consumer drain throughput for 1/2/4/8 workers against the in-process fake broker.
+
+Database writes are modelled as a fixed network round trip plus a per-row cost, which
+is what parallel workers overlap against a real PostgreSQL server.
+
+A run ends when Kafka's committed offsets reach the end of every partition. Those are
+committed lazily, once the consumer goes idle, so each run includes one idle poll
+(``KAFKA_CONSUMER_BATCH_MAX_WAIT_MS``). The consumer offsets stored per batch are written
+to the local database for real.
+
+Run with: python -m tests.benchmarks.bench_consumer_workers
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Tuple
+
+from tests.local_db import reset_database
+from app.core.config import settings
+from app.schemas import ItemCreate, ItemUpdate
+from app.services.kafka_service import KafkaService
+from tests.fake_kafka import FakeBroker
+
+EVENTS = 20_000
+ITEMS = 2_000
+PARTITIONS = 8
+ROUND_TRIP_SECONDS = 0.002
+PER_ROW_SECONDS = 0.00002
+WORKER_COUNTS = (1, 2, 4, 8)
+
+def simulated_bulk_create(db, items: List[ItemCreate]) -> None:
+    time.sleep(ROUND_TRIP_SECONDS + PER_ROW_SECONDS * len(items))
+
+def simulated_bulk_update(db, updates: List[Tuple[int, ItemUpdate]]) -> None:
+    time.sleep(ROUND_TRIP_SECONDS + PER_ROW_SECONDS * len(updates))
+
+def fill(broker: FakeBroker) -> None:
+    for i in range(EVENTS):
+        if i % 10 == 0:
+            broker.produce(settings.KAFKA_ITEM_CREATED_TOPIC, {"name": f"Item {i}", "description": ""})
+        else:
+            id = i % ITEMS + 1
+            broker.produce(settings.KAFKA_ITEM_UPDATED_TOPIC, {"id": id, "name": f"Item {id}", "description": str(i)}, key=id)
+
+def drain_seconds(workers: int) -> float:
+    settings.KAFKA_CONSUMER_WORKERS = workers
+    # Stored consumer offsets of the previous run would point past this broker's records
+    reset_database()
+    broker = FakeBroker(partitions=PARTITIONS)
+    fill(broker)
+    service = KafkaService(consumer_factory=broker.consumer_factory)
+    topics = (settings.KAFKA_ITEM_CREATED_TOPIC, settings.KAFKA_ITEM_UPDATED_TOPIC)
+
+    started = time.perf_counter()
+    thread = threading.Thread(target=asyncio.run, args=(service.consume_messages(
+        None, None, simulated_bulk_create, simulated_bulk_update,
+    ),), daemon=True)
+    thread.start()
+    while broker.lag(settings.KAFKA_CONSUMER_GROUP_ID, *topics):
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    service.stop()
+    thread.join()
+    return elapsed
+
+def main() -> None:
+    # Per-batch INFO lines would dominate the measurement
+    logging.getLogger("app.services.kafka_service").setLevel(logging.WARNING)
+    print(f"{'workers':>7} {'seconds':>8} {'events/s':>10}")
+    for workers in WORKER_COUNTS:
+        elapsed = drain_seconds(workers)
+        print(f"{workers:>7} {elapsed:>8.2f} {EVENTS / elapsed:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Kafka event encodings: bytes per event and encode/decode throughput.
+
+"stdlib json (before)" is the previous value_serializer and consumer decode. Sizes are
+also shown after compressing batches of events the way the producer's
+``compression_type`` compresses record batches (gzip always; lz4 and zstd when their
+Python packages are installed).
+
+Run with: python -m tests.benchmarks.bench_event_codec [--events 100000] [--batch 500]
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+from app.core.event_codec import EventCodec
+
+Encoder = Callable[[dict], bytes]
+Decoder = Callable[[bytes], dict]
+
+WORDS = ("steel", "blue", "small", "pack", "cable", "usb", "for", "with", "and", "office", "spare",
+         "battery", "laptop", "stand", "kit", "black", "large", "adapter", "set", "of", "desk", "lamp")
+
+def text(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+def make_events(count: int) -> List[dict]:
+    """One create per nine updates, with free-text names and descriptions."""
+    random.seed(0)
+    events = []
+    for i in range(count):
+        name, description = text(random.randint(1, 4)).title(), text(random.randint(3, 12))
+        if i % 10 == 0:
+            events.append({"name": name, "description": description})
+        else:
+            events.append({"id": random.randint(1, 1_000_000), "name": name, "description": description})
+    return events
+
+def batch_compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    compressors = {"gzip": lambda data: zlib.compress(data, 6)}
+    try:
+        import lz4.frame
+        compressors["lz4"] = lz4.frame.compress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        compressors["zstd"] = zstandard.ZstdCompressor().compress
+    except ImportError:
+        pass
+    return compressors
+
+def per_event_us(func: Callable, values: list) -> float:
+    started = time.perf_counter()
+    for value in values:
+        func(value)
+    return (time.perf_counter() - started) / len(values) * 1e6
+
+def measure(encode: Encoder, decode: Decoder, events: List[dict], batch: int,
+            compressors: Dict[str, Callable[[bytes], bytes]]) -> Tuple[Dict[str, float], List[bytes]]:
+    encoded = [encode(event) for event in events]
+    result = {
+        "bytes": sum(map(len, encoded)) / len(events),
+        "encode_us": min(per_event_us(encode, events) for _ in range(3)),
+        "decode_us": min(per_event_us(decode, encoded) for _ in range(3)),
+    }
+    for name, compress in compressors.items():
+        compressed = sum(len(compress(b"".join(encoded[start:start + batch]))) for start in range(0, len(encoded), batch))
+        result[name] = compressed / len(events)
+    return result, encoded
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=500, help="events per compressed batch")
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    compressors = batch_compressors()
+    codecs: Dict[str, Tuple[Encoder, Decoder]] = {
+        "stdlib json (before)": (lambda v: json.dumps(v).encode("utf-8"), lambda v: json.loads(v.decode("utf-8"))),
+        **{name: (EventCodec(name).encode, EventCodec.decode) for name in EventCodec.NAMES},
+    }
+
+    columns = "".join(f" {name + ' B':>8}" for name in compressors)
+    print(f"{'codec':<22} {'bytes':>6}{columns} {'enc us':>7} {'dec us':>7} {'dec/s':>10}")
+    for name, (encode, decode) in codecs.items():
+        result, encoded = measure(encode, decode, events, args.batch, compressors)
+        assert [EventCodec.decode(value) for value in encoded[:1000]] == events[:1000]
+        compressed = "".join(f" {result[compressor]:>8.1f}" for compressor in compressors)
+        print(f"{name:<22} {result['bytes']:>6.1f}{compressed} {result['encode_us']:>7.2f} "
+              f"{result['decode_us']:>7.2f} {1e6 / result['decode_us']:>10,.0f}")
+
+if __name__ == "__main__":
+    main()
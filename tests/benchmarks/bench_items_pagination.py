@@ -0,0 +1,64 @@
+"""Peak memory of GET /items strategies as the table grows.
+
+Run with: python -m tests.benchmarks.bench_items_pagination
+"""
+import asyncio
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from tests.local_db import reset_database, seed_items
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.routers.items import stream_items
+from app.schemas import ItemResponse
+from app.services.items_service import get_items
+
+TABLE_SIZES = (10_000, 50_000, 200_000)
+
+def full_table() -> None:
+    with SessionLocal() as db:
+        items = get_items(db)
+        [ItemResponse.model_validate(item).model_dump_json() for item in items]
+
+def one_page() -> None:
+    with SessionLocal() as db:
+        items = get_items(db, limit=settings.ITEMS_PAGE_SIZE)
+        [ItemResponse.model_validate(item).model_dump_json() for item in items]
+
+def streamed() -> None:
+    async def drain() -> None:
+        async with AsyncSessionLocal() as db:
+            async for _ in stream_items(db, None, "ndjson"):
+                pass
+
+    asyncio.run(drain())
+
+STRATEGIES: Dict[str, Callable[[], None]] = {
+    "full table (old GET /items)": full_table,
+    "keyset page": one_page,
+    "ndjson stream (whole table)": streamed,
+}
+
+def measure(func: Callable[[], None]) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024), elapsed
+
+def main() -> None:
+    reset_database()
+    seeded = 0
+    print(f"{'rows':>8}  {'strategy':<30} {'peak MiB':>9} {'seconds':>8}")
+    for size in TABLE_SIZES:
+        seed_items(size - seeded)
+        seeded = size
+        for name, func in STRATEGIES.items():
+            peak, elapsed = measure(func)
+            print(f"{size:>8}  {name:<30} {peak:>9.2f} {elapsed:>8.2f}")
+
+if __name__ == "__main__":
+    main()
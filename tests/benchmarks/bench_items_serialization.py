@@ -0,0 +1,75 @@
+"""GET /items serialization: ORM objects through the response model vs. column tuples through orjson.
+
+The "before" path is what FastAPI did with the ORM page: validate every Item into an
+ItemResponse, dump it to JSON-able data and render it with JSONResponse. Both paths are
+timed including the query, and their bytes are checked to be identical.
+
+Run with: python -m tests.benchmarks.bench_items_serialization [--postgres]
+"""
+import argparse
+import os
+import time
+from typing import Callable, Dict, Tuple
+
+ROW_COUNTS = (1_000, 100_000)
+ROUNDS = 5
+
+def orm_and_response_model(db) -> bytes:
+    from typing import List
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from app.schemas import ItemResponse
+    from app.services.items_service import get_items
+
+    adapter = TypeAdapter(List[ItemResponse])
+    items = adapter.validate_python(get_items(db), from_attributes=True)
+    return JSONResponse(adapter.dump_python(items, mode="json")).body
+
+def tuples_and_orjson(db) -> bytes:
+    from app.routers.items import encode_item_rows
+    from app.services.items_service import get_item_rows
+
+    return encode_item_rows(get_item_rows(db))
+
+def best_of(serialize: Callable[[object], bytes]) -> Tuple[float, bytes]:
+    from app.core.database import SessionLocal
+
+    best = float("inf")
+    body = b""
+    for _ in range(ROUNDS):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            body = serialize(db)
+            best = min(best, time.perf_counter() - started)
+    return best, body
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--postgres", action="store_true")
+    args = parser.parse_args()
+
+    if args.postgres:
+        from tests.benchmarks.suite import start_embedded_postgres
+        os.environ["TEST_DATABASE_URL"] = start_embedded_postgres()
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from tests.local_db import reset_database, seed_items
+
+    paths: Dict[str, Callable[[object], bytes]] = {
+        "ORM + response model (before)": orm_and_response_model,
+        "tuples + orjson (after)": tuples_and_orjson,
+    }
+    reset_database()
+    seeded = 0
+    print(f"{'rows':>8}  {'path':<30} {'ms':>9} {'speedup':>8}")
+    for count in ROW_COUNTS:
+        seed_items(count - seeded)
+        seeded = count
+        results = {name: best_of(serialize) for name, serialize in paths.items()}
+        (before, expected), (after, body) = results.values()
+        if body != expected:
+            raise SystemExit(f"{count} rows: the two paths produced different JSON")
+        for name, (elapsed, _) in results.items():
+            print(f"{count:>8}  {name:<30} {elapsed * 1000:>9.1f} {before / elapsed:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
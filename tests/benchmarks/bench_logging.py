@@ -0,0 +1,79 @@
+"""Per-request logging cost on the request thread: the old synchronous pipeline vs. the queue-based one.
+
+A GET /items/{id} used to emit four INFO lines (session open/close, then "Retrieved item"
+from both the service and the router), each formatted eagerly and written to the stream
+on the calling thread. It now emits one lazily formatted line, handed to a background
+writer and rate limited per message. Output goes to a temporary file in both cases.
+
+Run with: python -m tests.benchmarks.bench_logging [--requests 200000]
+"""
+import argparse
+import logging
+import queue
+import tempfile
+import time
+from typing import Callable
+
+from app.core.logger import (
+    TEXT_FORMAT,
+    DrainingQueueListener,
+    LoggerService,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    dropped_records,
+)
+
+def legacy_request(logger: logging.Logger, id: int) -> None:
+    logger.info("Creating a new async database session")
+    logger.info(f"Retrieved item with id {id}")
+    logger.info(f"Retrieved item with id {id}")
+    logger.info("Closing the async database session")
+
+def current_request(logger: logging.Logger, id: int) -> None:
+    LoggerService.debug(logger, "Creating a new async database session")
+    LoggerService.info(logger, "Retrieved item with id %s", id)
+    LoggerService.debug(logger, "Closing the async database session")
+
+def make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+def measure(request: Callable[[logging.Logger, int], None], logger: logging.Logger, requests: int) -> float:
+    started = time.perf_counter()
+    for id in range(requests):
+        request(logger, id)
+    return (time.perf_counter() - started) / requests * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile("w") as output:
+        formatter = logging.Formatter(TEXT_FORMAT)
+        stream_handler = logging.StreamHandler(output)
+        stream_handler.setFormatter(formatter)
+        legacy = measure(legacy_request, make_logger("legacy", stream_handler), args.requests)
+
+        results = {"sync, eager f-strings": (legacy, 0.0, 0)}
+        for label, rate in (("queue, lazy args", 0.0), ("queue, lazy args, rate limited", 50.0)):
+            handler = NonBlockingQueueHandler(queue.Queue(10_000))
+            handler.addFilter(RateLimitFilter(rate))
+            listener = DrainingQueueListener(handler.queue, stream_handler)
+            dropped = sum(dropped_records.value(reason=reason) for reason in ("queue_full", "rate_limited"))
+            listener.start()
+            caller = measure(current_request, make_logger(label, handler), args.requests)
+            started = time.perf_counter()
+            listener.stop()
+            dropped = sum(dropped_records.value(reason=reason) for reason in ("queue_full", "rate_limited")) - dropped
+            results[label] = (caller, time.perf_counter() - started, int(dropped))
+
+    print(f"{'pipeline':<32} {'us/request':>10} {'drain s':>8} {'dropped':>8}")
+    for label, (caller, drain, dropped) in results.items():
+        print(f"{label:<32} {caller:>10.2f} {drain:>8.2f} {dropped:>8}")
+
+if __name__ == "__main__":
+    main()
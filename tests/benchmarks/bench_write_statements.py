@@ -0,0 +1,111 @@
+"""Statements and latency per create/update/delete: the previous ORM versions vs. single-statement RETURNING.
+
+Statements are counted with a before_cursor_execute listener (COMMIT is not a cursor
+statement, so it is not counted for either version). Use --postgres for an embedded
+PostgreSQL (pip install pgserver); the default is the SQLite stand-in.
+
+Run with: python -m tests.benchmarks.bench_write_statements [--operations 2000] [--postgres]
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+def orm_create_item(db, item):
+    from app.models import Item
+    from app.services.items_service import item_values, record_item_change
+
+    created = Item(name=item.name, description=item.description)
+    db.add(created)
+    db.flush()
+    record_item_change(db, "created", created.id, item_values(created))
+    db.commit()
+    db.refresh(created)
+    return created
+
+def orm_update_item(db, id, item):
+    from app.models import Item
+    from app.services.items_service import item_values, record_item_change
+
+    db_item = db.query(Item).filter(Item.id == id).first()
+    if not db_item:
+        return None
+    for key, value in item.model_dump(exclude_unset=True).items():
+        setattr(db_item, key, value)
+    record_item_change(db, "updated", id, item_values(db_item))
+    db.commit()
+    db.refresh(db_item)
+    return db_item
+
+def orm_delete_item(db, id):
+    from app.models import Item
+    from app.services.items_service import record_item_change
+
+    item = db.query(Item).filter(Item.id == id).first()
+    if item:
+        db.delete(item)
+        record_item_change(db, "deleted", id)
+        db.commit()
+    return item
+
+def measure(operation: Callable[[object, int], Optional[object]], ids: List[int], statements: List[int]) -> Dict[str, float]:
+    from app.core.database import SessionLocal
+
+    latencies = []
+    counted = 0
+    for id in ids:
+        with SessionLocal() as db:
+            before = statements[0]
+            started = time.perf_counter()
+            operation(db, id)
+            latencies.append(time.perf_counter() - started)
+            counted += statements[0] - before
+    return {"statements": counted / len(ids), "mean_ms": statistics.fmean(latencies) * 1000}
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--postgres", action="store_true")
+    args = parser.parse_args()
+
+    if args.postgres:
+        from tests.benchmarks.suite import start_embedded_postgres
+        os.environ["TEST_DATABASE_URL"] = start_embedded_postgres()
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from sqlalchemy import event
+    from tests.local_db import reset_database
+    from app.core.database import engine
+    from app.schemas import ItemCreate, ItemUpdate
+    from app.services import items_service
+
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(*_args) -> None:
+        statements[0] += 1
+
+    reset_database()
+    ids = list(range(1, args.operations + 1))
+    create = ItemCreate(name="Bench", description="created")
+    update = ItemUpdate(name="Bench", description="updated")
+    variants = {
+        "ORM (before)": (orm_create_item, orm_update_item, orm_delete_item),
+        "RETURNING (after)": (items_service.create_item, items_service.update_item, items_service.delete_item),
+    }
+
+    print(f"{'operation':<8} {'version':<18} {'statements':>10} {'mean ms':>8}")
+    for version, (create_item, update_item, delete_item) in variants.items():
+        operations = {
+            "create": lambda db, _id: create_item(db, create),
+            "update": lambda db, id: update_item(db, id, update),
+            "delete": lambda db, id: delete_item(db, id),
+        }
+        for name, operation in operations.items():
+            result = measure(operation, ids, statements)
+            print(f"{name:<8} {version:<18} {result['statements']:>10.1f} {result['mean_ms']:>8.3f}")
+        # Both versions work on ids 1..N
+        reset_database()
+
+if __name__ == "__main__":
+    main()
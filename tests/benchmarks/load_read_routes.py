@@ -0,0 +1,127 @@
+"""p50/p99 latency of the read routes at high concurrency: async handlers vs. the old sync ones.
+
+The app is served by a separate uvicorn process. The production (async) routes are compared
+against copies of the previous threadpool-bound sync handlers mounted under /sync.
+Point TEST_DATABASE_URL at PostgreSQL for meaningful numbers; the default is the SQLite stand-in.
+
+Run with: python -m tests.benchmarks.load_read_routes [--concurrency 200] [--requests 5000]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from tests.local_db import reset_database, seed_items
+from app.core.database import get_db
+from app.main import app
+from app.schemas import ItemResponse
+from app.services.items_service import get_item_by_id, get_items, item_cache
+
+PORT = 8765
+SEEDED_ITEMS = 10_000
+
+sync_router = APIRouter(prefix="/sync/items")
+
+@sync_router.get("/", response_model=List[ItemResponse])
+def read_items_sync(db: Session = Depends(get_db)):
+    return get_items(db, limit=100)
+
+@sync_router.get("/{id}", response_model=ItemResponse)
+def read_item_sync(id: int, db: Session = Depends(get_db)):
+    return get_item_by_id(db, id)
+
+app.include_router(sync_router)
+# No startup hooks: the routes under test need neither Kafka nor the consumer
+app.router.on_startup.clear()
+# Measure the database path, not the item cache
+item_cache.capacity = 0
+logging.getLogger("app").setLevel(logging.WARNING)
+for name in list(logging.root.manager.loggerDict):
+    if name.startswith("app."):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run_load(client: httpx.AsyncClient, paths: List[str], concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    queue = iter(paths)
+
+    async def worker() -> None:
+        nonlocal errors
+        for path in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                # The sync handlers can exhaust the connection pool and fail after its timeout
+                errors += response.status_code >= 500
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors,
+    }
+
+async def compare(concurrency: int, requests: int) -> None:
+    ids = [random.randint(1, SEEDED_ITEMS) for _ in range(requests)]
+    scenarios = {
+        "GET /items/{id}": lambda prefix: [f"{prefix}/items/{id}" for id in ids],
+        "GET /items": lambda prefix: [f"{prefix}/items/"] * requests,
+    }
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=10) as client:
+        print(f"{'route':<16} {'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for route, paths in scenarios.items():
+            for mode, prefix in (("sync", "/sync"), ("async", "")):
+                result = await run_load(client, paths(prefix), concurrency)
+                print(f"{route:<16} {mode:<6} {result['rps']:>8.0f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['errors']:>7}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    reset_database()
+    seed_items(SEEDED_ITEMS)
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "tests.benchmarks.load_read_routes:app",
+        "--port", str(PORT), "--log-level", "warning", "--no-access-log",
+    ])
+    try:
+        wait_until_serving()
+        asyncio.run(compare(args.concurrency, args.requests))
+    finally:
+        server.terminate()
+        server.wait()
+
+def wait_until_serving(timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("Benchmark server did not start")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Benchmark suite: HTTP routes and consumer drain, on one box, without external services.
+
+The FastAPI app is driven in-process through httpx's ASGI transport, Kafka is replaced by
+the in-process fake broker and PostgreSQL by the SQLite stand-in, or, with ``--postgres``,
+by an embedded PostgreSQL server (``pip install pgserver``). Results are written as JSON
+and can be compared against an earlier run:
+
+    python -m tests.benchmarks.suite --output baseline.json
+    python -m tests.benchmarks.suite --baseline baseline.json --tolerance 0.2
+
+The comparison exits non-zero when a scenario's throughput dropped, or its p99 grew, by
+more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    return {
+        "operations": len(latencies),
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+async def run_requests(client, requests: List[Request], concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(requests)
+
+    async def worker() -> None:
+        nonlocal errors
+        for method, path, body in pending:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def http_scenarios(seeded: int, requests: int) -> Dict[str, Callable[[], List[Request]]]:
+    def random_ids() -> List[int]:
+        return [random.randint(1, seeded) for _ in range(requests)]
+
+    return {
+        "GET /items": lambda: [("GET", "/items/", None)] * requests,
+        "GET /items/{id}": lambda: [("GET", f"/items/{id}", None) for id in random_ids()],
+        "POST /items": lambda: [
+            ("POST", "/items/", {"name": f"Bench {i}", "description": "created"}) for i in range(requests)
+        ],
+        "PUT /items/{id}": lambda: [
+            ("PUT", f"/items/{id}", {"name": f"Item {id}", "description": "updated"}) for id in random_ids()
+        ],
+    }
+
+async def bench_http(seeded: int, requests: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    import httpx
+    from app.main import app
+    from app.services.kafka_service import KafkaService, get_kafka_service
+    from tests.fake_kafka import FakeBroker
+
+    broker = FakeBroker(partitions=4)
+    kafka_service = KafkaService(producer_factory=broker.producer_factory)
+    await kafka_service.initialize_producer()
+    app.dependency_overrides[get_kafka_service] = lambda: kafka_service
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for name, make_requests in http_scenarios(seeded, requests).items():
+                results[name] = await run_requests(client, make_requests(), concurrency)
+    finally:
+        app.dependency_overrides.pop(get_kafka_service, None)
+        kafka_service.close()
+    return results
+
+def bench_consumer_drain(seeded: int, events: int) -> Dict[str, float]:
+    """Events per second from a full topic until everything is committed; latencies are per applied shard."""
+    from app.core.config import settings
+    from app.services.items_service import bulk_create_items, bulk_update_items, create_item, update_item
+    from app.services.kafka_service import KafkaService
+    from tests.fake_kafka import FakeBroker
+
+    class TimedKafkaService(KafkaService):
+        def __init__(self, **kwargs: Any):
+            super().__init__(**kwargs)
+            self.shard_seconds: List[float] = []
+
+        def apply_batch(self, records, *args: Any) -> None:
+            started = time.perf_counter()
+            super().apply_batch(records, *args)
+            self.shard_seconds.append(time.perf_counter() - started)
+
+    broker = FakeBroker(partitions=4)
+    topics = (settings.KAFKA_ITEM_CREATED_TOPIC, settings.KAFKA_ITEM_UPDATED_TOPIC)
+    for i in range(events):
+        if i % 10 == 0:
+            broker.produce(settings.KAFKA_ITEM_CREATED_TOPIC, {"name": f"Drained {i}", "description": ""})
+        else:
+            id = random.randint(1, seeded)
+            broker.produce(settings.KAFKA_ITEM_UPDATED_TOPIC, {"id": id, "name": f"Item {id}", "description": str(i)}, key=id)
+
+    service = TimedKafkaService(consumer_factory=broker.consumer_factory)
+    started = time.perf_counter()
+    thread = threading.Thread(target=asyncio.run, args=(service.consume_messages(
+        create_item, update_item, bulk_create_items, bulk_update_items,
+    ),), daemon=True)
+    thread.start()
+    while broker.lag(settings.KAFKA_CONSUMER_GROUP_ID, *topics):
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    service.stop()
+    thread.join()
+
+    result = summarize(service.shard_seconds, elapsed)
+    result["operations"] = events
+    result["throughput_per_s"] = round(events / elapsed, 1)
+    return result
+
+def run_suite(seeded: int, requests: int, concurrency: int, events: int) -> Dict[str, Dict[str, float]]:
+    from tests.local_db import reset_database, seed_items
+
+    reset_database()
+    seed_items(seeded)
+    results = asyncio.run(bench_http(seeded, requests, concurrency))
+    results["consumer drain"] = bench_consumer_drain(seeded, events)
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """Scenarios whose throughput or p99 regressed by more than ``tolerance`` (a fraction)."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["throughput_per_s"] < before["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_per_s']} -> {result['throughput_per_s']}/s")
+        if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {before['p99_ms']} -> {result['p99_ms']} ms")
+    return regressions
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_embedded_postgres() -> str:
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit("--postgres needs the pgserver package: pip install pgserver")
+    server = pgserver.get_server(tempfile.mkdtemp(prefix="inventory-bench-pg-"), cleanup_mode="delete")
+    # Keep a reference so the server lives as long as the process
+    start_embedded_postgres.server = server
+    return server.get_uri().replace("postgresql://", "postgresql+psycopg2://", 1)
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'scenario':<18} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, result in results.items():
+        print(f"{name:<18} {result['throughput_per_s']:>9.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['errors']:>7}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000, help="rows seeded before the run")
+    parser.add_argument("--requests", type=int, default=2_000, help="requests per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--events", type=int, default=20_000, help="events drained by the consumer")
+    parser.add_argument("--postgres", action="store_true", help="use an embedded PostgreSQL instead of SQLite")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against the JSON results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    # The database must be chosen before the app (and its engines) are imported
+    if args.postgres:
+        os.environ["TEST_DATABASE_URL"] = start_embedded_postgres()
+    # Per-request INFO lines would end up in the measurement
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import tests.local_db  # noqa: F401
+
+    random.seed(0)
+    results = run_suite(args.items, args.requests, args.concurrency, args.events)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": "postgresql" if args.postgres else "sqlite",
+            "parameters": {key: getattr(args, key) for key in ("items", "requests", "concurrency", "events")},
+        },
+        "results": results,
+    }
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# Point the app at the local SQLite stand-in before any app module builds its engine
+import tests.local_db  # noqa: F401
@@ -0,0 +1,274 @@
+"""In-process stand-in for a Kafka broker exposing the kafka-python surface KafkaService uses."""
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from kafka.partitioner.default import murmur2
+from kafka.structs import OffsetAndMetadata, TopicPartition
+
+class RecordMetadata(NamedTuple):
+    topic: str
+    partition: int
+    offset: int
+
+class FakeRecord(NamedTuple):
+    topic: str
+    partition: int
+    offset: int
+    timestamp: int
+    key: Optional[bytes]
+    value: bytes
+    headers: List[Tuple[str, bytes]]
+
+class FakeFuture:
+    """Mimics kafka-python's FutureRecordMetadata: callbacks fire once the broker acks."""
+
+    def __init__(self) -> None:
+        self.is_done = False
+        self.value: Any = None
+        self.exception: Optional[Exception] = None
+        self._callbacks: List[Callable] = []
+        self._errbacks: List[Callable] = []
+        self._event = threading.Event()
+
+    def success(self, value: Any) -> None:
+        self.value, self.is_done = value, True
+        self._event.set()
+        for callback in self._callbacks:
+            callback(value)
+
+    def failure(self, exception: Exception) -> None:
+        self.exception, self.is_done = exception, True
+        self._event.set()
+        for errback in self._errbacks:
+            errback(exception)
+
+    def add_callback(self, callback: Callable) -> "FakeFuture":
+        if self.is_done and self.exception is None:
+            callback(self.value)
+        else:
+            self._callbacks.append(callback)
+        return self
+
+    def add_errback(self, errback: Callable) -> "FakeFuture":
+        if self.is_done and self.exception is not None:
+            errback(self.exception)
+        else:
+            self._errbacks.append(errback)
+        return self
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        if not self._event.wait(timeout):
+            raise TimeoutError("Timed out waiting for the fake broker to ack")
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+class FakeBroker:
+    """Stores records per topic partition and acks produces immediately or on demand.
+
+    With ``auto_ack=False`` produce futures stay pending until :meth:`release_acks`
+    is called, which lets tests hold thousands of sends in flight.
+    """
+
+    def __init__(self, partitions: int = 1, auto_ack: bool = True) -> None:
+        self.partitions = partitions
+        self.auto_ack = auto_ack
+        # When set, every produce fails with this error instead of being acked
+        self.produce_error: Optional[Exception] = None
+        self.lock = threading.Condition(threading.RLock())
+        self.logs: Dict[str, List[List[FakeRecord]]] = defaultdict(
+            lambda: [[] for _ in range(self.partitions)]
+        )
+        self.pending: List[Tuple[FakeFuture, RecordMetadata]] = []
+        self.producer_configs: List[Dict[str, Any]] = []
+        self.committed: Dict[str, Dict[TopicPartition, int]] = defaultdict(dict)
+        self.commit_count = 0
+        self._round_robin = itertools.count()
+
+    def producer_factory(self, **config: Any) -> "FakeProducer":
+        self.producer_configs.append(config)
+        return FakeProducer(self, **config)
+
+    def consumer_factory(self, *topics: str, **config: Any) -> "FakeConsumer":
+        return FakeConsumer(self, *topics, **config)
+
+    def partition_for(self, key: Optional[bytes]) -> int:
+        if key is None:
+            return next(self._round_robin) % self.partitions
+        # Same murmur2 hash as Kafka's default partitioner
+        return (murmur2(key) & 0x7fffffff) % self.partitions
+
+    def append(self, topic: str, value: bytes, key: Optional[bytes] = None,
+               headers: Optional[List[Tuple[str, bytes]]] = None, partition: Optional[int] = None) -> RecordMetadata:
+        with self.lock:
+            if partition is None:
+                partition = self.partition_for(key)
+            log = self.logs[topic][partition]
+            record = FakeRecord(topic, partition, len(log), int(time.time() * 1000), key, value, headers or [])
+            log.append(record)
+            self.lock.notify_all()
+            return RecordMetadata(topic, partition, record.offset)
+
+    def produce(self, topic: str, message: Dict[str, Any], key: Any = None) -> RecordMetadata:
+        """Append a JSON-encoded message directly, as an upstream producer would."""
+        encoded_key = str(key).encode("utf-8") if key is not None else None
+        return self.append(topic, json.dumps(message).encode("utf-8"), encoded_key)
+
+    def end_offsets(self, topic: str) -> Dict[TopicPartition, int]:
+        with self.lock:
+            return {TopicPartition(topic, partition): len(log) for partition, log in enumerate(self.logs[topic])}
+
+    def lag(self, group_id: str, *topics: str) -> int:
+        with self.lock:
+            committed = self.committed[group_id]
+            return sum(
+                end - committed.get(tp, 0)
+                for topic in topics
+                for tp, end in self.end_offsets(topic).items()
+            )
+
+    def records(self, topic: str) -> List[FakeRecord]:
+        with self.lock:
+            return [record for log in self.logs[topic] for record in log]
+
+    def release_acks(self, error: Optional[Exception] = None) -> int:
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for future, metadata in pending:
+            if error is None:
+                future.success(metadata)
+            else:
+                future.failure(error)
+        return len(pending)
+
+class FakeProducer:
+    def __init__(self, broker: FakeBroker, **config: Any) -> None:
+        self.broker = broker
+        self.config = config
+        self.closed = False
+
+    def partitions_for(self, topic: str) -> set:
+        return set(range(self.broker.partitions))
+
+    def send(self, topic: str, value: Any = None, key: Any = None,
+             headers: Optional[List[Tuple[str, bytes]]] = None, partition: Optional[int] = None) -> FakeFuture:
+        if self.closed:
+            raise RuntimeError("Producer is closed")
+        value_serializer = self.config.get("value_serializer")
+        key_serializer = self.config.get("key_serializer")
+        encoded_value = value_serializer(value) if value_serializer else value
+        encoded_key = key_serializer(key) if key_serializer and key is not None else key
+        future = FakeFuture()
+        if self.broker.produce_error is not None:
+            future.failure(self.broker.produce_error)
+            return future
+
+        metadata = self.broker.append(topic, encoded_value, encoded_key, headers, partition)
+        if self.config.get("acks", 1) == 0 or self.broker.auto_ack:
+            future.success(metadata)
+        else:
+            with self.broker.lock:
+                self.broker.pending.append((future, metadata))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        pass
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        self.closed = True
+
+class FakeConsumer:
+    """Single-member consumer group: owns every partition of the subscribed topics."""
+
+    def __init__(self, broker: FakeBroker, *topics: str, **config: Any) -> None:
+        self.broker = broker
+        self.config = config
+        self.group_id: str = config.get("group_id") or "fake-group"
+        self.topics = list(topics)
+        self.positions: Dict[TopicPartition, int] = {}
+        self.listener: Any = None
+        self.joined = False
+        self.closed = False
+
+    def subscribe(self, topics: List[str], listener: Any = None) -> None:
+        self.topics = list(topics)
+        self.listener = listener
+        self.joined = False
+
+    def assignment(self) -> set:
+        with self.broker.lock:
+            return {
+                TopicPartition(topic, partition)
+                for topic in self.topics
+                for partition in range(len(self.broker.logs[topic]))
+            }
+
+    def position(self, tp: TopicPartition) -> int:
+        if tp not in self.positions:
+            self.positions[tp] = self.broker.committed[self.group_id].get(tp, 0)
+        return self.positions[tp]
+
+    def committed(self, tp: TopicPartition) -> Optional[int]:
+        return self.broker.committed[self.group_id].get(tp)
+
+    def highwater(self, tp: TopicPartition) -> Optional[int]:
+        with self.broker.lock:
+            return len(self.broker.logs[tp.topic][tp.partition])
+
+    def seek(self, tp: TopicPartition, offset: int) -> None:
+        self.positions[tp] = offset
+
+    def poll(self, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[FakeRecord]]:
+        max_records = max_records or self.config.get("max_poll_records", 500)
+        if not self.joined:
+            # The group "rebalance" happens inside poll, as with a real broker
+            self.joined = True
+            if self.listener is not None:
+                self.listener.on_partitions_assigned(self.assignment())
+        deadline = time.monotonic() + timeout_ms / 1000
+        with self.broker.lock:
+            while True:
+                fetched = self._fetch(max_records)
+                remaining = deadline - time.monotonic()
+                if fetched or remaining <= 0 or self.closed:
+                    return fetched
+                self.broker.lock.wait(remaining)
+
+    def _fetch(self, max_records: int) -> Dict[TopicPartition, List[FakeRecord]]:
+        fetched: Dict[TopicPartition, List[FakeRecord]] = {}
+        for tp in sorted(self.assignment()):
+            if max_records <= 0:
+                break
+            position = self.position(tp)
+            records = self.broker.logs[tp.topic][tp.partition][position:position + max_records]
+            if records:
+                fetched[tp] = records
+                self.positions[tp] = position + len(records)
+                max_records -= len(records)
+        return fetched
+
+    def commit(self, offsets: Optional[Dict[TopicPartition, OffsetAndMetadata]] = None) -> None:
+        with self.broker.lock:
+            if offsets is None:
+                offsets = {tp: OffsetAndMetadata(offset, "", -1) for tp, offset in self.positions.items()}
+            for tp, offset_and_metadata in offsets.items():
+                self.broker.committed[self.group_id][tp] = offset_and_metadata.offset
+            self.broker.commit_count += 1
+
+    def commit_async(self, offsets: Optional[Dict[TopicPartition, OffsetAndMetadata]] = None,
+                     callback: Any = None) -> None:
+        # Completes at once; kafka-python runs the callback from a later poll
+        self.commit(offsets)
+        if callback is not None:
+            callback(offsets, None)
+
+    def __iter__(self) -> Iterator[FakeRecord]:
+        while not self.closed:
+            for records in self.poll(timeout_ms=100, max_records=1).values():
+                yield from records
+
+    def close(self, autocommit: bool = True) -> None:
+        self.closed = True
@@ -0,0 +1,46 @@
+"""Local stand-in for PostgreSQL: a throwaway SQLite database bound to the app engine.
+
+Tests reset the database they run against, so they never use DATABASE_URL (in the test
+container it is the compose database the e2e suite and the API use). They use
+TEST_DATABASE_URL instead, set e.g. to an embedded PostgreSQL, and SQLite by default.
+"""
+import os
+import tempfile
+
+# Shared with child processes (e.g. a benchmark's uvicorn server) through the environment
+DATA_DIR = os.environ.setdefault("INVENTORY_TEST_DATA_DIR", tempfile.mkdtemp(prefix="inventory-test-"))
+os.environ.setdefault("TEST_DATABASE_URL", f"sqlite:///{DATA_DIR}/main.db")
+os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+# Derived from the test database, and no replicas of the real one
+os.environ["ASYNC_DATABASE_URL"] = ""
+os.environ["DATABASE_READ_URLS"] = ""
+
+from sqlalchemy import event, insert, text
+from app.core.database import Base, async_engine, engine
+from app.models import Item
+
+def attach_inventory_schema(dbapi_connection, _connection_record) -> None:
+    # SQLite has no schemas; attach a second database file under the "inventory" name instead
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"ATTACH DATABASE '{DATA_DIR}/inventory.db' AS inventory")
+    cursor.close()
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", attach_inventory_schema)
+    event.listen(async_engine.sync_engine, "connect", attach_inventory_schema)
+
+def reset_database() -> None:
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            connection.execute(text("CREATE SCHEMA IF NOT EXISTS inventory"))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+def seed_items(count: int, batch_size: int = 10000) -> None:
+    with engine.begin() as connection:
+        for start in range(0, count, batch_size):
+            rows = [
+                {"name": f"Item {i}", "description": f"Seeded item number {i}"}
+                for i in range(start, min(start + batch_size, count))
+            ]
+            connection.execute(insert(Item), rows)
@@ -0,0 +1,133 @@
+import asyncio
+import httpx
+import pytest
+from app.core.admission import ClientRateLimiter, TokenBucket, admission_rejections
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.main import app
+from app.services.consumer_state_service import record_consumed_offsets
+from app.services.kafka_service import kafka_service, write_admission
+from tests.fake_kafka import FakeBroker
+from tests.local_db import reset_database, seed_items
+
+@pytest.fixture
+def broker(monkeypatch):
+    """A stand-in broker behind the app's own KafkaService, holding acks until released."""
+    reset_database()
+    seed_items(10)
+    broker = FakeBroker(partitions=2, auto_ack=False)
+    monkeypatch.setattr(kafka_service, "producer_factory", broker.producer_factory)
+    monkeypatch.setattr(kafka_service, "producers", {})
+    monkeypatch.setattr(kafka_service, "initialization_lock", asyncio.Lock())
+    monkeypatch.setattr(kafka_service, "pending_acks", 0)
+    monkeypatch.setattr(kafka_service, "produced_offsets", {})
+    # Connected up front, as the app's readiness check does
+    asyncio.run(kafka_service.initialize_producer())
+    monkeypatch.setattr(write_admission, "consumer_lag", None)
+    monkeypatch.setattr(write_admission, "rate_limiter", ClientRateLimiter(settings.ADMISSION_MAX_CLIENTS))
+    for name in ("ADMISSION_MAX_IN_FLIGHT_WRITES", "ADMISSION_MAX_PENDING_ACKS", "ADMISSION_MAX_CONSUMER_LAG",
+                 "ADMISSION_CLIENT_RATE_PER_SECOND"):
+        monkeypatch.setattr(settings, name, 0)
+    yield broker
+    broker.release_acks()
+
+def api() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+async def release_acks_until(broker: FakeBroker, writes: asyncio.Future) -> None:
+    while not writes.done():
+        broker.release_acks()
+        await asyncio.sleep(0.01)
+
+def test_overloaded_producer_sheds_writes_but_not_reads(broker, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_PENDING_ACKS", 5)
+    monkeypatch.setattr(settings, "ADMISSION_MAX_IN_FLIGHT_WRITES", 20)
+    shed = admission_rejections.value(reason="pending_acks") + admission_rejections.value(reason="in_flight")
+
+    async def scenario():
+        async with api() as client:
+            # 50 concurrent writes against a broker that does not ack
+            writes = asyncio.gather(*(
+                client.post("/items/", json={"name": f"Burst {i}", "description": "x"}) for i in range(50)
+            ))
+            await asyncio.sleep(0.2)
+            assert kafka_service.pending_acks == 5
+            reads = await asyncio.gather(*(client.get(f"/items/{id}") for id in range(1, 11)))
+            assert [read.status_code for read in reads] == [200] * 10
+            # The broker recovers and the admitted writes complete
+            await release_acks_until(broker, writes)
+            return await writes
+
+    responses = asyncio.run(scenario())
+
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(202) == 5
+    assert statuses.count(503) == 45
+    assert all(response.headers["Retry-After"] == "1" for response in responses if response.status_code == 503)
+    assert admission_rejections.value(reason="pending_acks") + admission_rejections.value(reason="in_flight") > shed
+    assert kafka_service.pending_acks == 0
+    assert write_admission.in_flight == 0
+
+def test_in_flight_limit_bounds_admitted_writes(broker, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_IN_FLIGHT_WRITES", 3)
+
+    async def scenario():
+        async with api() as client:
+            writes = asyncio.gather(*(
+                client.put(f"/items/{id}", json={"name": "Renamed", "description": "x"}) for id in range(1, 11)
+            ))
+            await asyncio.sleep(0.2)
+            assert write_admission.in_flight == 3
+            await release_acks_until(broker, writes)
+            return await writes
+
+    statuses = sorted(response.status_code for response in asyncio.run(scenario()))
+
+    assert statuses == [202] * 3 + [503] * 7
+
+def test_consumer_lag_above_threshold_sheds_writes(broker, monkeypatch):
+    broker.auto_ack = True
+    monkeypatch.setattr(settings, "ADMISSION_MAX_CONSUMER_LAG", 4)
+
+    async def scenario():
+        async with api() as client:
+            for i in range(4):
+                assert (await client.post("/items/", json={"name": f"Item {i}", "description": "x"})).status_code == 202
+            # The consumer has not moved past the start of any partition
+            with SessionLocal() as db:
+                record_consumed_offsets(db, settings.KAFKA_CONSUMER_GROUP_ID, {
+                    (settings.KAFKA_ITEM_CREATED_TOPIC, partition): 0 for partition in range(broker.partitions)
+                })
+                db.commit()
+            write_admission.consumer_lag = await kafka_service.estimate_consumer_lag()
+            rejected = await client.post("/items/", json={"name": "Late", "description": "x"})
+            read = await client.get("/items/1")
+            return rejected, read
+
+    rejected, read = asyncio.run(scenario())
+
+    assert write_admission.consumer_lag == 4
+    assert (rejected.status_code, rejected.headers["Retry-After"]) == (503, "1")
+    assert "consumer_lag" in rejected.json()["detail"]
+    assert read.status_code == 200
+
+def test_clients_over_their_rate_get_429(broker, monkeypatch):
+    broker.auto_ack = True
+    monkeypatch.setattr(settings, "ADMISSION_CLIENT_RATE_PER_SECOND", 0.5)
+    monkeypatch.setattr(settings, "ADMISSION_CLIENT_BURST", 2)
+
+    async def scenario():
+        async with api() as client:
+            return [await client.post("/items/", json={"name": f"Item {i}", "description": "x"}) for i in range(3)]
+
+    responses = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [202, 202, 429]
+    assert responses[2].headers["Retry-After"] == "2"
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2, burst=2, now=0.0)
+
+    assert [bucket.take(0.0), bucket.take(0.0)] == [0.0, 0.0]
+    assert bucket.take(0.0) == pytest.approx(0.5)
+    assert bucket.take(0.5) == 0.0
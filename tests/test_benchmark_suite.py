@@ -0,0 +1,30 @@
+import json
+from tests.benchmarks.suite import compare, main
+
+def test_suite_writes_results_for_every_scenario(tmp_path):
+    output = tmp_path / "results.json"
+
+    assert main(["--items", "50", "--requests", "20", "--concurrency", "4", "--events", "100", "--output", str(output)]) == 0
+
+    report = json.loads(output.read_text())
+    assert set(report["results"]) == {"GET /items", "GET /items/{id}", "POST /items", "PUT /items/{id}", "consumer drain"}
+    for result in report["results"].values():
+        assert result["errors"] == 0
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    assert report["meta"]["database"] == "sqlite"
+
+def test_compare_flags_throughput_drops_and_p99_growth_beyond_tolerance():
+    baseline = {
+        "GET /items": {"throughput_per_s": 1000, "p99_ms": 10},
+        "POST /items": {"throughput_per_s": 1000, "p99_ms": 10},
+    }
+    results = {
+        "GET /items": {"throughput_per_s": 850, "p99_ms": 11.5},
+        "POST /items": {"throughput_per_s": 700, "p99_ms": 13},
+        "new scenario": {"throughput_per_s": 1, "p99_ms": 1000},
+    }
+
+    assert compare(results, baseline, tolerance=0.2) == [
+        "POST /items: throughput 1000 -> 700/s",
+        "POST /items: p99 10 -> 13 ms",
+    ]
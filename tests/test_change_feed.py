@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from app.core.change_feed import ChangeFeed, FeedFull, ResumeUnavailable, feed_dropped
+from app.core.database import SessionLocal
+from app.main import app
+from app.routers.items import change_events
+from app.schemas import ItemCreate, ItemUpdate
+from app.services.items_service import (
+    PROCESS_ID, change_notification, create_item, delete_item, item_cache, item_changes, on_change_notification, update_item,
+)
+from tests.local_db import reset_database
+
+def new_feed(history_size: int = 100, buffer_size: int = 100, max_subscribers: int = 100) -> ChangeFeed:
+    return ChangeFeed("test", history_size, buffer_size, max_subscribers, heartbeat_seconds=0.05)
+
+def payloads(events) -> list:
+    return [orjson.loads(frame.split(b"data: ", 1)[1]) for _, frame in events]
+
+async def drain(subscription, count: int) -> list:
+    events = []
+    while len(events) < count:
+        events += await asyncio.wait_for(subscription.next_events(), 1.0)
+    return events
+
+def test_events_published_from_other_threads_reach_every_subscriber_in_order():
+    feed = new_feed()
+
+    async def run() -> list:
+        subscriptions = [feed.subscribe() for _ in range(3)]
+        publisher = threading.Thread(target=lambda: [feed.publish("updated", id, {"id": id}) for id in range(50)])
+        publisher.start()
+        received = [await drain(subscription, 50) for subscription in subscriptions]
+        publisher.join()
+        return received
+
+    for events in asyncio.run(run()):
+        assert [event["id"] for event in payloads(events)] == list(range(50))
+        assert [seq for seq, _ in events] == list(range(1, 51))
+
+def test_idle_streams_send_keep_alives():
+    feed = new_feed()
+
+    async def run() -> list:
+        frames = []
+        async for frame in change_events(feed.subscribe):
+            frames.append(frame)
+            if len(frames) == 3:
+                break
+        return frames
+
+    subscribed, *keep_alives = asyncio.run(run())
+    assert subscribed.startswith(b"id: %s\nevent: subscribed" % feed.position(0).encode())
+    assert keep_alives == [b": keep-alive\n\n"] * 2
+
+async def subscribe_from(feed: ChangeFeed, after: str):
+    return feed.subscribe(after)
+
+def test_resume_replays_missed_events_or_reports_a_gap():
+    feed = new_feed(history_size=5)
+    for id in range(8):
+        feed.publish("created", id, None)
+
+    async def run() -> list:
+        resumed = feed.subscribe(feed.position(5))
+        return await drain(resumed, 3)
+
+    assert [seq for seq, _ in asyncio.run(run())] == [6, 7, 8]
+    with pytest.raises(ResumeUnavailable):
+        asyncio.run(subscribe_from(feed, feed.position(2)))
+    with pytest.raises(ResumeUnavailable):
+        asyncio.run(subscribe_from(feed, "0123456789ab-7"))
+    with pytest.raises(ValueError):
+        asyncio.run(subscribe_from(feed, "garbage"))
+
+def test_resuming_past_more_events_than_the_buffer_holds_is_not_dropped():
+    feed = new_feed(history_size=50, buffer_size=3)
+    for id in range(20):
+        feed.publish("created", id, None)
+
+    async def run() -> tuple:
+        resumed = feed.subscribe(feed.position(0))
+        feed.publish("created", 20, None)
+        await asyncio.sleep(0)
+        assert not resumed.dropped
+        replayed = await drain(resumed, 21)
+        # Once the replay is read, the buffer holds buffer_size live events again
+        for id in range(21, 25):
+            feed.publish("created", id, None)
+        await asyncio.sleep(0)
+        return replayed, resumed.dropped
+
+    replayed, dropped = asyncio.run(run())
+    assert [seq for seq, _ in replayed] == list(range(1, 22))
+    assert dropped
+
+def test_slow_subscribers_are_dropped_without_holding_back_the_others():
+    feed = new_feed(buffer_size=3, max_subscribers=2)
+    dropped_before = feed_dropped.value(feed="test")
+
+    async def run() -> tuple:
+        slow, fast = feed.subscribe(), feed.subscribe()
+        with pytest.raises(FeedFull):
+            feed.subscribe()
+        for id in range(3):
+            feed.publish("updated", id, None)
+        await drain(fast, 3)
+        feed.publish("updated", 3, None)
+        fast_events = await drain(fast, 1)
+        frames = [frame async for frame in change_events(lambda: slow)]
+        fast.close()
+        return fast_events, frames
+
+    fast_events, frames = asyncio.run(run())
+    assert [seq for seq, _ in fast_events] == [4]
+    assert frames[-1] == b'event: dropped\ndata: {"resume_after":"%s"}\n\n' % feed.position(0).encode()
+    assert feed_dropped.value(feed="test") == dropped_before + 1
+    assert feed.subscriber_count == 0
+
+def test_committed_writes_are_published_to_the_item_feed():
+    reset_database()
+
+    async def run() -> list:
+        subscription = item_changes.subscribe()
+        with SessionLocal() as db:
+            created = create_item(db, ItemCreate(name="Laptop", description="Fast"))
+            update_item(db, created.id, ItemUpdate(name="Laptop", description="Faster"))
+            update_item(db, created.id + 1, ItemUpdate(name="Missing", description=""))
+            delete_item(db, created.id)
+        events = payloads(await drain(subscription, 3))
+        subscription.close()
+        return events
+
+    events = asyncio.run(run())
+    assert [(event["kind"], event["item"]) for event in events] == [
+        ("created", {"id": 1, "name": "Laptop", "description": "Fast"}),
+        ("updated", {"id": 1, "name": "Laptop", "description": "Faster"}),
+        ("deleted", None),
+    ]
+
+def test_changes_endpoint_rejects_positions_it_cannot_resume_from():
+    client = TestClient(app)
+
+    assert client.get("/items/changes", params={"after": "garbage"}).status_code == 400
+    assert client.get("/items/changes", headers={"Last-Event-ID": "0123456789ab-1"}).status_code == 410
+
+def test_change_streams_subscribe_only_once_they_start():
+    feed = new_feed(max_subscribers=1)
+
+    async def run() -> list:
+        # The route checks eagerly, but a response that is never sent holds no subscription
+        abandoned = change_events(feed.subscribe)
+        counts = [feed.subscriber_count]
+        stream = change_events(feed.subscribe)
+        await stream.__anext__()
+        counts.append(feed.subscriber_count)
+        # Full by the time the stream starts: it ends instead of failing mid-response
+        assert [frame async for frame in change_events(feed.subscribe)] == []
+        await stream.aclose()
+        await abandoned.aclose()
+        return counts + [feed.subscriber_count]
+
+    async def check_when_full() -> None:
+        feed.subscribe()
+        feed.check_subscribe()
+
+    assert asyncio.run(run()) == [0, 1, 0]
+    with pytest.raises(FeedFull):
+        asyncio.run(check_when_full())
+
+def test_changes_notified_by_other_processes_reach_the_cache_and_the_feed():
+    item_cache.invalidate()
+    local = change_notification(("updated", 7, {"id": 7, "name": "Mine", "description": ""}))
+    remote = orjson.dumps({"origin": "other", "kind": "updated", "id": 7, "item": {"id": 7, "name": "Theirs", "description": ""}})
+
+    async def run() -> list:
+        subscription = item_changes.subscribe()
+        on_change_notification(None, 1, "inventory_item_changes", local)
+        on_change_notification(None, 1, "inventory_item_changes", remote.decode())
+        on_change_notification(None, 1, "inventory_item_changes", "not json")
+        events = await drain(subscription, 1)
+        subscription.close()
+        return events
+
+    [event] = payloads(asyncio.run(run()))
+    assert event["item"]["name"] == "Theirs"
+    assert item_cache.get(7) == {"id": 7, "name": "Theirs", "description": ""}
+    assert orjson.loads(local)["origin"] == PROCESS_ID
+
+def test_oversized_change_notifications_drop_the_row():
+    payload = orjson.loads(change_notification(("updated", 1, {"id": 1, "name": "x", "description": "y" * 10000})))
+
+    assert (payload["id"], payload["item"]) == (1, None)
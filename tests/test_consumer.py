@@ -0,0 +1,64 @@
+import threading
+import time
+import httpx
+from fastapi.testclient import TestClient
+from app import consumer
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.main import app
+from app.models import Item
+from app.services.items_service import item_cache, item_changes
+from app.services.kafka_service import kafka_service
+from tests.fake_kafka import FakeBroker
+from tests.local_db import reset_database
+
+def test_standalone_consumer_applies_events_until_stopped(monkeypatch):
+    reset_database()
+    broker = FakeBroker(partitions=2)
+    monkeypatch.setattr(kafka_service, "consumer_factory", broker.consumer_factory)
+    monkeypatch.setattr(kafka_service, "stopping", threading.Event())
+    for i in range(3):
+        broker.produce(settings.KAFKA_ITEM_CREATED_TOPIC, {"name": f"Item {i}", "description": "new"})
+
+    thread = threading.Thread(target=consumer.run_consumer, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while broker.lag(settings.KAFKA_CONSUMER_GROUP_ID, settings.KAFKA_ITEM_CREATED_TOPIC) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    kafka_service.stop()
+    thread.join(10)
+
+    assert not thread.is_alive()
+    with SessionLocal() as db:
+        assert sorted(item.name for item in db.query(Item)) == ["Item 0", "Item 1", "Item 2"]
+
+def test_standalone_consumer_serves_metrics():
+    server = consumer.serve_metrics(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        response = httpx.get(f"{url}/metrics")
+        assert response.status_code == 200
+        assert "inventory_consumer_events_total" in response.text
+        assert httpx.get(f"{url}/").status_code == 404
+    finally:
+        server.shutdown()
+
+def test_api_only_startup_does_not_start_a_consumer(monkeypatch):
+    broker = FakeBroker()
+    monkeypatch.setattr(settings, "API_ONLY", True)
+    monkeypatch.setattr(kafka_service, "producer_factory", broker.producer_factory)
+    # Restored afterwards: without item change notifications, API-only mode turns both off
+    monkeypatch.setattr(item_cache, "capacity", item_cache.capacity)
+    monkeypatch.setattr(item_changes, "unavailable", None)
+
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+        assert app.state.consumer_thread is None
+        # The producer connects in the background
+        deadline = time.monotonic() + 5
+        while client.get("/readyz").status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert kafka_service.producer is not None
+        assert item_cache.capacity == 0
+        assert client.get("/items/changes").status_code == 503
+    assert not any(thread.name == "kafka-consumer" for thread in threading.enumerate())
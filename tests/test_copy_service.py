@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict
+import pytest
+import app.services.copy_service as copy_service
+from app.services.copy_service import PIPE_MAX_CHUNKS, ChunkPipe, import_items
+
+CHUNKS_PER_IMPORT = PIPE_MAX_CHUNKS * 3
+
+async def body(chunks: int) -> AsyncIterator[bytes]:
+    for _ in range(chunks):
+        yield b"x" * 1024
+
+def slow_copy(pipe: ChunkPipe, import_format: str) -> Dict[str, int]:
+    # Stands in for COPY ... FROM STDIN: blocks on the pipe until the body ends
+    received = 0
+    while True:
+        data = pipe.read()
+        if not data:
+            return {"upserted": 0, "inserted": received, "thread": threading.current_thread().name}
+        received += len(data)
+        time.sleep(0.001)
+
+def test_concurrent_imports_do_not_hold_executor_threads(monkeypatch):
+    monkeypatch.setattr(copy_service, "copy_into_staging", slow_copy)
+
+    async def run() -> list:
+        # Fewer default executor threads than concurrent imports
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(2))
+        imports = [asyncio.ensure_future(import_items(body(CHUNKS_PER_IMPORT), "ndjson")) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        # asyncio.to_thread users (e.g. the producer bootstrap) still get a thread meanwhile
+        assert await asyncio.wait_for(asyncio.to_thread(lambda: "free"), 1.0) == "free"
+        return await asyncio.wait_for(asyncio.gather(*imports), 10.0)
+
+    for counts in asyncio.run(run()):
+        assert counts["inserted"] == CHUNKS_PER_IMPORT * 1024
+        assert counts["thread"] == "items-import"
+
+def test_a_failed_copy_stops_reading_the_body(monkeypatch):
+    def failing_copy(pipe: ChunkPipe, import_format: str) -> Dict[str, int]:
+        pipe.read()
+        pipe.abort()
+        raise ValueError("Import rejected: bad row")
+
+    monkeypatch.setattr(copy_service, "copy_into_staging", failing_copy)
+
+    with pytest.raises(ValueError, match="bad row"):
+        asyncio.run(asyncio.wait_for(import_items(body(CHUNKS_PER_IMPORT), "csv"), 5.0))
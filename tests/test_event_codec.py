@@ -0,0 +1,55 @@
+import json
+import pytest
+from app.core.event_codec import FLAG_ZLIB, HEADER, SCHEMA_ITEM_V1, SCHEMA_JSON, EventCodec
+
+EVENTS = [
+    {"name": "Laptop", "description": "Fast"},
+    {"id": 42, "name": "Café ☃", "description": "x" * 300},
+    {"id": -7, "name": "Negative", "description": ""},
+    {"id": 2 ** 62, "name": "Large id", "description": None},
+]
+
+@pytest.mark.parametrize("codec", ["legacy-json", "json", "binary"])
+def test_every_codec_round_trips_item_events(codec):
+    for compress_min_bytes in (0, 64):
+        encode = EventCodec(codec, compress_min_bytes).encode
+        for event in EVENTS:
+            expected = {key: value for key, value in event.items() if value is not None or codec != "binary"}
+            assert EventCodec.decode(encode(event)) == expected
+
+def test_binary_events_are_framed_and_smaller_than_json():
+    event = {"id": 12345, "name": "Item 12345", "description": "Seeded item number 12345"}
+    encoded = EventCodec("binary").encode(event)
+
+    assert HEADER.unpack_from(encoded) == (0, 1, SCHEMA_ITEM_V1, 0)
+    assert len(encoded) < len(json.dumps(event).encode()) * 0.6
+    assert EventCodec.format_of(encoded) == "binary"
+
+def test_events_outside_the_item_schema_fall_back_to_framed_json():
+    for event in ({"id": "12", "name": "a", "description": "b"}, {"name": "a", "description": "b", "price": 3}):
+        encoded = EventCodec("binary").encode(event)
+        assert HEADER.unpack_from(encoded)[2] == SCHEMA_JSON
+        assert EventCodec.decode(encoded) == event
+
+def test_ids_outside_int64_fall_back_to_framed_json():
+    binary = EventCodec("binary")
+    for id in (2 ** 63, 2 ** 64 - 1):
+        encoded = binary.encode({"id": id, "name": "Huge", "description": ""})
+        assert HEADER.unpack_from(encoded)[2] == SCHEMA_JSON
+        assert EventCodec.decode(encoded)["id"] == id
+    for id in (2 ** 63 - 1, -2 ** 63):
+        encoded = binary.encode({"id": id})
+        assert HEADER.unpack_from(encoded)[2] == SCHEMA_ITEM_V1
+        assert EventCodec.decode(encoded)["id"] == id
+
+def test_legacy_json_is_still_read_and_unknown_frames_are_rejected():
+    assert EventCodec.decode(b'{"name": "Old", "description": "producer"}') == {"name": "Old", "description": "producer"}
+    assert EventCodec.format_of(b'{"name": "Old"}') == "legacy-json"
+    assert HEADER.unpack_from(EventCodec("json", compress_min_bytes=1).encode({"name": "a"}))[3] == FLAG_ZLIB
+
+    with pytest.raises(ValueError, match="schema"):
+        EventCodec.decode(HEADER.pack(0, 1, 99, 0) + b"payload")
+    with pytest.raises(ValueError, match="header version"):
+        EventCodec.decode(HEADER.pack(0, 2, SCHEMA_ITEM_V1, 0) + b"payload")
+    with pytest.raises(ValueError, match="Unknown event codec"):
+        EventCodec("protobuf")
@@ -0,0 +1,149 @@
+import base64
+import asyncio
+import json
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.main import app
+from app.schemas import ItemCreate, ItemResponse
+from app.services.items_service import create_item, get_items
+from app.services.kafka_service import KafkaService, get_kafka_service
+from tests.fake_kafka import FakeBroker
+from tests.local_db import reset_database
+
+@pytest.fixture
+def broker():
+    return FakeBroker(partitions=2)
+
+@pytest.fixture
+def client(broker):
+    reset_database()
+    service = KafkaService(producer_factory=broker.producer_factory, consumer_factory=broker.consumer_factory)
+    asyncio.run(service.initialize_producer())
+    app.dependency_overrides[get_kafka_service] = lambda: service
+    # Without the context manager the startup hooks (real Kafka, consumer thread) do not run
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def produced(broker: FakeBroker, topic: str) -> list:
+    return [json.loads(record.value) for record in broker.records(topic)]
+
+def test_bulk_create_accepts_valid_items_and_reports_invalid_ones(client, broker):
+    response = client.post("/items/bulk", json=[
+        {"name": "Laptop", "description": "Fast"},
+        {"name": "Tablet"},
+        {"name": "Phone", "description": "Small"},
+    ])
+
+    assert response.status_code == 202
+    body = response.json()
+    assert (body["accepted"], body["rejected"]) == (2, 1)
+    assert [result["accepted"] for result in body["results"]] == [True, False, True]
+    assert "description" in body["results"][1]["error"]
+    assert [event["name"] for event in produced(broker, settings.KAFKA_ITEM_CREATED_TOPIC)] == ["Laptop", "Phone"]
+
+def test_bulk_update_accepts_ndjson_bodies(client, broker):
+    body = b"\n".join([
+        b'{"id": 1, "name": "Laptop", "description": "Faster"}',
+        b'{"id": 2, "name": "Tablet"',
+        b'{"id": 3, "name": "Phone", "description": "Smaller"}',
+    ])
+    response = client.put("/items/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 202
+    assert [result["accepted"] for result in response.json()["results"]] == [True, False, True]
+    events = produced(broker, settings.KAFKA_ITEM_UPDATED_TOPIC)
+    assert sorted(event["id"] for event in events) == [1, 3]
+    assert all(record.key == str(json.loads(record.value)["id"]).encode() for record in broker.records(settings.KAFKA_ITEM_UPDATED_TOPIC))
+
+def test_ids_past_64_bits_are_rejected_before_producing(client, broker):
+    huge = 2 ** 64
+    assert client.put(f"/items/{huge}", json={"name": "Huge", "description": ""}).status_code == 422
+    assert client.delete(f"/items/{huge}").status_code == 422
+    assert client.get(f"/items/{huge}").status_code == 422
+
+    response = client.put("/items/bulk", json=[
+        {"id": huge, "name": "Huge", "description": ""},
+        {"id": 2 ** 63 - 1, "name": "Largest", "description": ""},
+    ])
+    assert response.status_code == 202
+    assert [result["accepted"] for result in response.json()["results"]] == [False, True]
+    assert [event["id"] for event in produced(broker, settings.KAFKA_ITEM_UPDATED_TOPIC)] == [2 ** 63 - 1]
+
+def test_bulk_endpoints_enforce_limits(client, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 2)
+    too_many = [{"name": str(i), "description": ""} for i in range(3)]
+    assert client.post("/items/bulk", json=too_many).status_code == 413
+
+    monkeypatch.setattr(settings, "BULK_MAX_BODY_BYTES", 10)
+    assert client.post("/items/bulk", json=too_many[:1]).status_code == 413
+
+def test_bulk_endpoints_reject_non_array_bodies(client):
+    assert client.post("/items/bulk", json={"name": "Laptop", "description": ""}).status_code == 400
+    assert client.post("/items/bulk", json=[]).status_code == 400
+    malformed_length = client.post("/items/bulk", content=b"[]", headers={"Content-Length": "lots"})
+    assert (malformed_length.status_code, malformed_length.json()["detail"]) == (400, "Invalid Content-Length header")
+
+def test_bulk_create_reports_failed_produces(client, broker):
+    broker.produce_error = RuntimeError("broker down")
+
+    response = client.post("/items/bulk", json=[{"name": "Laptop", "description": "Fast"}])
+
+    assert response.status_code == 202
+    [result] = response.json()["results"]
+    assert not result["accepted"]
+    assert "broker down" in result["error"]
+
+def test_item_listings_match_the_pydantic_encoding(client):
+    with SessionLocal() as db:
+        for name, description in [("Laptop", "Fast"), ("Caf\u00e9 \"\u2603\"", "tab\tnew\nline \u2028 \U0001f600"), ("Phone", "")]:
+            create_item(db, ItemCreate(name=name, description=description))
+        expected = [ItemResponse.model_validate(item) for item in get_items(db)]
+
+    first = client.get("/items/", params={"limit": 2})
+    rest = client.get("/items/", params={"limit": 2, "after": first.headers["X-Next-Cursor"]})
+    streamed = client.get("/items/", params={"stream": "json"})
+
+    # The bytes FastAPI writes for a List[ItemResponse] response model
+    encoded = json.dumps(jsonable_encoder(expected), ensure_ascii=False, separators=(",", ":")).encode()
+    assert streamed.content == encoded
+    assert first.content[:-1] + b"," + rest.content[1:] == encoded
+    assert "X-Next-Cursor" not in rest.headers
+
+def test_item_listings_reject_cursors_they_did_not_issue(client):
+    feed_position = "0123456789ab-7"
+    not_a_number = base64.urlsafe_b64encode(b"abc").decode()
+    for cursor in ["not base64!", "café", not_a_number, feed_position]:
+        response = client.get("/items/", params={"after": cursor})
+        assert (response.status_code, response.json()["detail"]) == (400, "Invalid cursor"), cursor
+        assert client.get("/items/", params={"after": cursor, "stream": "ndjson"}).status_code == 400
+
+def test_item_listings_enforce_page_size_bounds(client):
+    assert client.get("/items/", params={"limit": 0}).status_code == 422
+    assert client.get("/items/", params={"limit": settings.ITEMS_MAX_PAGE_SIZE + 1}).status_code == 422
+    assert client.get("/items/", params={"limit": settings.ITEMS_MAX_PAGE_SIZE}).status_code == 200
+
+def test_item_listings_of_an_empty_table(client):
+    page = client.get("/items/")
+    assert (page.json(), "X-Next-Cursor" in page.headers) == ([], False)
+    assert client.get("/items/", params={"stream": "json"}).content == b"[]"
+    assert client.get("/items/", params={"stream": "ndjson"}).content == b""
+
+def test_only_full_pages_carry_a_next_cursor(client):
+    with SessionLocal() as db:
+        ids = [create_item(db, ItemCreate(name=str(i), description="")).id for i in range(4)]
+
+    first = client.get("/items/", params={"limit": 2})
+    second = client.get("/items/", params={"limit": 2, "after": first.headers["X-Next-Cursor"]})
+    # A full last page still points past itself; the page after it is empty and ends the listing
+    last = client.get("/items/", params={"limit": 2, "after": second.headers["X-Next-Cursor"]})
+    partial = client.get("/items/", params={"limit": 3, "after": first.headers["X-Next-Cursor"]})
+
+    assert [item["id"] for item in first.json() + second.json()] == ids
+    assert (last.json(), "X-Next-Cursor" in last.headers) == ([], False)
+    assert [item["id"] for item in partial.json()] == ids[2:]
+    assert "X-Next-Cursor" not in partial.headers
+    streamed = client.get("/items/", params={"stream": "ndjson", "after": first.headers["X-Next-Cursor"]})
+    assert [json.loads(line)["id"] for line in streamed.text.splitlines()] == ids[2:]
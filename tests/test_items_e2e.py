@@ -1,3 +1,4 @@
+import json
 import time
 from datetime import datetime
 import os
@@ -9,28 +10,52 @@ RETRIES = 3
 DELAY = 5 # seconds
 STATUS_ACCEPTED = 202
 STATUS_OK = 200
+STATUS_BAD_REQUEST = 400
 STATUS_NOT_FOUND = 404
 
 @pytest.fixture
 def client():
     return httpx.Client(base_url=BASE_URL)
 
+@pytest.fixture(scope="module", autouse=True)
+def api_ready():
+    # The API serves before Kafka and the database are connected; writes need both
+    for _ in range(RETRIES * 4):
+        try:
+            if httpx.get(f"{BASE_URL}/readyz").status_code == STATUS_OK:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(DELAY)
+    pytest.fail("API did not become ready")
+
 def create_item(client, name: str, description: str) -> None:
     payload = {"name": name, "description": description}
     response = client.post("/items/", json=payload)
     assert response.status_code == STATUS_ACCEPTED
 
+def find_item_by_name(client, name: str):
+    params = {}
+    while True:
+        response = client.get("/items/", params=params)
+        assert response.status_code == STATUS_OK
+
+        for item in response.json():
+            if item["name"] == name:
+                return item
+
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            return None
+        params = {"after": next_cursor}
+
 def create_and_verify_item(client, name: str, description = "A test item") -> int:
     create_item(client, name, description)
 
     for attempt in range(RETRIES):
-        response = client.get("/items/")
-        assert response.status_code == STATUS_OK
-
-        items = response.json()
-        for item in items:
-            if item["name"] == name:
-                return item["id"]
+        item = find_item_by_name(client, name)
+        if item:
+            return item["id"]
 
         print(f"Retry {attempt + 1}/{RETRIES}: Item not found yet. Retrying in {DELAY} seconds.")
         time.sleep(DELAY)
@@ -60,6 +85,52 @@ def test_read_items(client):
     assert response.status_code == STATUS_OK
     assert isinstance(response.json(), list)
 
+def test_read_items_pagination(client):
+    create_and_verify_item(client, f"Test Pagination Item A {datetime.now().isoformat()}")
+    create_and_verify_item(client, f"Test Pagination Item B {datetime.now().isoformat()}")
+
+    first_page = client.get("/items/", params={"limit": 1})
+    assert first_page.status_code == STATUS_OK
+    assert len(first_page.json()) == 1
+
+    next_cursor = first_page.headers["X-Next-Cursor"]
+    second_page = client.get("/items/", params={"limit": 1, "after": next_cursor})
+    assert second_page.status_code == STATUS_OK
+    assert second_page.json()[0]["id"] > first_page.json()[0]["id"]
+
+def test_read_items_invalid_cursor(client):
+    response = client.get("/items/", params={"after": "not-a-cursor"})
+    assert response.status_code == STATUS_BAD_REQUEST
+
+def test_stream_items_ndjson(client):
+    response = client.get("/items/", params={"stream": "ndjson"})
+    assert response.status_code == STATUS_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    ids = [json.loads(line)["id"] for line in response.text.splitlines()]
+    assert ids == sorted(ids)
+
+def test_bulk_create_and_update_items(client):
+    names = [f"Test Bulk Item {i} {datetime.now().isoformat()}" for i in range(3)]
+    response = client.post("/items/bulk", json=[{"name": name, "description": "Bulk"} for name in names])
+    assert response.status_code == STATUS_ACCEPTED
+    assert response.json()["accepted"] == len(names)
+
+    ids = []
+    for name in names:
+        for attempt in range(RETRIES):
+            item = find_item_by_name(client, name)
+            if item:
+                ids.append(item["id"])
+                break
+            time.sleep(DELAY)
+    assert len(ids) == len(names)
+
+    payload = "\n".join(json.dumps({"id": id, "name": f"Updated {id}", "description": "Bulk"}) for id in ids)
+    response = client.put("/items/bulk", content=payload, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == STATUS_ACCEPTED
+    assert response.json()["rejected"] == 0
+
 def test_read_nonexistent_item(client):
     response = client.get("/items/999")
     assert response.status_code == STATUS_NOT_FOUND
@@ -102,4 +173,31 @@ def test_update_existing_item(client):
         print(f"Retry {attempt + 1}/{RETRIES}: Update not reflected yet. Retrying in {DELAY} seconds.")
         time.sleep(DELAY)
 
-    raise AssertionError(f"Item update was not reflected after {RETRIES} retries.")
\ No newline at end of file
+    raise AssertionError(f"Item update was not reflected after {RETRIES} retries.")
+
+def test_export_and_import_items(client):
+    unique_name = f"Test Import Item {datetime.now().isoformat()}"
+    csv_body = f'id,name,description\n,"{unique_name}","comma, ""quoted"""\n'
+
+    import_response = client.post("/items/import", params={"format": "csv"}, content=csv_body)
+    assert import_response.status_code == STATUS_OK
+    assert import_response.json() == {"upserted": 0, "inserted": 1}
+
+    export_response = client.get("/items/export", params={"format": "ndjson"})
+    assert export_response.status_code == STATUS_OK
+    exported = [json.loads(line) for line in export_response.text.splitlines()]
+    item = next(item for item in exported if item["name"] == unique_name)
+    assert item["description"] == 'comma, "quoted"'
+
+    renamed = f"Renamed {unique_name}"
+    ndjson_body = json.dumps({"id": item["id"], "name": renamed, "description": "upserted"}) + "\n"
+    upsert_response = client.post("/items/import", params={"format": "ndjson"}, content=ndjson_body)
+    assert upsert_response.status_code == STATUS_OK
+    assert upsert_response.json() == {"upserted": 1, "inserted": 0}
+
+    fetch_response = client.get(f"/items/{item['id']}")
+    assert fetch_response.json() == {"name": renamed, "description": "upserted", "id": item["id"]}
+
+def test_import_items_rejects_bad_rows(client):
+    response = client.post("/items/import", params={"format": "csv"}, content="id,name,description\nnot-a-number,x,y\n")
+    assert response.status_code == STATUS_BAD_REQUEST
@@ -0,0 +1,134 @@
+import time
+from sqlalchemy import event
+import app.services.items_service as items_service
+from app.core.cache import MISSING, TTLCache
+from app.core.database import SessionLocal, engine
+from app.schemas import ItemCreate, ItemUpdate
+from app.services.items_service import (
+    bulk_update_items,
+    create_item,
+    delete_item,
+    get_item_by_id,
+    get_items,
+    item_cache,
+    update_item,
+)
+from tests.local_db import reset_database
+
+def setup_function():
+    reset_database()
+    item_cache.invalidate()
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test", capacity=2, ttl_seconds=60, negative_ttl_seconds=60)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    cache.get(1)
+    cache.put(3, "c")
+
+    assert cache.get(2) is MISSING
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+
+def test_ttl_cache_expires_entries_and_negative_entries_sooner():
+    cache = TTLCache("test", capacity=10, ttl_seconds=60, negative_ttl_seconds=0.01)
+    cache.put(1, "a")
+    cache.put(2, None)
+
+    assert cache.get(2) is None
+    time.sleep(0.02)
+    assert cache.get(2) is MISSING
+    assert cache.get(1) == "a"
+
+def test_ttl_cache_discards_loads_that_raced_with_a_write():
+    cache = TTLCache("test", capacity=10, ttl_seconds=60, negative_ttl_seconds=60)
+    token = cache.load_token()
+    cache.invalidate(1)
+    cache.fill(1, "stale", token)
+
+    assert cache.get(1) is MISSING
+
+def test_get_item_by_id_caches_hits_and_misses():
+    with SessionLocal() as db:
+        created = create_item(db, ItemCreate(name="Laptop", description="Fast"))
+
+    with SessionLocal() as db:
+        assert get_item_by_id(db, created.id).name == "Laptop"
+        assert get_item_by_id(db, 999) is None
+
+    assert item_cache.get(created.id)["name"] == "Laptop"
+    assert item_cache.get(999) is None
+
+def test_writes_refresh_or_invalidate_cached_items_after_commit():
+    with SessionLocal() as db:
+        laptop = create_item(db, ItemCreate(name="Laptop", description="Fast"))
+        tablet = create_item(db, ItemCreate(name="Tablet", description="Light"))
+        get_item_by_id(db, laptop.id)
+        get_item_by_id(db, tablet.id)
+
+        update_item(db, laptop.id, ItemUpdate(name="Laptop", description="Faster"))
+        assert item_cache.get(laptop.id)["description"] == "Faster"
+
+        bulk_update_items(db, [(tablet.id, ItemUpdate(name="Tablet", description="Lighter"))])
+        assert item_cache.get(tablet.id)["description"] == "Light"
+        db.commit()
+        assert item_cache.get(tablet.id) is MISSING
+        assert get_item_by_id(db, tablet.id).description == "Lighter"
+
+        delete_item(db, laptop.id)
+        assert item_cache.get(laptop.id) is None
+
+def test_rolled_back_writes_leave_the_cache_alone():
+    with SessionLocal() as db:
+        id = create_item(db, ItemCreate(name="Laptop", description="Fast")).id
+        get_item_by_id(db, id)
+
+        bulk_update_items(db, [(id, ItemUpdate(name="Laptop", description="Discarded"))])
+        db.rollback()
+
+    assert item_cache.get(id)["description"] == "Fast"
+
+
+def test_writes_take_one_statement_each_and_return_the_written_rows():
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        with SessionLocal() as db:
+            created = create_item(db, ItemCreate(name="Laptop", description="Fast"))
+            updated = update_item(db, created.id, ItemUpdate(name="Laptop", description="Faster"))
+            deleted = delete_item(db, created.id)
+            missing = update_item(db, created.id, ItemUpdate(name="Gone", description="Gone"))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert [statement.split()[0] for statement in statements] == ["INSERT", "UPDATE", "DELETE", "UPDATE"]
+    assert (updated.id, updated.name, updated.description) == (created.id, "Laptop", "Faster")
+    assert deleted.description == "Faster"
+    assert missing is None
+
+def test_bulk_updates_take_one_statement_per_chunk(monkeypatch):
+    with SessionLocal() as db:
+        ids = [create_item(db, ItemCreate(name=str(i), description="Old")).id for i in range(3)]
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        with SessionLocal() as db:
+            bulk_update_items(db, [
+                (ids[0], ItemUpdate(name="a", description="First")),
+                (ids[1], ItemUpdate(name="b", description="")),
+                (ids[0], ItemUpdate(name="a", description="Last")),
+                (ids[2], ItemUpdate(name="c", description="New")),
+            ])
+            db.commit()
+            updated = [(item.name, item.description) for item in get_items(db)]
+            monkeypatch.setattr(items_service, "BULK_UPDATE_CHUNK_ROWS", 2)
+            bulk_update_items(db, [(id, ItemUpdate(name="d", description="")) for id in ids])
+            db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert updated == [("a", "Last"), ("b", ""), ("c", "New")]
+    # One statement for the first batch, then one per chunk of two rows
+    assert sum("UPDATE" in statement for statement in statements) == 3
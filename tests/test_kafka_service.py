@@ -0,0 +1,421 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from kafka.errors import KafkaTimeoutError
+from sqlalchemy.exc import OperationalError
+import app.services.kafka_service as kafka_service
+from app.core.admission import Overloaded
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.event_codec import EventCodec
+from app.models import ConsumerOffset, Item
+from app.services.items_service import bulk_create_items, bulk_update_items, create_item, update_item
+from app.schemas import ItemUpdate
+from app.services.kafka_service import (
+    KafkaService,
+    conflated_writes,
+    consumed_event_formats,
+    consumer_batch_size,
+    consumer_commit_seconds,
+    consumer_lag,
+    duplicate_events,
+    produce_ack_seconds,
+)
+from app.services.consumer_state_service import processed_event_ids, stored_offsets
+from tests.fake_kafka import FakeBroker
+from tests.local_db import reset_database
+
+TOPIC = settings.KAFKA_ITEM_CREATED_TOPIC
+
+def make_service(broker: FakeBroker) -> KafkaService:
+    return KafkaService(producer_factory=broker.producer_factory)
+
+def test_produce_message_waits_for_leader_ack():
+    broker = FakeBroker()
+    service = make_service(broker)
+
+    async def scenario():
+        await service.initialize_producer()
+        await service.produce_message(TOPIC, {"name": "Laptop", "description": "Fast"})
+
+    asyncio.run(scenario())
+
+    [record] = broker.records(TOPIC)
+    assert json.loads(record.value) == {"name": "Laptop", "description": "Fast"}
+    config = broker.producer_configs[0]
+    assert config["acks"] == 1
+    assert config["linger_ms"] == settings.KAFKA_PRODUCER_LINGER_MS
+    assert config["batch_size"] == settings.KAFKA_PRODUCER_BATCH_SIZE
+    assert config["compression_type"] == settings.KAFKA_PRODUCER_COMPRESSION
+
+def test_produce_ack_latency_is_recorded_per_topic_and_outcome():
+    broker = FakeBroker()
+    service = make_service(broker)
+    acked = produce_ack_seconds.count(topic=TOPIC, acks="leader", outcome="ack")
+
+    async def scenario():
+        await service.initialize_producer()
+        await service.produce_message(TOPIC, {"name": "Laptop", "description": "Fast"})
+
+    asyncio.run(scenario())
+
+    assert produce_ack_seconds.count(topic=TOPIC, acks="leader", outcome="ack") == acked + 1
+
+def test_fire_and_forget_does_not_wait_for_ack():
+    broker = FakeBroker(auto_ack=False)
+    service = make_service(broker)
+
+    async def scenario():
+        await service.initialize_producer()
+        await asyncio.wait_for(
+            service.produce_message(TOPIC, {"name": "Tablet", "description": "Light"}, acks="fire-and-forget"),
+            timeout=1,
+        )
+
+    asyncio.run(scenario())
+
+    assert len(broker.records(TOPIC)) == 1
+    assert {config["acks"] for config in broker.producer_configs} == {1, 0}
+
+def test_thousands_of_sends_stay_in_flight_until_acked():
+    broker = FakeBroker(partitions=4, auto_ack=False)
+    service = make_service(broker)
+
+    async def scenario():
+        await service.initialize_producer(acks_mode="all")
+        futures = [
+            await service.send(TOPIC, {"name": f"Item {i}", "description": ""}, acks="all", key=i)
+            for i in range(5000)
+        ]
+        await asyncio.sleep(0)
+        assert not any(future.done() for future in futures)
+
+        assert broker.release_acks() == 5000
+        return await asyncio.gather(*futures)
+
+    metadata = asyncio.run(scenario())
+
+    assert len(metadata) == 5000
+    assert {m.partition for m in metadata} == {0, 1, 2, 3}
+
+def test_produce_errors_are_raised_to_the_caller():
+    broker = FakeBroker(auto_ack=False)
+    service = make_service(broker)
+
+    async def scenario():
+        await service.initialize_producer()
+        pending = asyncio.create_task(service.produce_message(TOPIC, {"name": "Phone", "description": ""}))
+        while not broker.pending:
+            await asyncio.sleep(0)
+        broker.release_acks(error=RuntimeError("leader not available"))
+        await pending
+
+    with pytest.raises(RuntimeError, match="leader not available"):
+        asyncio.run(scenario())
+
+def test_connecting_fetches_item_topic_metadata_and_blocked_sends_are_shed(monkeypatch):
+    broker = FakeBroker()
+    service = make_service(broker)
+    asyncio.run(service.initialize_producer())
+    fetched = []
+    producer = service.producer
+    monkeypatch.setattr(producer, "partitions_for", lambda topic: fetched.append(topic))
+    service.producers.clear()
+    monkeypatch.setattr(service, "producer_factory", lambda **config: producer)
+
+    asyncio.run(service.initialize_producer())
+    assert fetched == [settings.KAFKA_ITEM_CREATED_TOPIC, settings.KAFKA_ITEM_UPDATED_TOPIC]
+
+    def full_buffer(*args, **kwargs):
+        raise KafkaTimeoutError("Failed to allocate memory within the configured max blocking time")
+
+    monkeypatch.setattr(producer, "send", full_buffer)
+    with pytest.raises(Overloaded, match="producer_blocked"):
+        asyncio.run(service.produce_message(TOPIC, {"name": "Phone", "description": ""}))
+
+def test_produce_without_initialization_fails():
+    service = make_service(FakeBroker())
+
+    with pytest.raises(RuntimeError, match="not initialized"):
+        asyncio.run(service.produce_message(TOPIC, {"name": "Phone", "description": ""}))
+
+CREATED_TOPIC = settings.KAFKA_ITEM_CREATED_TOPIC
+UPDATED_TOPIC = settings.KAFKA_ITEM_UPDATED_TOPIC
+
+def drain(service: KafkaService, broker: FakeBroker, timeout: float = 10) -> None:
+    """Run the batch consumer until every produced record is committed."""
+    thread = threading.Thread(target=run_consumer, args=(service,), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while broker.lag(settings.KAFKA_CONSUMER_GROUP_ID, CREATED_TOPIC, UPDATED_TOPIC) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    service.stop()
+    thread.join(timeout)
+    assert broker.lag(settings.KAFKA_CONSUMER_GROUP_ID, CREATED_TOPIC, UPDATED_TOPIC) == 0
+
+def run_consumer(service: KafkaService) -> None:
+    asyncio.run(service.consume_messages(create_item, update_item, bulk_create_items, bulk_update_items))
+
+def all_items() -> dict:
+    with SessionLocal() as db:
+        return {item.name: (item.id, item.description) for item in db.query(Item)}
+
+def test_batch_consumer_applies_creates_and_updates_with_one_commit_per_batch():
+    reset_database()
+    broker = FakeBroker()
+    for i in range(5):
+        broker.produce(CREATED_TOPIC, {"name": f"Item {i}", "description": "new"})
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+    ids = {name: id for name, (id, _) in all_items().items()}
+
+    broker.commit_count = 0
+    broker.produce(UPDATED_TOPIC, {"id": ids["Item 1"], "name": "Item 1", "description": "first"}, key=ids["Item 1"])
+    broker.produce(UPDATED_TOPIC, {"id": ids["Item 1"], "name": "Item 1", "description": "second"}, key=ids["Item 1"])
+    broker.produce(UPDATED_TOPIC, {"id": ids["Item 3"], "name": "Item 3", "description": "updated"}, key=ids["Item 3"])
+    broker.produce(CREATED_TOPIC, {"name": "Item 5", "description": "new"})
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+
+    assert broker.commit_count == 1
+    items = all_items()
+    assert {name: description for name, (_, description) in items.items()} == {
+        "Item 0": "new",
+        "Item 1": "second",
+        "Item 2": "new",
+        "Item 3": "updated",
+        "Item 4": "new",
+        "Item 5": "new",
+    }
+    assert sorted(id for id, _ in items.values()) == [1, 2, 3, 4, 5, 6]
+
+def test_batch_consumer_records_commit_latency_batch_size_and_lag():
+    reset_database()
+    broker = FakeBroker(partitions=2)
+    for i in range(4):
+        broker.produce(CREATED_TOPIC, {"name": f"Item {i}", "description": "new"})
+    commits = consumer_commit_seconds.count()
+    batches = consumer_batch_size.count()
+
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+
+    assert consumer_commit_seconds.count() == commits + broker.commit_count
+    assert consumer_batch_size.count() == batches + broker.commit_count
+    assert consumer_lag.value(topic=CREATED_TOPIC, partition=0) == 0
+    assert consumer_lag.value(topic=CREATED_TOPIC, partition=1) == 0
+    assert (CREATED_TOPIC, "0") in consumer_lag.values
+
+def test_parallel_workers_keep_per_item_order(monkeypatch):
+    monkeypatch.setattr(settings, "KAFKA_CONSUMER_WORKERS", 4)
+    reset_database()
+    broker = FakeBroker(partitions=3)
+    for i in range(20):
+        broker.produce(CREATED_TOPIC, {"name": f"Item {i}", "description": "v0"})
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+
+    for version in range(1, 11):
+        for id in range(1, 21):
+            broker.produce(UPDATED_TOPIC, {"id": id, "name": f"Renamed {id}", "description": f"v{version}"}, key=id)
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+
+    assert {description for _, description in all_items().values()} == {"v10"}
+
+def test_shard_batch_routes_each_key_to_a_single_worker():
+    broker = FakeBroker(partitions=2)
+    for id in range(50):
+        broker.produce(UPDATED_TOPIC, {"id": id, "name": "", "description": ""}, key=id)
+    for i in range(10):
+        broker.produce(CREATED_TOPIC, {"name": f"Item {i}", "description": ""})
+    records = broker.records(UPDATED_TOPIC) + broker.records(CREATED_TOPIC)
+
+    shards = KafkaService.shard_batch(records, 4)
+
+    owners = {}
+    for index, shard in enumerate(shards):
+        for record in shard:
+            if record.key is not None:
+                assert owners.setdefault(record.key, index) == index
+    assert all(sum(record.topic == CREATED_TOPIC for record in shard) > 0 for shard in shards)
+    assert sum(len(shard) for shard in shards) == len(records)
+
+def test_batch_consumer_skips_bad_messages_and_keeps_the_rest():
+    reset_database()
+    broker = FakeBroker()
+    broker.produce(CREATED_TOPIC, {"name": "Good", "description": "ok"})
+    broker.append(CREATED_TOPIC, b"not json")
+    broker.produce(CREATED_TOPIC, {"name": None, "description": "fails validation"})
+    broker.produce(UPDATED_TOPIC, {"id": 999, "name": "Missing", "description": "no such item"})
+
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+
+    assert all_items() == {"Good": (1, "ok")}
+
+def test_batch_consumer_retries_a_batch_until_the_database_is_back(monkeypatch):
+    reset_database()
+    broker = FakeBroker(partitions=2)
+    produce_with_event_ids(broker, [f"Item {i}" for i in range(4)])
+    monkeypatch.setattr(settings, "STARTUP_RETRY_INITIAL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "STARTUP_RETRY_MAX_SECONDS", 0.05)
+    database_up = threading.Event()
+    dropped_creates = []
+
+    def lost_connection() -> OperationalError:
+        return OperationalError("SELECT 1", {}, ConnectionError("server closed the connection unexpectedly"))
+
+    def flaky_processed_event_ids(db, event_ids):
+        if not database_up.is_set():
+            raise lost_connection()
+        return processed_event_ids(db, event_ids)
+
+    def flaky_bulk_create(db, items):
+        # The connection drops once more, halfway through applying the batch
+        if not dropped_creates:
+            dropped_creates.append(len(items))
+            raise lost_connection()
+        return bulk_create_items(db, items)
+
+    monkeypatch.setattr(kafka_service, "processed_event_ids", flaky_processed_event_ids)
+    service = KafkaService(consumer_factory=broker.consumer_factory)
+    thread = threading.Thread(
+        target=lambda: asyncio.run(service.consume_messages(create_item, update_item, flaky_bulk_create, bulk_update_items)),
+        daemon=True,
+    )
+    thread.start()
+    deadline = time.monotonic() + 10
+    while service.consumer_error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert thread.is_alive()
+    with pytest.raises(RuntimeError, match="retrying a batch"):
+        asyncio.run(service.check_consumer())
+
+    database_up.set()
+    while broker.lag(settings.KAFKA_CONSUMER_GROUP_ID, CREATED_TOPIC, UPDATED_TOPIC) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    asyncio.run(service.check_consumer())
+    service.stop()
+    thread.join(10)
+
+    assert dropped_creates
+    assert sorted(all_items()) == [f"Item {i}" for i in range(4)]
+    assert broker.lag(settings.KAFKA_CONSUMER_GROUP_ID, CREATED_TOPIC, UPDATED_TOPIC) == 0
+    with pytest.raises(RuntimeError, match="not running"):
+        asyncio.run(service.check_consumer())
+
+def test_consumer_reads_legacy_json_and_binary_events_side_by_side():
+    reset_database()
+    broker = FakeBroker()
+    producer = KafkaService(producer_factory=broker.producer_factory, codec=EventCodec("binary"))
+    broker.produce(CREATED_TOPIC, {"name": "Legacy", "description": "json"})
+    before = {format: consumed_event_formats.value(format=format) for format in ("legacy-json", "binary")}
+
+    async def scenario():
+        await producer.initialize_producer()
+        await producer.produce_message(CREATED_TOPIC, {"name": "Binary", "description": "v1"})
+
+    asyncio.run(scenario())
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+    id, _ = all_items()["Legacy"]
+    asyncio.run(producer.produce_message(UPDATED_TOPIC, {"id": id, "name": "Legacy", "description": "updated"}, key=id))
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+
+    assert {name: description for name, (_, description) in all_items().items()} == {"Legacy": "updated", "Binary": "v1"}
+    assert consumed_event_formats.value(format="legacy-json") == before["legacy-json"] + 1
+    assert consumed_event_formats.value(format="binary") == before["binary"] + 2
+
+def produce_with_event_ids(broker: FakeBroker, names: list) -> None:
+    producer = KafkaService(producer_factory=broker.producer_factory)
+
+    async def scenario():
+        await producer.initialize_producer()
+        for name in names:
+            await producer.produce_message(CREATED_TOPIC, {"name": name, "description": "new"})
+
+    asyncio.run(scenario())
+
+def test_redelivered_events_are_applied_once():
+    reset_database()
+    broker = FakeBroker(partitions=2)
+    produce_with_event_ids(broker, ["Laptop", "Tablet"])
+    # A producer retry after a lost ack writes the same event again
+    for record in broker.records(CREATED_TOPIC):
+        broker.append(CREATED_TOPIC, record.value, headers=record.headers)
+    duplicates = duplicate_events.value()
+
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+
+    assert sorted(all_items()) == ["Laptop", "Tablet"]
+    assert duplicate_events.value() == duplicates + 2
+
+def test_consumer_resumes_from_offsets_stored_with_the_writes():
+    reset_database()
+    broker = FakeBroker(partitions=2)
+    produce_with_event_ids(broker, [f"Item {i}" for i in range(6)])
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+    with SessionLocal() as db:
+        assert stored_offsets(db, settings.KAFKA_CONSUMER_GROUP_ID) == {
+            (tp.topic, tp.partition): end for tp, end in broker.end_offsets(CREATED_TOPIC).items()
+        }
+
+    # Crash before the (lazy) Kafka commit: the stored offsets skip what was applied
+    broker.committed[settings.KAFKA_CONSUMER_GROUP_ID].clear()
+    duplicates = duplicate_events.value()
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+    assert duplicate_events.value() == duplicates
+
+    # Without stored offsets the replay is deduplicated by event id
+    broker.committed[settings.KAFKA_CONSUMER_GROUP_ID].clear()
+    with SessionLocal() as db:
+        db.execute(ConsumerOffset.__table__.delete())
+        db.commit()
+    drain(KafkaService(consumer_factory=broker.consumer_factory), broker)
+    assert duplicate_events.value() == duplicates + 6
+    assert len(all_items()) == 6
+
+def test_single_messages_are_deduplicated_by_event_id():
+    reset_database()
+    broker = FakeBroker()
+    produce_with_event_ids(broker, ["Laptop"])
+    [record] = broker.records(CREATED_TOPIC)
+    service = KafkaService()
+
+    assert service.process_message(record, create_item, update_item, store_offset=True)
+    assert service.process_message(record, create_item, update_item, store_offset=True)
+
+    assert list(all_items()) == ["Laptop"]
+    with SessionLocal() as db:
+        assert stored_offsets(db, settings.KAFKA_CONSUMER_GROUP_ID) == {(CREATED_TOPIC, 0): 1}
+
+def test_updates_of_missing_items_are_still_recorded_as_processed():
+    reset_database()
+    broker = FakeBroker()
+    producer = KafkaService(producer_factory=broker.producer_factory)
+
+    async def scenario():
+        await producer.initialize_producer()
+        await producer.produce_message(UPDATED_TOPIC, {"id": 404, "name": "Ghost", "description": ""}, key=404)
+
+    asyncio.run(scenario())
+    [record] = broker.records(UPDATED_TOPIC)
+    duplicates = duplicate_events.value()
+
+    assert KafkaService().process_message(record, create_item, update_item, store_offset=True)
+    assert KafkaService().process_message(record, create_item, update_item, store_offset=True)
+
+    assert duplicate_events.value() - duplicates == 1
+    with SessionLocal() as db:
+        assert stored_offsets(db, settings.KAFKA_CONSUMER_GROUP_ID) == {(UPDATED_TOPIC, 0): 1}
+
+def test_conflation_keeps_last_update_per_item_and_counts_saved_writes():
+    updates = [
+        (1, ItemUpdate(name="a", description="1")),
+        (2, ItemUpdate(name="b", description="1")),
+        (1, ItemUpdate(name="a", description="2")),
+        (1, ItemUpdate(name="a", description="3")),
+    ]
+    saved_before = conflated_writes.value()
+
+    conflated = KafkaService.conflate_updates(updates)
+
+    assert [(id, item.description) for id, item in conflated] == [(1, "3"), (2, "1")]
+    assert conflated_writes.value() - saved_before == 2
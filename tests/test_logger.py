@@ -0,0 +1,47 @@
+import json
+import logging
+import queue
+import time
+from app.core.logger import JsonFormatter, NonBlockingQueueHandler, RateLimitFilter, SamplingFilter, dropped_records
+
+def make_record(msg: str, *args, level: int = logging.INFO, name: str = "app.test") -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+def test_rate_limit_is_per_message_template_and_spares_warnings():
+    rate_limit = RateLimitFilter(rate_per_second=1000, burst=2)
+
+    allowed = [rate_limit.filter(make_record("Item %s served from cache", id)) for id in range(5)]
+    assert allowed == [True, True, False, False, False]
+    assert rate_limit.filter(make_record("Another message"))
+    assert rate_limit.filter(make_record("Item %s served from cache", 1, level=logging.WARNING))
+
+    time.sleep(0.01)
+    assert rate_limit.filter(make_record("Item %s served from cache", 6))
+
+def test_sampling_only_applies_to_configured_loggers():
+    dropped = dropped_records.value(reason="sampled")
+    sampling = SamplingFilter({"app.chatty": 0.0})
+
+    assert not sampling.filter(make_record("hot path", name="app.chatty"))
+    assert sampling.filter(make_record("hot path", name="app.chatty", level=logging.ERROR))
+    assert sampling.filter(make_record("hot path", name="app.other"))
+    assert dropped_records.value(reason="sampled") == dropped + 1
+
+def test_queue_handler_merges_args_and_drops_when_full():
+    dropped = dropped_records.value(reason="queue_full")
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+
+    handler.handle(make_record("Retrieved %s items", 3))
+    handler.handle(make_record("Retrieved %s items", 4))
+
+    record = handler.queue.get_nowait()
+    assert (record.msg, record.args) == ("Retrieved 3 items", None)
+    assert dropped_records.value(reason="queue_full") == dropped + 1
+
+def test_json_formatter_emits_one_object_per_record():
+    line = JsonFormatter().format(make_record("Item %s updated", 7))
+
+    entry = json.loads(line)
+    assert entry["message"] == "Item 7 updated"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
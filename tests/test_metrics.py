@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+from app.core.metrics import Gauge, Histogram, MetricsRegistry
+from app.core.monitoring import http_request_duration
+from app.main import app
+from tests.local_db import reset_database
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, route="/items")
+
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{route="/items",le="0.1"} 1',
+        'latency_seconds_bucket{route="/items",le="1.0"} 3',
+        'latency_seconds_bucket{route="/items",le="+Inf"} 4',
+        'latency_seconds_sum{route="/items"} 4.05',
+        'latency_seconds_count{route="/items"} 4',
+    ]
+
+def test_registry_runs_collectors_before_rendering():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("in_use", "Connections in use")
+    registry.add_collector(lambda: gauge.set(3))
+
+    assert "in_use 3" in registry.render()
+    assert isinstance(gauge, Gauge)
+
+def test_http_requests_are_timed_by_route_template():
+    reset_database()
+    client = TestClient(app)
+    missing = http_request_duration.count(method="GET", route="/items/{id}", status="404")
+    unmatched = http_request_duration.count(method="GET", route="unmatched", status="404")
+
+    client.get("/items/41")
+    client.get("/items/42")
+    client.get("/no/such/route")
+
+    assert http_request_duration.count(method="GET", route="/items/{id}", status="404") == missing + 2
+    assert http_request_duration.count(method="GET", route="unmatched", status="404") == unmatched + 1
+    metrics = client.get("/metrics").text
+    assert 'inventory_http_request_duration_seconds_count{method="GET",route="/items/{id}",status="404"}' in metrics
+    assert 'inventory_db_pool_connections{engine="async",state="in_use"}' in metrics
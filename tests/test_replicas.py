@@ -0,0 +1,89 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+import app.core.replicas as replicas
+from app.core.database import SessionLocal
+from app.core.replicas import READ_PRIMARY_COOKIE, ReplicaSet, routed_reads
+from app.main import app
+from app.schemas import ItemCreate
+from app.services.items_service import create_item, item_cache
+from tests.local_db import DATA_DIR, attach_inventory_schema, reset_database
+
+def local_replicas(count: int) -> ReplicaSet:
+    # Every "replica" is the test database itself
+    replica_set = ReplicaSet.from_urls(",".join([f"sqlite:///{DATA_DIR}/main.db"] * count))
+    for replica in replica_set.replicas:
+        event.listen(replica.engine.sync_engine, "connect", attach_inventory_schema)
+    return replica_set
+
+@pytest.fixture
+def client(monkeypatch):
+    reset_database()
+    item_cache.invalidate()
+    monkeypatch.setattr(replicas, "read_replicas", local_replicas(2))
+    return TestClient(app)
+
+def test_choose_round_robins_over_healthy_replicas_only():
+    replica_set = local_replicas(3)
+    first, second, third = replica_set.replicas
+
+    assert [replica_set.choose() for _ in range(4)] == [first, second, third, first]
+    replica_set.mark(second, False, "down")
+    assert [replica_set.choose() for _ in range(3)] == [third, first, third]
+    replica_set.mark(first, False, "down")
+    replica_set.mark(third, False, "down")
+    assert replica_set.choose() is None
+
+def test_health_check_marks_unreachable_replicas():
+    replica_set = ReplicaSet.from_urls(f"sqlite:///{DATA_DIR}/main.db, sqlite:////nonexistent/dir/replica.db")
+
+    asyncio.run(replica_set.check())
+
+    healthy, broken = replica_set.status()
+    assert healthy["healthy"] and healthy["latency_ms"] is not None
+    assert not broken["healthy"] and broken["last_error"]
+
+def test_reads_go_to_replicas_unless_pinned_to_the_primary(client):
+    with SessionLocal() as db:
+        created = create_item(db, ItemCreate(name="Laptop", description="Fast"))
+    item_cache.invalidate()
+    before = {target: routed_reads.value(target=target) for target in ("replica-0", "replica-1", "primary")}
+
+    for _ in range(4):
+        assert client.get(f"/items/{created.id}").json()["name"] == "Laptop"
+    client.get("/items/", headers={"X-Read-Consistency": "primary"})
+
+    assert routed_reads.value(target="replica-0") == before["replica-0"] + 2
+    assert routed_reads.value(target="replica-1") == before["replica-1"] + 2
+    assert routed_reads.value(target="primary") == before["primary"] + 1
+    # Replica reads never fill the cache
+    assert len(item_cache) == 0
+
+def test_streamed_listings_follow_the_replica_routing(client, monkeypatch):
+    with SessionLocal() as db:
+        create_item(db, ItemCreate(name="Laptop", description="Fast"))
+    opened = []
+    for replica in replicas.read_replicas.replicas:
+        event.listen(replica.engine.sync_engine, "checkout", lambda *_, name=replica.name: opened.append(name))
+
+    streamed = client.get("/items/", params={"stream": "ndjson"})
+    assert [row["name"] for row in map(json.loads, streamed.text.splitlines())] == ["Laptop"]
+    assert opened == ["replica-0"]
+
+    # Pinned to the primary, the stream never touches a replica
+    opened.clear()
+    client.get("/items/", params={"stream": "ndjson"}, headers={"X-Read-Consistency": "primary"})
+    assert opened == []
+
+def test_writes_pin_the_client_to_the_primary(client):
+    with SessionLocal() as db:
+        created = create_item(db, ItemCreate(name="Laptop", description="Fast"))
+    primary_reads = routed_reads.value(target="primary")
+
+    response = client.delete(f"/items/{created.id}")
+    assert READ_PRIMARY_COOKIE in response.cookies
+    assert client.get(f"/items/{created.id}").status_code == 404
+
+    assert routed_reads.value(target="primary") == primary_reads + 1
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from fastapi.testclient import TestClient
+from kafka.errors import KafkaConnectionError
+from app.core.config import settings
+from app.core.readiness import readiness
+from app.main import app
+from app.services.kafka_service import kafka_service
+from tests.fake_kafka import FakeBroker
+from tests.local_db import reset_database
+
+# Imports the app and starts it against a Kafka broker nothing listens on
+MEASURE_STARTUP = """
+import json, sys, time
+import tests.local_db
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+kafka_imported = "kafka" in sys.modules
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    assert client.get("/healthz").status_code == 200
+    serving = time.perf_counter()
+print(json.dumps({"import_seconds": imported - started, "startup_seconds": serving - imported, "kafka_imported": kafka_imported}))
+"""
+
+def wait_until_ready(client: TestClient, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while client.get("/readyz").status_code != 200:
+        assert time.monotonic() < deadline, client.get("/readyz").json()
+        time.sleep(0.01)
+
+def test_app_imports_and_starts_without_waiting_for_kafka():
+    env = {**os.environ, "KAFKA_BROKER": "127.0.0.1:1", "KAFKA_PRODUCER_BOOTSTRAP_TIMEOUT_MS": "500", "API_ONLY": "true"}
+    completed = subprocess.run([sys.executable, "-c", MEASURE_STARTUP], env=env, capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    print(f"import {timings['import_seconds']:.3f}s, startup {timings['startup_seconds']:.3f}s")
+
+    assert not timings["kafka_imported"]
+    # Startup used to wait out 5 producer attempts 5 s apart before failing
+    assert timings["startup_seconds"] < 2
+
+def test_readiness_follows_kafka_while_liveness_does_not(monkeypatch):
+    reset_database()
+    broker = FakeBroker()
+    down = True
+    attempts = []
+
+    def producer_factory(**config):
+        attempts.append(time.monotonic())
+        if down:
+            raise KafkaConnectionError()
+        return broker.producer_factory(**config)
+
+    monkeypatch.setattr(settings, "API_ONLY", True)
+    monkeypatch.setattr(settings, "STARTUP_RETRY_INITIAL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "STARTUP_RETRY_MAX_SECONDS", 0.05)
+    monkeypatch.setattr(kafka_service, "producer_factory", producer_factory)
+    monkeypatch.setattr(kafka_service, "producers", {})
+
+    with TestClient(app) as client:
+        assert client.get("/healthz").status_code == 200
+        write = client.post("/items/", json={"name": "Laptop", "description": "Fast"})
+        assert (write.status_code, write.headers["Retry-After"]) == (503, "1")
+        while len(attempts) < 4:
+            time.sleep(0.01)
+        not_ready = client.get("/readyz")
+        assert not_ready.status_code == 503
+        assert {dependency["name"]: dependency["ready"] for dependency in not_ready.json()["dependencies"]} == {
+            "database": True, "kafka": False,
+        }
+
+        down = False
+        wait_until_ready(client)
+        assert client.post("/items/", json={"name": "Laptop", "description": "Fast"}).status_code == 202
+    assert readiness.dependencies["kafka"].last_error is None
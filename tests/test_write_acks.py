@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import pytest
+from sqlalchemy import text
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.write_acks import CORRELATION_HEADER, record_applied_event, write_acks, write_wait_seconds
+from app.main import app
+from app.services.items_service import bulk_create_items, bulk_update_items, create_item, update_item
+from app.services.kafka_service import EVENT_ID_HEADER, KafkaService, get_kafka_service
+from tests.fake_kafka import FakeBroker
+from tests.local_db import reset_database, seed_items
+
+@pytest.fixture
+def broker():
+    return FakeBroker(partitions=2)
+
+@pytest.fixture
+def service(broker):
+    reset_database()
+    service = KafkaService(producer_factory=broker.producer_factory, consumer_factory=broker.consumer_factory)
+    asyncio.run(service.initialize_producer())
+    app.dependency_overrides[get_kafka_service] = lambda: service
+    yield service
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def client(service):
+    return TestClient(app)
+
+@pytest.fixture
+def consumer(service):
+    """The batch consumer applying events in the background, as the app's consumer thread does."""
+    thread = threading.Thread(
+        target=lambda: asyncio.run(service.consume_messages(create_item, update_item, bulk_create_items, bulk_update_items)),
+        daemon=True,
+    )
+    thread.start()
+    yield
+    service.stop()
+    thread.join(10)
+
+def test_waited_create_returns_the_applied_item(client, broker, consumer):
+    response = client.post("/items/", params={"wait": "true"}, json={"name": "Laptop", "description": "Fast"})
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["name"] == "Laptop" and body["description"] == "Fast"
+    assert client.get(f"/items/{body['id']}").json() == body
+    [record] = broker.records(settings.KAFKA_ITEM_CREATED_TOPIC)
+    assert [name for name, _ in record.headers] == [EVENT_ID_HEADER, CORRELATION_HEADER]
+    assert len(write_acks) == 0
+
+def test_waited_update_returns_the_new_values(client, consumer):
+    seed_items(1)
+
+    response = client.put("/items/1", params={"wait": "true"}, json={"name": "Renamed", "description": "Updated"})
+
+    assert response.status_code == 200
+    assert response.json() == {"id": 1, "name": "Renamed", "description": "Updated"}
+
+def test_waited_update_of_a_missing_item_is_not_found(client, consumer):
+    response = client.put("/items/404", params={"wait": "true"}, json={"name": "Ghost", "description": "None"})
+
+    assert response.status_code == 404
+
+def test_wait_falls_back_to_accepted_on_timeout(client, broker):
+    timeouts = write_wait_seconds.count(outcome="timeout")
+
+    # No consumer is running, so the event is never applied
+    response = client.post("/items/", params={"wait": "true", "timeout_ms": 50}, json={"name": "Laptop", "description": "Fast"})
+
+    assert response.status_code == 202
+    headers = dict(broker.records(settings.KAFKA_ITEM_CREATED_TOPIC)[0].headers)
+    assert response.json()["correlation_id"] == headers[CORRELATION_HEADER].decode()
+    assert write_wait_seconds.count(outcome="timeout") == timeouts + 1
+    assert len(write_acks) == 0
+
+def test_writes_without_wait_carry_no_correlation_id(client, broker):
+    response = client.post("/items/", json={"name": "Laptop", "description": "Fast"})
+
+    assert response.status_code == 202
+    assert [name for name, _ in broker.records(settings.KAFKA_ITEM_CREATED_TOPIC)[0].headers] == [EVENT_ID_HEADER]
+    assert client.post("/items/", params={"wait": "true", "timeout_ms": 0}, json={"name": "x", "description": "y"}).status_code == 422
+
+def test_acks_are_delivered_on_commit_only():
+    reset_database()
+
+    async def scenario():
+        committed, rolled_back = write_acks.expect("committed"), write_acks.expect("rolled-back")
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+            record_applied_event(db, "rolled-back", 1)
+            db.rollback()
+            record_applied_event(db, "committed", 2)
+            db.commit()
+        assert await asyncio.wait_for(committed, 1) == 2
+        assert not rolled_back.done()
+        write_acks.discard("rolled-back")
+
+    asyncio.run(scenario())